@@ -0,0 +1,54 @@
+from django.contrib import admin
+from django.http import HttpResponse
+from django.shortcuts import get_object_or_404
+from django.urls import path, reverse
+from django.utils.html import format_html
+
+from .models import VehicleMetrics, RequestProfile
+
+
+@admin.register(VehicleMetrics)
+class VehicleMetricsAdmin(admin.ModelAdmin):
+    list_display = ('mark_name', 'model_name', 'vehicle_type', 'tco_per_km', 'co2_g_per_km', 'energy_mj_per_km',
+                    'cruise_power_kw', 'updated_at')
+    list_filter = ('vehicle_type',)
+    search_fields = ('mark_name', 'model_name')
+    readonly_fields = [f.name for f in VehicleMetrics._meta.fields]
+
+
+@admin.register(RequestProfile)
+class RequestProfileAdmin(admin.ModelAdmin):
+    list_display = ('created_at', 'method', 'path', 'view_name', 'username', 'status_code', 'duration_ms',
+                    'download_link')
+    list_filter = ('view_name', 'method')
+    search_fields = ('path', 'username')
+    exclude = ('stats', 'report')
+    readonly_fields = ('created_at', 'method', 'path', 'query_string', 'view_name', 'username', 'status_code',
+                       'duration_ms', 'download_link', 'report_display')
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def get_urls(self):
+        return [
+            path('<int:pk>/download/', self.admin_site.admin_view(self.download_view),
+                 name='calculator_requestprofile_download'),
+        ] + super().get_urls()
+
+    def download_view(self, request, pk):
+        profile = get_object_or_404(RequestProfile, pk=pk)
+        response = HttpResponse(bytes(profile.stats), content_type='application/octet-stream')
+        response['Content-Disposition'] = f'attachment; filename="profile-{profile.pk}.prof"'
+        return response
+
+    @admin.display(description="Файл .prof")
+    def download_link(self, obj):
+        url = reverse('admin:calculator_requestprofile_download', args=[obj.pk])
+        return format_html('<a href="{}">Скачать</a>', url)
+
+    @admin.display(description="Отчет")
+    def report_display(self, obj):
+        return format_html('<pre style="font-size: 12px">{}</pre>', obj.report)
@@ -0,0 +1,161 @@
+import logging
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from pathlib import Path
+
+from django.conf import settings
+from django.db import connections
+
+from . import prometheus
+
+try:
+    import fcntl
+except ImportError:  # Windows: лимиты действуют внутри процесса
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+ADMISSION_DIR = 'admission'
+POLL_INTERVAL = 0.05  # сек между попытками занять слот
+BACKGROUND_SLOT_TIMEOUT = 60 * 60  # сколько фоновая задача ждет свободный слот
+BACKGROUND_RETRY_AFTER = 60  # сек в Retry-After, если очередь фоновых задач заполнена
+
+LIGHT, HEAVY, BACKGROUND = 'light', 'heavy', 'background'
+
+_semaphores = defaultdict(lambda: threading.BoundedSemaphore(1))  # слот -> семафор, если нет fcntl
+_background = ThreadPoolExecutor(max_workers=1, thread_name_prefix='background-simulation')
+_background_lock = threading.Lock()
+_background_pending = 0  # принятые, но не завершенные фоновые задачи воркера
+
+
+class Rejected(Exception):
+    """Запрос не допущен: все слоты класса заняты дольше времени ожидания"""
+
+    def __init__(self, message, retry_after):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+def classify(estimated_seconds):
+    """
+    Класс запроса по оценке времени: light - без ограничений, heavy - не больше
+    SIMULATION_HEAVY_SLOTS одновременно на все воркеры, background - в фоновую очередь
+    """
+    if estimated_seconds >= settings.SIMULATION_BACKGROUND_SECONDS:
+        return BACKGROUND
+    if estimated_seconds >= settings.SIMULATION_HEAVY_SECONDS:
+        return HEAVY
+    return LIGHT
+
+
+def class_limits():
+    return {HEAVY: settings.SIMULATION_HEAVY_SLOTS, BACKGROUND: settings.SIMULATION_BACKGROUND_SLOTS}
+
+
+@contextmanager
+def admit(view, request_class, timeout=None):
+    """
+    Допуск запроса класса request_class: light проходит сразу, остальные ждут свободный слот
+    (файловые блокировки PROFILE_CACHE_DIR/admission/<класс>-<n>.lock, общие для воркеров)
+    не дольше timeout (SIMULATION_QUEUE_TIMEOUT)
+
+    :raises Rejected: слот не освободился
+    """
+    if request_class == LIGHT:
+        prometheus.ADMISSION_DECISIONS.inc(view=view, decision=LIGHT)
+        yield
+        return
+
+    timeout = settings.SIMULATION_QUEUE_TIMEOUT if timeout is None else timeout
+    started = time.perf_counter()
+    with _slot(request_class, class_limits()[request_class], timeout) as acquired:
+        if not acquired:
+            prometheus.ADMISSION_DECISIONS.inc(view=view, decision='rejected')
+            raise Rejected(
+                "Сервер занят тяжелыми расчетами. Повторите запрос через несколько секунд "
+                "или сократите период и число ТС",
+                retry_after=max(int(timeout), 1),
+            )
+        waited = time.perf_counter() - started
+        prometheus.ADMISSION_DECISIONS.inc(view=view, decision='queued' if waited > POLL_INTERVAL else request_class)
+        yield
+
+
+def submit_background(view, job, *args):
+    """
+    Фоновая очередь воркера (один поток); задача занимает слот background,
+    общий для воркеров, и сама сохраняет результат (например, как прогон симуляции)
+
+    :raises Rejected: в очереди воркера уже SIMULATION_BACKGROUND_QUEUE незавершенных задач
+    """
+    global _background_pending
+    with _background_lock:
+        if _background_pending >= settings.SIMULATION_BACKGROUND_QUEUE:
+            prometheus.ADMISSION_DECISIONS.inc(view=view, decision='rejected')
+            raise Rejected(
+                "Очередь фоновых расчетов заполнена. Повторите запрос позже "
+                "или сократите период и число ТС",
+                retry_after=BACKGROUND_RETRY_AFTER,
+            )
+        _background_pending += 1
+    prometheus.ADMISSION_DECISIONS.inc(view=view, decision=BACKGROUND)
+    return _background.submit(_run_background, view, job, args)
+
+
+def _run_background(view, job, args):
+    global _background_pending
+    try:
+        with _slot(BACKGROUND, class_limits()[BACKGROUND], BACKGROUND_SLOT_TIMEOUT) as acquired:
+            if not acquired:
+                logger.error("Фоновый расчет %s не дождался слота", view)
+                return None
+            return job(*args)
+    except Exception:
+        logger.exception("Ошибка фонового расчета %s", view)
+        raise
+    finally:
+        connections.close_all()
+        with _background_lock:
+            _background_pending -= 1
+
+
+@contextmanager
+def _slot(request_class, limit, timeout):
+    """Один из limit слотов класса: True - занят, False - истекло время ожидания"""
+    deadline = time.monotonic() + timeout
+    if fcntl is None:
+        semaphores = [_semaphores[(request_class, index)] for index in range(limit)]
+        while True:
+            for semaphore in semaphores:
+                if semaphore.acquire(blocking=False):
+                    try:
+                        yield True
+                    finally:
+                        semaphore.release()
+                    return
+            if time.monotonic() >= deadline:
+                yield False
+                return
+            time.sleep(POLL_INTERVAL)
+
+    root = Path(settings.PROFILE_CACHE_DIR) / ADMISSION_DIR
+    root.mkdir(parents=True, exist_ok=True)
+    while True:
+        for index in range(limit):
+            slot_file = open(root / f'{request_class}-{index}.lock', 'a')
+            try:
+                fcntl.flock(slot_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                slot_file.close()
+                continue
+            # закрытие файла освобождает слот, в том числе при падении процесса
+            with slot_file:
+                yield True
+            return
+        if time.monotonic() >= deadline:
+            yield False
+            return
+        time.sleep(POLL_INTERVAL)
@@ -4,3 +4,39 @@ from django.apps import AppConfig
 class CalculatorConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'calculator'
+
+    def ready(self):
+        from . import signals  # noqa: F401
+
+    def warm_up(self):
+        """
+        Ряды цен, индекс удельных показателей, безубыточность по умолчанию (EV против ICE)
+        и графики калькулятора для стандартного сценария (импорт pandas/plotly)
+        """
+        from django.template.loader import get_template
+        from vehicles.catalogue import VEHICLE_MODELS
+        from vehicles.models import BaseVehicle
+        from .engines.breakeven import BreakEvenSolver
+        from .engines.prices import load_price_series
+        from .engines.ranking import metrics_index
+        from .metrics import REFERENCE_DISTANCE_KM, STANDARD_ENERGY_SOURCE, STANDARD_ROAD_TYPE
+        from .views import BreakEvenView, CalculateView
+
+        load_price_series()
+        for road_type, _ in BaseVehicle.ROAD_TYPES:
+            metrics_index.view(road_type, STANDARD_ENERGY_SOURCE)
+        metrics_index.pareto(energy_source=STANDARD_ENERGY_SOURCE)
+        BreakEvenSolver.solve_catalogue('EV', 'ICE', driving_conditions=STANDARD_ROAD_TYPE)
+
+        view = CalculateView()
+        results = view.calculate_results({
+            'analysis_type': 'single',
+            'distance_km': REFERENCE_DISTANCE_KM,
+            'road_type': STANDARD_ROAD_TYPE,
+            'energy_source': STANDARD_ENERGY_SOURCE,
+            **{field: model.objects.first() for field, model in zip(
+                ('ice_vehicle', 'ev_vehicle', 'hevv_vehicle', 'phevv_vehicle'), VEHICLE_MODELS.values())},
+        })
+        view.create_plots(results)
+        for template_name in (CalculateView.template_name, BreakEvenView.template_name):
+            get_template(template_name)
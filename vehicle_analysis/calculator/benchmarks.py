@@ -0,0 +1,318 @@
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from datetime import date, datetime, timedelta
+
+import numpy as np
+
+from vehicles.display import vehicle_label
+from vehicles.synthetic import synthetic_arrays, synthetic_vehicles
+from .engines.cost import TCOService
+from .engines.dynamics import VehicleDynamics
+from .engines.emissions import EmissionsCalculator
+from .engines.energy import EnergyCalculator
+from .engines.scenarios import MAX_SCENARIOS, evaluate_scenarios, parse_scenarios
+
+VEHICLE_TYPES = ('ICE', 'EV', 'HEV', 'PHEV')
+DEFAULT_SIZES = (1_000, 10_000, 100_000, 1_000_000)
+DEFAULT_HORIZONS = (30, 365, 3650)  # дней
+SIMULATION_VEHICLES = 4  # ТС на одну точку симуляции (по одному циклу run_simulation на ТС)
+PLOT_ROWS_LIMIT = 1_000  # графики калькулятора строятся не более чем по стольким ТС
+TABLE_ROWS = 10_000  # строк в замерах рендеринга таблиц
+SCENARIO_CATALOGUE_SIZE = 1_000  # ТС каждого типа в каталоге для пакетных сценариев
+SCENARIO_AVERAGE_SHARE = 0.1  # доля сценариев «среднее по типу»
+START_DATE = date(2024, 1, 1)
+DEFAULT_THRESHOLD = 0.2  # допустимое замедление относительно базовой линии
+STARTUP_BUDGET_MS = 600  # импорт Django, приложений и URLconf в новом процессе
+HEAVY_MODULES = ('pandas', 'plotly', 'scipy', 'matplotlib')  # не должны загружаться при старте воркера
+
+# выполняется в отдельном процессе: старт воркера до первого запроса (настройка Django и URLconf)
+_STARTUP_SCRIPT = '''
+import json, sys, time
+start = time.perf_counter()
+import django
+django.setup()
+from django.urls import get_resolver
+get_resolver().url_patterns
+elapsed = time.perf_counter() - start
+print(json.dumps({'import_s': elapsed, 'heavy': [m for m in %r if m in sys.modules]}))
+'''
+
+
+def measure(func, repeat):
+    """Лучшее и медианное время вызова func (сек)"""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return min(timings), statistics.median(timings)
+
+
+def _repeat_for(size):
+    return 5 if size <= 10_000 else 3 if size <= 100_000 else 1
+
+
+def _result(name, vehicle_type, size, horizon_days, timings, items):
+    best, median = timings
+    return {
+        'name': name,
+        'vehicle_type': vehicle_type,
+        'size': size,
+        'horizon_days': horizon_days,
+        'best_s': best,
+        'median_s': median,
+        'per_item_us': best / items * 1e6 if items else None,
+    }
+
+
+def benchmark_catalogue(vehicle_type, size, seed=0):
+    """Векторные движки на синтетическом каталоге из size ТС"""
+    vehicles = synthetic_arrays(vehicle_type, size, seed)
+    dynamics = VehicleDynamics()
+    repeat = _repeat_for(size)
+    cases = {
+        'energy': lambda: EnergyCalculator.calculate_energy_consumption(vehicles, 100, 'mixed'),
+        'emissions': lambda: EmissionsCalculator.calculate_co2(vehicles, 100, 'eu_avg', 'mixed'),
+        'tco': lambda: TCOService.calculate_tco(vehicles, None, 'mixed'),
+        'dynamics': lambda: dynamics.calculate_required_force(vehicles, 100, 0),
+    }
+    return [_result(name, vehicle_type, size, None, measure(func, repeat), size) for name, func in cases.items()]
+
+
+def benchmark_simulation(vehicle_type, horizon_days, seed=0):
+    """run_simulation для SIMULATION_VEHICLES ТС на горизонте horizon_days"""
+    from vehicle_simulation.engines.simulator import run_simulation
+
+    vehicles = synthetic_vehicles(vehicle_type, SIMULATION_VEHICLES, seed)
+    end_date = START_DATE + timedelta(days=horizon_days - 1)
+
+    def run():
+        return [run_simulation(v, START_DATE, end_date, 50, daily_hours=8) for v in vehicles]
+
+    timings = measure(run, 3 if horizon_days <= 365 else 1)
+    return _result('simulation', vehicle_type, len(vehicles), horizon_days, timings, len(vehicles) * horizon_days)
+
+
+def benchmark_simulation_plots(horizon_days, seed=0):
+    """Графики симулятора (SimulationView._generate_plots) по одному ТС каждого типа"""
+    from vehicle_simulation.engines.simulator import run_simulation
+    from vehicle_simulation.views import SimulationView
+
+    end_date = START_DATE + timedelta(days=horizon_days - 1)
+    results = [
+        {'vehicle': vehicle, 'name': vehicle_label(vehicle), 'vehicle_type': vehicle_type,
+         'daily': run_simulation(vehicle, START_DATE, end_date, 50)}
+        for vehicle_type in VEHICLE_TYPES
+        for vehicle in synthetic_vehicles(vehicle_type, 1, seed)
+    ]
+    timings = measure(lambda: SimulationView()._generate_plots(results), 3)
+    return _result('simulation_plots', 'all', len(results), horizon_days, timings, len(results) * horizon_days)
+
+
+def calculator_results(rows, seed=0):
+    """Строки результатов калькулятора (как CalculateView.calculate_results) для rows синтетических ТС"""
+    results = []
+    for vehicle_type in VEHICLE_TYPES:
+        vehicles = synthetic_vehicles(vehicle_type, rows // len(VEHICLE_TYPES), seed)
+        for vehicle in vehicles:
+            energy = EnergyCalculator.calculate_energy_consumption(vehicle, 100, 'mixed')
+            results.append({
+                'vehicle': vehicle,
+                'name': vehicle_label(vehicle),
+                'vehicle_type': vehicle_type,
+                'vehicle_id': vehicle.pk,
+                'energy_kwh': energy.get('energy_kwh'),
+                'fuel_liters': energy.get('fuel_liters'),
+                'emissions': EmissionsCalculator.calculate_co2(vehicle, 100, 'eu_avg', 'mixed'),
+                'tco': TCOService.calculate_tco(vehicle, 100, 'mixed')['tco_total'],
+            })
+    return results
+
+
+def benchmark_calculator_plots(size, seed=0):
+    """Графики калькулятора (CalculateView.create_plots) по min(size, PLOT_ROWS_LIMIT) ТС"""
+    from .views import CalculateView
+
+    results = calculator_results(min(size, PLOT_ROWS_LIMIT), seed)
+    timings = measure(lambda: CalculateView().create_plots(results), 3)
+    return _result('calculator_plots', 'all', len(results), None, timings, len(results))
+
+
+def benchmark_tables(size, seed=0):
+    """
+    Рендеринг таблиц из size строк вместе с подготовкой полей вывода в представлении:
+    каталог (vehicles/list.html, строки VehicleMetrics), результаты калькулятора и итоги симулятора
+    """
+    from django.template.loader import render_to_string
+    from vehicle_simulation.views import SimulationView
+    from vehicles.views import VehicleListView
+    from .metrics import compute_vehicle_metrics
+    from .views import CalculateView
+
+    per_type = size // len(VEHICLE_TYPES)
+    metrics = [row for vehicle_type in VEHICLE_TYPES
+               for row in compute_vehicle_metrics(synthetic_arrays(vehicle_type, per_type, seed))]
+    results = calculator_results(size, seed)
+    summaries = [
+        {'name': row['name'], 'vehicle_type': row['vehicle_type'], 'summary': {
+            'fuel_liters': row['fuel_liters'] or 0, 'energy_kwh': row['energy_kwh'] or 0,
+            'co2_g': row['emissions'], 'cost_rub': row['tco']}}
+        for row in results
+    ]
+
+    def catalogue():
+        return {'vehicles': VehicleListView()._load(metrics), 'fragment_timeout': 0}
+
+    def calculator():
+        CalculateView.add_display_fields(results)
+        return {'show_results': True, 'results': results, 'plots': {}}
+
+    def simulation():
+        for item in summaries:
+            item['display'] = SimulationView.summary_display(item['summary'])
+        return {'show_results': True, 'results': summaries, 'plots': {}}
+
+    cases = {
+        'table_catalogue': ('vehicles/list.html', catalogue),
+        'table_calculator': ('calculator/results.html', calculator),
+        'table_simulation': ('vehicle_simulation/results.html', simulation),
+    }
+    return [
+        _result(name, 'all', size, None, measure(lambda: render_to_string(template, context()), 3), size)
+        for name, (template, context) in cases.items()
+    ]
+
+
+def benchmark_scenarios(size, seed=0):
+    """Пакет из size сценариев (разбор и векторный расчет) на синтетическом каталоге"""
+    catalogues = {vtype: synthetic_arrays(vtype, SCENARIO_CATALOGUE_SIZE, seed) for vtype in VEHICLE_TYPES}
+    rng = np.random.default_rng(seed)
+    payload = {'scenarios': [
+        {
+            'vehicle_type': str(vehicle_type),
+            'vehicle_id': None if average else int(vehicle_id),
+            'distance_km': float(distance),
+            'road_type': str(road_type),
+            'fuel_price': float(fuel_price),
+        }
+        for vehicle_type, vehicle_id, average, distance, road_type, fuel_price in zip(
+            rng.choice(VEHICLE_TYPES, size), rng.integers(1, SCENARIO_CATALOGUE_SIZE + 1, size),
+            rng.random(size) < SCENARIO_AVERAGE_SHARE, rng.integers(1_000, 300_000, size),
+            rng.choice(['city', 'highway', 'mixed'], size), rng.integers(40, 80, size),
+        )
+    ]}
+    timings = measure(lambda: evaluate_scenarios(parse_scenarios(payload), catalogues), _repeat_for(size))
+    return _result('scenarios', 'all', size, None, timings, size)
+
+
+def measure_startup():
+    """
+    Холодный старт в новом интерпретаторе
+
+    :return: (время импорта до готовности URLconf, полное время процесса, загруженные тяжелые модули)
+    """
+    from django.conf import settings
+
+    env = dict(os.environ, DJANGO_SETTINGS_MODULE=settings.SETTINGS_MODULE)
+    start = time.perf_counter()
+    output = subprocess.run(
+        [sys.executable, '-c', _STARTUP_SCRIPT % (HEAVY_MODULES,)],
+        cwd=settings.BASE_DIR, env=env, capture_output=True, text=True, check=True,
+    ).stdout
+    wall = time.perf_counter() - start
+    result = json.loads(output.strip().splitlines()[-1])
+    return result['import_s'], wall, result['heavy']
+
+
+def benchmark_startup(repeat=5):
+    """Время старта процесса (лучшее и медиана по repeat запускам) и тяжелые модули, попавшие в импорт"""
+    runs = [measure_startup() for _ in range(repeat)]
+    imports = [run[0] for run in runs]
+    result = _result('startup', 'all', 0, None, (min(imports), statistics.median(imports)), 0)
+    result['process_s'] = min(run[1] for run in runs)
+    result['heavy_modules'] = sorted({module for run in runs for module in run[2]})
+    return result
+
+
+def run_benchmarks(sizes=DEFAULT_SIZES, horizons=DEFAULT_HORIZONS, vehicle_types=VEHICLE_TYPES,
+                   seed=0, plots=True, log=None):
+    """
+    Полный прогон: старт процесса, движки по размерам каталога, симуляция по горизонтам,
+    пакетные сценарии (до MAX_SCENARIOS) и графики
+    """
+    results = []
+
+    def add(result):
+        results.append(result)
+        if log:
+            log(result)
+
+    add(benchmark_startup())
+    for vehicle_type in vehicle_types:
+        for size in sizes:
+            for result in benchmark_catalogue(vehicle_type, size, seed):
+                add(result)
+        for horizon in horizons:
+            add(benchmark_simulation(vehicle_type, horizon, seed))
+    for size in sorted({min(size, MAX_SCENARIOS) for size in sizes}):
+        add(benchmark_scenarios(size, seed))
+    if plots:
+        for size in sorted({min(size, PLOT_ROWS_LIMIT) for size in sizes}):
+            add(benchmark_calculator_plots(size, seed))
+        for horizon in horizons:
+            add(benchmark_simulation_plots(horizon, seed))
+        for result in benchmark_tables(TABLE_ROWS, seed):
+            add(result)
+
+    return {
+        'meta': {
+            'created_at': datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'platform': platform.platform(),
+            'seed': seed,
+        },
+        'results': results,
+    }
+
+
+def _key(result):
+    return result['name'], result['vehicle_type'], result['size'], result['horizon_days']
+
+
+def compare(current, baseline, threshold=DEFAULT_THRESHOLD):
+    """
+    Сравнение с базовой линией по лучшему времени
+
+    :return: список {'key', 'baseline_s', 'current_s', 'ratio', 'regression'} для общих замеров
+    """
+    baseline_results = {_key(r): r for r in baseline['results']}
+    rows = []
+    for result in current['results']:
+        base = baseline_results.get(_key(result))
+        if base is None:
+            continue
+        ratio = result['best_s'] / base['best_s'] if base['best_s'] else float('inf')
+        rows.append({
+            'key': _key(result),
+            'baseline_s': base['best_s'],
+            'current_s': result['best_s'],
+            'ratio': ratio,
+            'regression': ratio > 1 + threshold,
+        })
+    return rows
+
+
+def save(report, path):
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+
+
+def load(path):
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
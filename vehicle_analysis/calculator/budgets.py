@@ -0,0 +1,151 @@
+import json
+import tracemalloc
+from collections import Counter
+from datetime import timedelta
+
+from django.core.cache import cache
+from django.db import connection, reset_queries
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+
+from vehicles.catalogue import VEHICLE_MODELS
+from .loadtest import SINGLE_FIELDS, START_DATE, VEHICLE_TYPES
+
+# В холодном проходе запрос может впервые для версии каталога загрузить столбцы ТС
+# (VehicleArrays, индекс показателей) - по одному запросу на тип ТС сверх бюджета
+COLD_EXTRA_QUERIES = len(VEHICLE_MODELS)
+
+
+def _simulation(days, **extra):
+    data = {
+        'start_date': START_DATE.isoformat(),
+        'end_date': (START_DATE + timedelta(days=days - 1)).isoformat(),
+        'daily_distance': 50,
+        'daily_hours': 8,
+        'energy_source': 'eu_avg',
+        'driving_conditions': 'mixed',
+    }
+    data.update(extra)
+    return data
+
+
+def _scenarios(ids, count=500):
+    """Пакет сценариев для api/scenarios/: конкретные ТС и средние по типу вперемешку"""
+    types = [vtype for vtype in VEHICLE_TYPES if ids[vtype]]
+    roads = ('city', 'highway', 'mixed')
+    return json.dumps({'defaults': {'energy_source': 'eu_avg'}, 'scenarios': [
+        {'vehicle_type': types[i % len(types)], 'vehicle_id': ids[types[i % len(types)]] if i % 5 else None,
+         'distance_km': 1000 + 100 * i, 'road_type': roads[i % len(roads)]}
+        for i in range(count)
+    ]})
+
+
+def view_cases(ids):
+    """Набор проверяемых запросов; ids - первые id ТС каждого типа"""
+    detail_type = next(vtype for vtype in VEHICLE_TYPES if ids[vtype])
+    singles = {SINGLE_FIELDS[vtype]: ids[vtype] for vtype in VEHICLE_TYPES if ids[vtype]}
+    calculator = {'distance_km': 20000, 'road_type': 'mixed', 'energy_source': 'eu_avg'}
+    # (имя, метод, путь, данные POST (строка - тело JSON) или None, макс. запросов к БД, макс. пик памяти КБ)
+    # Число запросов не зависит от размера каталога (формы - по одному запросу на тип ТС),
+    # поэтому его рост означает N+1; память - с запасом ~1.5x на каталог seed_catalogue.
+    return [
+        ('vehicle_list', 'GET', '/', None, 2, 12_288),
+        ('vehicle_list_filtered', 'GET', '/?type=EV&sort=tco_per_km', None, 2, 2_048),
+        ('vehicle_detail', 'GET', f'/{detail_type}/{ids[detail_type]}/', None, 2, 256),
+        ('calculator_form', 'GET', '/calculator/', None, 4, 16_384),
+        ('calculator_single', 'POST', '/calculator/',
+         {'analysis_type': 'single', **calculator, **singles}, 8, 49_152),
+        ('calculator_type_avg', 'POST', '/calculator/',
+         {'analysis_type': 'type_avg', 'compare_types': VEHICLE_TYPES, **calculator}, 8, 49_152),
+        ('breakeven', 'GET', '/calculator/breakeven/', None, 1, 1_024),
+        ('breakeven_api', 'GET', '/calculator/api/breakeven/?baseline_type=ICE&candidate_type=EV&limit=20',
+         None, 1, 20_480),
+        ('ranking_api', 'GET', '/calculator/api/ranking/?k=20', None, 1, 256),
+        ('pareto_api', 'GET', '/calculator/api/pareto/', None, 1, 256),
+        ('whatif_api', 'GET', '/calculator/api/whatif/?rows={}&distance_km=20000&road_type=mixed'
+         '&energy_source=eu_avg&changed=distance_km'.format(','.join(VEHICLE_TYPES)), None, 1, 512),
+        ('scenarios_api', 'POST', '/calculator/api/scenarios/', _scenarios(ids), 1, 2_048),
+        ('simulation_form', 'GET', '/vehicle_simulation/', None, 4, 16_384),
+        ('simulation_single', 'POST', '/vehicle_simulation/',
+         _simulation(365, analysis_type='single', **singles), 8, 49_152),
+        ('simulation_type_avg', 'POST', '/vehicle_simulation/',
+         _simulation(365, analysis_type='type_avg', compare_types=VEHICLE_TYPES), 8, 49_152),
+        ('simulation_fleet', 'POST', '/vehicle_simulation/fleet/', {
+            'fleet': '\n'.join(f'{vtype} {ids[vtype]} 250 50' for vtype in VEHICLE_TYPES if ids[vtype]),
+            **_simulation(365, fuel_grade='petrol', unit_cv=25, daily_cv=30),
+        }, 4, 40_960),
+        ('simulation_runs', 'GET', '/vehicle_simulation/runs/', None, 2, 1_024),
+        ('metrics', 'GET', '/metrics', None, 5, 512),
+    ]
+
+
+def first_ids():
+    """Наименьший id каждого типа ТС (None для пустой таблицы)"""
+    return {vtype: model.objects.order_by('id').values_list('id', flat=True).first()
+            for vtype, model in VEHICLE_MODELS.items()}
+
+
+def measure_view(client, method, path, data=None):
+    """Один вызов представления: (код ответа, SQL-запросы, пиковый прирост памяти в КБ)"""
+    if method == 'POST' and isinstance(data, str):
+        def send(path, data):
+            return client.post(path, data, content_type='application/json')
+    else:
+        send = client.post if method == 'POST' else client.get
+
+    reset_queries()
+    tracemalloc.start()
+    try:
+        baseline = tracemalloc.get_traced_memory()[0]
+        tracemalloc.reset_peak()
+        with CaptureQueriesContext(connection) as queries:
+            response = send(path, data) if data is not None else send(path)
+        peak = tracemalloc.get_traced_memory()[1] - baseline
+    finally:
+        tracemalloc.stop()
+    return response.status_code, [q['sql'] for q in queries.captured_queries], peak / 1024
+
+
+def check_views(only=None, scale=1.0):
+    """
+    Замер всех представлений из view_cases (или только имен из only) в два прохода:
+    холодный - после очистки кэша Django (фрагменты каталога и т. п.), теплый - повторный вызов.
+    Бюджет запросов проверяется в обоих проходах (в холодном - с запасом COLD_EXTRA_QUERIES),
+    бюджет памяти - в теплом (в холодный попадают кэши процесса: каталог, профили сети).
+
+    :param scale: множитель бюджетов памяти (например, для большего каталога)
+    :return: список {'name', 'status', 'cold_queries', 'queries', 'max_queries', 'peak_kb', 'max_peak_kb',
+        'duplicates', 'failures'}
+    """
+    client = Client()
+    rows = []
+    for name, method, path, data, max_queries, max_peak_kb in view_cases(first_ids()):
+        if only and name not in only:
+            continue
+        cache.clear()
+        cold_status, cold_queries, _ = measure_view(client, method, path, data)
+        status, queries, peak_kb = measure_view(client, method, path, data)
+        max_peak_kb *= scale
+        duplicates = {sql: count for sql, count in Counter(queries).items() if count > 1}
+        failures = []
+        for label, code in (("холодный", cold_status), ("теплый", status)):
+            if code >= 400:
+                failures.append(f"{label}: код ответа {code}")
+        if len(cold_queries) > max_queries + COLD_EXTRA_QUERIES:
+            failures.append(f"холодный: запросов {len(cold_queries)} > {max_queries + COLD_EXTRA_QUERIES}")
+        if len(queries) > max_queries:
+            failures.append(f"запросов {len(queries)} > {max_queries}")
+        if peak_kb > max_peak_kb:
+            failures.append(f"пик памяти {peak_kb:.0f} КБ > {max_peak_kb:.0f} КБ")
+        rows.append({
+            'name': name,
+            'status': status,
+            'cold_queries': len(cold_queries),
+            'queries': len(queries),
+            'max_queries': max_queries,
+            'peak_kb': peak_kb,
+            'max_peak_kb': max_peak_kb,
+            'duplicates': duplicates,
+            'failures': failures,
+        })
+    return rows
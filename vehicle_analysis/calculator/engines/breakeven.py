@@ -0,0 +1,175 @@
+import numpy as np
+from django.core.cache import cache
+
+from calculator import prometheus
+from calculator.instrumentation import engine_call
+from calculator.singleflight import input_hash
+from vehicles.catalogue import VehicleArrays, get_catalogue_state
+from .cost import TCOService
+
+
+class BreakEvenSolver:
+    """
+    Точка безубыточности: пробег, после которого ТС A становится дешевле ТС B.
+
+    TCO ДВС/EV/HEV линейна по пробегу (fixed + per_km * d), поэтому для таких пар
+    точка находится в замкнутой форме сразу для всей матрицы пар. TCO PHEV кусочно-линейна
+    (электротяга до запаса хода, затем ДВС) - для пар с PHEV используется
+    векторизованное деление пополам на отрезке, где меняется знак разности.
+    """
+
+    MAX_DISTANCE_KM = 2_000_000  # верхняя граница поиска (км)
+    BISECTION_STEPS = 50
+    MAX_PAIRS = 2_000_000  # ограничение размера матрицы пар
+    CACHE_TIMEOUT = 60 * 60  # сек
+
+    @classmethod
+    @engine_call('breakeven')
+    def solve(cls, candidates, baselines, driving_conditions='mixed', prices=None):
+        """
+        Пробег безубыточности для всех пар (кандидат, базовое ТС)
+
+        :param candidates: VehicleArrays - ТС, для которых ищется окупаемость
+        :param baselines: VehicleArrays - ТС, с которыми сравниваем
+        :param prices: ценовой сценарий из TCOService.get_prices
+        :return: словарь матриц (len(candidates) x len(baselines)):
+                 distance_km (0 - кандидат дешевле сразу, inf - не окупается никогда),
+                 payback_years
+        """
+        prices = prices or TCOService.get_prices()
+        if len(candidates) * len(baselines) > cls.MAX_PAIRS:
+            raise ValueError(f"Слишком много пар: {len(candidates)} x {len(baselines)}")
+
+        a = candidates.expand(0)
+        b = baselines.expand(1)
+
+        if 'PHEV' in (candidates.vehicle_type, baselines.vehicle_type):
+            distance = cls._solve_piecewise(a, b, driving_conditions, prices)
+        else:
+            distance = cls._solve_linear(a, b, driving_conditions, prices)
+
+        return {
+            'distance_km': distance,
+            'payback_years': distance / TCOService.ANNUAL_KM,
+        }
+
+    @classmethod
+    def _cost_difference(cls, a, b, distance_km, driving_conditions, prices):
+        """Разность TCO(A) - TCO(B) на заданном пробеге"""
+        return (TCOService._calculate_total_cost(a, distance_km, driving_conditions, prices)
+                - TCOService._calculate_total_cost(b, distance_km, driving_conditions, prices))
+
+    @classmethod
+    def _solve_linear(cls, a, b, driving_conditions, prices):
+        """Замкнутая форма: d* = (fixed_a - fixed_b) / (per_km_b - per_km_a)"""
+        upfront = cls._cost_difference(a, b, 0.0, driving_conditions, prices)
+        slope = cls._cost_difference(a, b, 1.0, driving_conditions, prices) - upfront
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            distance = np.where(slope < 0, upfront / -slope, np.inf)
+        distance = np.where(upfront <= 0, 0.0, distance)
+        return np.where(np.isnan(upfront) | np.isnan(slope), np.nan, distance)
+
+    @classmethod
+    def _solve_piecewise(cls, a, b, driving_conditions, prices):
+        """Деление пополам на первом отрезке между изломами, где разность меняет знак"""
+        shape = np.broadcast_shapes(a.id.shape, b.id.shape)
+        breakpoints = [np.zeros(shape), np.full(shape, float(cls.MAX_DISTANCE_KM))]
+        for side in (a, b):
+            if side.vehicle_type == 'PHEV':
+                electric_range = TCOService.phev_electric_range_km(side, driving_conditions)
+                breakpoints.append(np.broadcast_to(np.clip(electric_range, 0, cls.MAX_DISTANCE_KM), shape))
+        points = np.sort(np.stack(breakpoints), axis=0)
+        diffs = np.stack([cls._cost_difference(a, b, p, driving_conditions, prices) for p in points])
+
+        distance = np.full(shape, np.inf)
+        distance[diffs[0] <= 0] = 0.0
+        lo = np.zeros(shape)
+        hi = np.zeros(shape)
+        pending = diffs[0] > 0
+        for i in range(1, len(points)):
+            crossing = pending & (diffs[i] <= 0)
+            lo[crossing] = points[i - 1][crossing]
+            hi[crossing] = points[i][crossing]
+            pending &= ~crossing
+
+        bracketed = (diffs[0] > 0) & ~pending
+        for _ in range(cls.BISECTION_STEPS):
+            mid = (lo + hi) / 2
+            positive = cls._cost_difference(a, b, mid, driving_conditions, prices) > 0
+            lo = np.where(positive, mid, lo)
+            hi = np.where(positive, hi, mid)
+        distance[bracketed] = hi[bracketed]
+        distance[np.isnan(diffs).any(axis=0)] = np.nan
+        return distance
+
+    @classmethod
+    def solve_catalogue(cls, candidate_type, baseline_type, baseline_id=None,
+                        driving_conditions='mixed', prices=None):
+        """
+        Безубыточность по каталогу (кэшируется по ценовому сценарию и версии каталога)
+
+        :param baseline_id: если задан - сравнение всех кандидатов с одним базовым ТС,
+                            иначе - все пары кандидат x базовое ТС
+        :return: словарь столбцов, отсортированных по пробегу безубыточности
+        """
+        prices = prices or TCOService.get_prices()
+        state = get_catalogue_state()
+        # в ключе - все цены сценария, включая коэффициенты дисконтирования цен на срок службы
+        key = 'breakeven:{}:{}:{}:{}:{}:{}'.format(
+            state[0], candidate_type, baseline_type, baseline_id or '*',
+            driving_conditions, input_hash('breakeven_prices', prices),
+        )
+        columns = cache.get(key)
+        prometheus.CACHE_REQUESTS.inc(cache='breakeven', result='miss' if columns is None else 'hit')
+        if columns is not None:
+            return columns
+
+        candidates = VehicleArrays.shared(candidate_type, state)
+        baselines = VehicleArrays.shared(baseline_type, state)
+        if baseline_id is not None:
+            baselines = baselines.take(baselines.id == baseline_id)
+
+        solution = cls.solve(candidates, baselines, driving_conditions, prices)
+        distance = solution['distance_km']
+        valid = ~np.isnan(distance)
+        if candidate_type == baseline_type:
+            valid &= candidates.id[:, None] != baselines.id[None, :]
+        i, j = np.nonzero(valid)
+        order = np.argsort(distance[i, j], kind='stable')
+        i, j = i[order], j[order]
+
+        columns = {
+            'candidate_id': candidates.id[i],
+            'candidate': np.array(candidates.labels(), dtype=object)[i],
+            'baseline_id': baselines.id[j],
+            'baseline': np.array(baselines.labels(), dtype=object)[j],
+            'distance_km': distance[i, j],
+            'payback_years': solution['payback_years'][i, j],
+        }
+        cache.set(key, columns, cls.CACHE_TIMEOUT)
+        return columns
+
+    @classmethod
+    def build_table(cls, candidate_type, baseline_type, baseline_id=None,
+                    driving_conditions='mixed', prices=None, limit=100, payback_only=False):
+        """
+        Строки таблицы безубыточности (первые limit пар по возрастанию пробега)
+
+        :param payback_only: только пары, где кандидат окупается на конечном пробеге > 0
+        """
+        columns = cls.solve_catalogue(candidate_type, baseline_type, baseline_id, driving_conditions, prices)
+        if payback_only:
+            mask = (columns['distance_km'] > 0) & np.isfinite(columns['distance_km'])
+            columns = {name: values[mask] for name, values in columns.items()}
+        return [{
+            'candidate_id': int(candidate_id),
+            'candidate': candidate,
+            'baseline_id': int(baseline_id_),
+            'baseline': baseline,
+            'distance_km': None if np.isinf(distance) else float(distance),
+            'payback_years': None if np.isinf(years) else float(years),
+        } for candidate_id, candidate, baseline_id_, baseline, distance, years in zip(
+            *(columns[name][:limit] for name in (
+                'candidate_id', 'candidate', 'baseline_id', 'baseline', 'distance_km', 'payback_years'))
+        )]
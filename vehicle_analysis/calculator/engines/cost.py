@@ -1,4 +1,7 @@
-from vehicles.models import ICEVehicle, EVVehicle, HEVVehicle, PHEVVehicle
+import numpy as np
+
+from calculator.instrumentation import engine_call
+from .prices import load_price_series, FUEL_COLUMNS, ELECTRICITY_COLUMN, MONTHS_PER_YEAR
 
 
 class TCOService:
@@ -15,46 +18,109 @@ class TCOService:
     DISPOSAL_COST_EV = 100000  # утилизация электромобиля (руб)
     FUEL_PRICE = 55  # руб/л (средняя цена бензина)
     ELECTRICITY_PRICE = 5  # руб/кВт·ч (средний тариф)
+    HYBRID_FUEL_PRICE = 50  # руб/л (цена топлива в расчете гибридов)
     PHEV_ELECTRIC_RANGE_FACTOR = 0.8  # Коэффициент использования электрического диапазона
 
+    # Коэффициенты влияния типа дороги на расход PHEV
+    PHEV_ROAD_TYPE_FACTORS = {
+        'city': {'electric': 1.2, 'fuel': 1.3},  # Городской цикл (частые остановки)
+        'highway': {'electric': 0.9, 'fuel': 0.85},  # Трасса (равномерное движение)
+        'mixed': {'electric': 1.0, 'fuel': 1.0}  # Смешанный режим
+    }
+
     @classmethod
-    def calculate_tco(cls, vehicle, distance_km=None, driving_conditions=None):
+    def get_prices(cls, fuel_price=None, electricity_price=None):
+        """
+        Ценовой сценарий для расчетов
+
+        :param fuel_price: цена топлива (руб/л), None - значения по умолчанию
+        :param electricity_price: цена электроэнергии (руб/кВт·ч)
+        :return: словарь цен {'fuel', 'hybrid_fuel', 'electricity'}
+        """
+        return {
+            'fuel': cls.FUEL_PRICE if fuel_price is None else fuel_price,
+            'hybrid_fuel': cls.HYBRID_FUEL_PRICE if fuel_price is None else fuel_price,
+            'electricity': cls.ELECTRICITY_PRICE if electricity_price is None else electricity_price,
+        }
+
+    @classmethod
+    def get_daily_prices(cls, start_date, end_date, fuel_grade='petrol', inflation=0.0):
+        """
+        Ценовой сценарий по рядам цен: массивы цен на каждый день периода
+
+        :param fuel_grade: 'petrol' или 'diesel'
+        :param inflation: годовая индексация цен после окончания ряда (0.05 = 5%)
+        """
+        series = load_price_series()
+        return cls.get_prices(
+            series.daily(FUEL_COLUMNS[fuel_grade], start_date, end_date, inflation),
+            series.daily(ELECTRICITY_COLUMN, start_date, end_date, inflation),
+        )
+
+    @classmethod
+    def get_lifetime_prices(cls, start_date, fuel_grade='petrol', inflation=0.0, discount_rate=0.0):
+        """
+        Ценовой сценарий на срок службы с начала эксплуатации start_date.
+
+        Пробег распределяется по месяцам срока равномерно, поэтому цена энергии -
+        среднее помесячных цен, взвешенных коэффициентами дисконтирования.
+        Прочие текущие расходы умножаются на средний коэффициент дисконтирования
+        (running_discount), утилизация - на коэффициент конца срока (residual_discount).
+
+        :param discount_rate: годовая ставка дисконтирования (0 - без приведения, NPV = сумма)
+        """
+        n_months = cls.LIFETIME_YEARS * MONTHS_PER_YEAR
+        series = load_price_series()
+        discount = (1 + discount_rate) ** -((np.arange(n_months) + 0.5) / MONTHS_PER_YEAR)
+        prices = cls.get_prices(
+            float(np.mean(series.monthly(FUEL_COLUMNS[fuel_grade], start_date, n_months, inflation) * discount)),
+            float(np.mean(series.monthly(ELECTRICITY_COLUMN, start_date, n_months, inflation) * discount)),
+        )
+        prices['running_discount'] = float(np.mean(discount))
+        prices['residual_discount'] = (1 + discount_rate) ** -cls.LIFETIME_YEARS
+        return prices
+
+    @classmethod
+    @engine_call('tco')
+    def calculate_tco(cls, vehicle, distance_km=None, driving_conditions=None, prices=None):
         """
         Расчет полной стоимости владения
 
-        :param vehicle: объект Vehicle (ICEVehicle/EVVehicle/HEVVehicle)
+        :param vehicle: объект Vehicle (ICEVehicle/EVVehicle/HEVVehicle) или VehicleArrays
         :param distance_km: пробег за весь срок (если None - расчет по умолчанию)
+        :param prices: ценовой сценарий из get_prices / get_lifetime_prices (None - цены по умолчанию)
         :return: словарь с компонентами TCO
         """
         if distance_km is None:
             distance_km = cls.ANNUAL_KM * cls.LIFETIME_YEARS
 
         return {
-            'tco_total': cls._calculate_total_cost(vehicle, distance_km, driving_conditions),
-            'tco_per_km': cls._calculate_cost_per_km(vehicle, distance_km, driving_conditions),
-            'components': cls._calculate_cost_components(vehicle, distance_km, driving_conditions),
+            'tco_total': cls._calculate_total_cost(vehicle, distance_km, driving_conditions, prices),
+            'tco_per_km': cls._calculate_cost_per_km(vehicle, distance_km, driving_conditions, prices),
+            'components': cls._calculate_cost_components(vehicle, distance_km, driving_conditions, prices),
             'distance_km': distance_km,
             'lifetime_years': cls.LIFETIME_YEARS
         }
 
     @classmethod
-    def _calculate_total_cost(cls, vehicle, distance_km, driving_conditions):
+    def _calculate_total_cost(cls, vehicle, distance_km, driving_conditions, prices=None):
         """Общая стоимость владения"""
-        components = cls._calculate_cost_components(vehicle, distance_km, driving_conditions)
+        components = cls._calculate_cost_components(vehicle, distance_km, driving_conditions, prices)
         return sum(components.values())
 
     @classmethod
-    def _calculate_cost_per_km(cls, vehicle, distance_km, driving_conditions):
+    def _calculate_cost_per_km(cls, vehicle, distance_km, driving_conditions, prices=None):
         """Стоимость за 1 км"""
-        return cls._calculate_total_cost(vehicle, distance_km, driving_conditions) / distance_km
+        return cls._calculate_total_cost(vehicle, distance_km, driving_conditions, prices) / distance_km
 
     @classmethod
-    def _calculate_cost_components(cls, vehicle, distance_km, driving_conditions):
+    def _calculate_cost_components(cls, vehicle, distance_km, driving_conditions, prices=None):
         """Все компоненты стоимости"""
+        residual_discount = prices.get('residual_discount', 1) if prices else 1
         return {
             'production': cls._calculate_production_cost(vehicle),
-            'usage': cls._calculate_usage_cost(vehicle, distance_km, driving_conditions),
-            'recycling': cls._calculate_recycle_cost(vehicle)
+            'usage': cls._calculate_usage_cost(vehicle, distance_km, driving_conditions, prices),
+            'recycling': cls._calculate_recycle_cost(vehicle) * residual_discount
         }
 
     @classmethod
@@ -63,43 +129,48 @@ class TCOService:
         return vehicle.production_price*100
 
     @classmethod
-    def _calculate_usage_cost(cls, vehicle, distance_km, driving_conditions):
+    def _calculate_usage_cost(cls, vehicle, distance_km, driving_conditions, prices=None):
         """Эксплуатационные затраты"""
-        energy_cost = cls._calculate_energy_cost(vehicle, distance_km, driving_conditions)
+        energy_cost = cls._calculate_energy_cost(vehicle, distance_km, driving_conditions, prices)
         maintenance_cost = cls._calculate_maintenance_cost(vehicle, distance_km)
         insurance_cost = cls.INSURANCE_COST * cls.LIFETIME_YEARS
         tax_cost = vehicle.production_price * cls.TAX_RATE * cls.LIFETIME_YEARS
+        running_discount = prices.get('running_discount', 1) if prices else 1
 
-        return energy_cost + maintenance_cost + insurance_cost + tax_cost
+        return energy_cost + (maintenance_cost + insurance_cost + tax_cost) * running_discount
 
     @classmethod
-    def _calculate_energy_cost(cls, vehicle, distance_km, driving_conditions):
+    def _calculate_energy_cost(cls, vehicle, distance_km, driving_conditions, prices=None):
         """Затраты на энергию (топливо/электричество)"""
-        if isinstance(vehicle, ICEVehicle):
-            return cls._calculate_fuel_cost(vehicle, distance_km)
-        elif isinstance(vehicle, EVVehicle):
-            return cls._calculate_electricity_cost(vehicle, distance_km)
-        elif isinstance(vehicle, HEVVehicle):
-            return cls._calculate_hybrid_cost(vehicle, distance_km, driving_conditions)
-        elif isinstance(vehicle, PHEVVehicle):
-            return cls._calculate_phev_cost(vehicle, distance_km, driving_conditions)
+        prices = prices or cls.get_prices()
+        vehicle_type = getattr(vehicle, 'vehicle_type', None)
+        if vehicle_type == 'ICE':
+            return cls._calculate_fuel_cost(vehicle, distance_km, prices)
+        elif vehicle_type == 'EV':
+            return cls._calculate_electricity_cost(vehicle, distance_km, prices)
+        elif vehicle_type == 'HEV':
+            return cls._calculate_hybrid_cost(vehicle, distance_km, driving_conditions, prices)
+        elif vehicle_type == 'PHEV':
+            return cls._calculate_phev_cost(vehicle, distance_km, driving_conditions, prices)
         else:
             raise ValueError(f"Unsupported vehicle type: {type(vehicle)}")
 
     @classmethod
-    def _calculate_fuel_cost(cls, vehicle, distance_km):
+    def _calculate_fuel_cost(cls, vehicle, distance_km, prices=None):
         """Затраты на топливо для ДВС"""
+        prices = prices or cls.get_prices()
         fuel_consumption = vehicle.fuel_consumption_lp100km / 100  # л/км
-        return fuel_consumption * distance_km * cls.FUEL_PRICE
+        return fuel_consumption * distance_km * prices['fuel']
 
     @classmethod
-    def _calculate_electricity_cost(cls, vehicle, distance_km):
+    def _calculate_electricity_cost(cls, vehicle, distance_km, prices=None):
         """Затраты на электроэнергию"""
+        prices = prices or cls.get_prices()
         energy_consumption = vehicle.energy_consumption_kwhp100km / 100  # кВт·ч/км
-        return energy_consumption * distance_km * cls.ELECTRICITY_PRICE
+        return energy_consumption * distance_km * prices['electricity']
 
     @classmethod
-    def _calculate_hybrid_cost(cls, vehicle, distance_km, driving_conditions):
+    def _calculate_hybrid_cost(cls, vehicle, distance_km, driving_conditions, prices=None):
         """Расчет стоимости владения гибридом (HEV) на основе:
            - Расхода топлива (fuel_consumption_lp100km)
            - КПД ДВС (engine_efficiency)
@@ -110,10 +181,12 @@ class TCOService:
             vehicle: Объект с параметрами гибрида
             distance_km: Пройденное расстояние (км)
             driving_conditions: 'city' или 'highway'
+            prices: ценовой сценарий из get_prices
 
         Returns:
             Стоимость в рублях (или другой валюте)
         """
+        prices = prices or cls.get_prices()
         if driving_conditions == "city":
             ice_share = 0.3 + (vehicle.mass_kg / 2000) * 0.1
         else:
@@ -124,13 +197,13 @@ class TCOService:
         fuel_used_liters = (vehicle.fuel_consumption_lp100km * distance_km / 100) * ice_share
         effective_fuel_used = fuel_used_liters / vehicle.engine_efficiency
 
-        fuel_price_per_liter = 50
+        fuel_price_per_liter = prices['hybrid_fuel']
         fuel_cost = effective_fuel_used * fuel_price_per_liter
 
         return fuel_cost
 
     @classmethod
-    def _calculate_phev_cost(cls, vehicle, distance_km, driving_conditions):
+    def _calculate_phev_cost(cls, vehicle, distance_km, driving_conditions, prices=None):
         """
         Расчет стоимости поездки на PHEV в рублях с учетом типа дороги
         :param vehicle: объект PHEV с параметрами:
@@ -139,24 +212,16 @@ class TCOService:
             - kwh_100_km_battery_only: потребление энергии (кВтч/100км)
         :param distance_km: пробег (км)
         :param driving_conditions: тип дороги ('city', 'highway', 'mixed')
+        :param prices: ценовой сценарий из get_prices
         :return: словарь с детализацией расходов
         """
-        # Коэффициенты влияния типа дороги на расход
-        ROAD_TYPE_FACTORS = {
-            'city': {'electric': 1.2, 'fuel': 1.3},  # Городской цикл (частые остановки)
-            'highway': {'electric': 0.9, 'fuel': 0.85},  # Трасса (равномерное движение)
-            'mixed': {'electric': 1.0, 'fuel': 1.0}  # Смешанный режим
-        }
-
-        ELECTRICITY_PRICE_RUB = 5.0  # руб/кВт·ч
-        FUEL_PRICE_RUB = 55.0  # руб/литр
-
-        factors = ROAD_TYPE_FACTORS.get(driving_conditions, ROAD_TYPE_FACTORS['mixed'])
+        prices = prices or cls.get_prices()
+        factors = cls.PHEV_ROAD_TYPE_FACTORS.get(driving_conditions, cls.PHEV_ROAD_TYPE_FACTORS['mixed'])
 
         # Разделяем пробег на электротяге и ДВС
-        electric_range_km = vehicle.battery_only_range_km * factors['electric']
-        electric_distance = min(distance_km, electric_range_km)
-        ice_distance = max(0, distance_km - electric_range_km)
+        electric_range_km = cls.phev_electric_range_km(vehicle, driving_conditions)
+        electric_distance = np.minimum(distance_km, electric_range_km)
+        ice_distance = np.maximum(0, distance_km - electric_range_km)
 
         # Расчет потребления с учетом типа дороги
         electric_consumption_kwh = (vehicle.kwh_100_km_battery_only / 100) * electric_distance * factors['electric']
@@ -166,19 +231,26 @@ class TCOService:
         fuel_consumption_liters = (fuel_consumption_l_100km / 100) * ice_distance
 
         # Расчет стоимости
-        electricity_cost_rub = electric_consumption_kwh * ELECTRICITY_PRICE_RUB
-        fuel_cost_rub = fuel_consumption_liters * FUEL_PRICE_RUB
+        electricity_cost_rub = electric_consumption_kwh * prices['electricity']
+        fuel_cost_rub = fuel_consumption_liters * prices['fuel']
 
         return electricity_cost_rub + fuel_cost_rub
 
+    @classmethod
+    def phev_electric_range_km(cls, vehicle, driving_conditions):
+        """Пробег PHEV на электротяге, после которого включается ДВС"""
+        factors = cls.PHEV_ROAD_TYPE_FACTORS.get(driving_conditions, cls.PHEV_ROAD_TYPE_FACTORS['mixed'])
+        return vehicle.battery_only_range_km * factors['electric']
+
     @classmethod
     def _calculate_maintenance_cost(cls, vehicle, distance_km):
         """Затраты на ТО"""
-        if isinstance(vehicle, ICEVehicle):
+        vehicle_type = getattr(vehicle, 'vehicle_type', None)
+        if vehicle_type == 'ICE':
             return distance_km * cls.MAINTENANCE_COST_ICE
-        elif isinstance(vehicle, EVVehicle):
+        elif vehicle_type == 'EV':
             return distance_km * cls.MAINTENANCE_COST_EV
-        elif isinstance(vehicle, HEVVehicle) or isinstance(vehicle, PHEVVehicle):
+        elif vehicle_type in ('HEV', 'PHEV'):
             return distance_km * (cls.MAINTENANCE_COST_ICE + cls.MAINTENANCE_COST_EV) / 2
         else:
             return 0
@@ -186,11 +258,12 @@ class TCOService:
     @classmethod
     def _calculate_recycle_cost(cls, vehicle):
         """Стоимость утилизации"""
-        if isinstance(vehicle, EVVehicle):
+        vehicle_type = getattr(vehicle, 'vehicle_type', None)
+        if vehicle_type == 'EV':
             return cls.DISPOSAL_COST_EV
-        elif isinstance(vehicle, ICEVehicle):
+        elif vehicle_type == 'ICE':
             return cls.DISPOSAL_COST_ICE
-        elif isinstance(vehicle, HEVVehicle) or isinstance(vehicle, PHEVVehicle):
+        elif vehicle_type in ('HEV', 'PHEV'):
             return (cls.DISPOSAL_COST_ICE + cls.DISPOSAL_COST_EV) / 2
         else:
             return 0
@@ -1,5 +1,4 @@
 import math
-from vehicles.models import ICEVehicle, HEVVehicle, EVVehicle
 
 
 class VehicleDynamics:
@@ -10,6 +9,8 @@ class VehicleDynamics:
     # Константы
     AIR_DENSITY = 1.225  # кг/м³ (плотность воздуха при 15°C)
     GRAVITY = 9.81  # м/с² (ускорение свободного падения)
+    DEFAULT_DRAG_COEFFICIENT = 0.3  # Cx, если не задан у модели
+    DEFAULT_ROLLING_COEFFICIENT = 0.012  # коэффициент качения, если не задан у модели
 
     def calculate_required_force(self, vehicle, velocity_kmh, acceleration_mss, road_grade_deg=0):
         """
@@ -45,7 +46,8 @@ class VehicleDynamics:
 
     def _calculate_rolling_resistance(self, vehicle):
         """Сила сопротивления качению"""
-        return vehicle.rolling_coefficient * vehicle.mass_kg * self.GRAVITY
+        rolling_coefficient = getattr(vehicle, 'rolling_coefficient', self.DEFAULT_ROLLING_COEFFICIENT)
+        return rolling_coefficient * vehicle.mass_kg * self.GRAVITY
 
     def _calculate_acceleration_force(self, vehicle, acceleration_mss):
         """Сила инерции при ускорении"""
@@ -58,18 +60,20 @@ class VehicleDynamics:
 
     def _calculate_air_resistance(self, vehicle, velocity_ms):
         """Аэродинамическое сопротивление"""
-        return 0.5 * self.AIR_DENSITY * vehicle.drag_coefficient * vehicle.frontal_area_m2 * (velocity_ms ** 2)
+        drag_coefficient = getattr(vehicle, 'drag_coefficient', self.DEFAULT_DRAG_COEFFICIENT)
+        return 0.5 * self.AIR_DENSITY * drag_coefficient * vehicle.frontal_area_m2 * (velocity_ms ** 2)
 
     def _calculate_efficiency(self, vehicle, power_kw, velocity_ms):
         """
         Расчет эффективности использования энергии
         (упрощенный вариант)
         """
-        if isinstance(vehicle, ICEVehicle):
+        vehicle_type = getattr(vehicle, 'vehicle_type', None)
+        if vehicle_type == 'ICE':
             return min(0.35, 0.1 + 0.002 * velocity_ms)
-        elif isinstance(vehicle, EVVehicle):
+        elif vehicle_type == 'EV':
             return min(0.9, 0.7 + 0.003 * velocity_ms)
-        elif isinstance(vehicle, HEVVehicle):
+        elif vehicle_type == 'HEV':
             return min(0.5, 0.3 + 0.0025 * velocity_ms)
 
     def simulate_acceleration(self, vehicle, initial_velocity=0, max_time=10, throttle=0.8, road_grade=0):
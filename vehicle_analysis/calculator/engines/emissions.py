@@ -1,4 +1,6 @@
-from vehicles.models import ICEVehicle, HEVVehicle, EVVehicle, PHEVVehicle
+import numpy as np
+
+from calculator.instrumentation import engine_call
 
 
 class EmissionsCalculator:
@@ -19,25 +21,30 @@ class EmissionsCalculator:
     PHEV_ELECTRIC_RANGE_FACTOR = 0.8  # Коэффициент использования электрического диапазона PHEV
 
     @classmethod
+    @engine_call('emissions')
     def calculate_co2(cls, vehicle, distance_km, energy_source, driving_conditions,
-                      use_recuperation=True, urban_share=0.5):
+                      use_recuperation=True, urban_share=0.5, emission_factor=None):
         """
         Расчет выбросов CO₂ за поездку
+
+        :param emission_factor: углеродоемкость сети (г/кВт·ч) вместо EMISSION_FACTORS[energy_source];
+                                может быть массивом (например, по дням)
         """
-        if isinstance(vehicle, ICEVehicle):
+        vehicle_type = getattr(vehicle, 'vehicle_type', None)
+        if vehicle_type == 'ICE':
             return cls._calculate_ice_co2(vehicle, distance_km)
-        elif isinstance(vehicle, EVVehicle):
+        elif vehicle_type == 'EV':
             return cls._calculate_ev_co2(
                 vehicle, distance_km, energy_source,
-                use_recuperation, urban_share
+                use_recuperation, urban_share, emission_factor
             )
-        elif isinstance(vehicle, HEVVehicle):
+        elif vehicle_type == 'HEV':
             return cls._calculate_hev_co2(
                 vehicle, distance_km, driving_conditions,
             )
-        elif isinstance(vehicle, PHEVVehicle):
+        elif vehicle_type == 'PHEV':
             return cls._calculate_phev_co2(
-                vehicle, distance_km, energy_source
+                vehicle, distance_km, energy_source, emission_factor
             )
         else:
             raise ValueError(f"Unsupported vehicle type: {type(vehicle)}")
@@ -50,7 +57,7 @@ class EmissionsCalculator:
 
     @classmethod
     def _calculate_ev_co2(cls, vehicle, distance_km, energy_source,
-                          use_recuperation, urban_share):
+                          use_recuperation, urban_share, emission_factor=None):
         """Расчет выбросов для электромобиля"""
         energy_consumption = vehicle.energy_consumption_kwhp100km / 100  # кВт·ч/км
 
@@ -62,7 +69,8 @@ class EmissionsCalculator:
         else:
             total_energy = energy_consumption * distance_km
 
-        emission_factor = cls.EMISSION_FACTORS.get(energy_source, 300)
+        if emission_factor is None:
+            emission_factor = cls.EMISSION_FACTORS.get(energy_source, 300)
         return total_energy * emission_factor
 
     @classmethod
@@ -93,16 +101,17 @@ class EmissionsCalculator:
         return co2_emissions
 
     @classmethod
-    def _calculate_phev_co2(cls, vehicle, distance_km, energy_source):
+    def _calculate_phev_co2(cls, vehicle, distance_km, energy_source, emission_factor=None):
         """
         Расчет выбросов CO2 для PHEV (все в км и литрах)
         """
-        emission_factor = cls.EMISSION_FACTORS.get(energy_source, 300)  # г/кВт·ч
+        if emission_factor is None:
+            emission_factor = cls.EMISSION_FACTORS.get(energy_source, 300)  # г/кВт·ч
         electricity_co2_per_kwh = emission_factor / 1000  # кг/кВт·ч
 
         electric_range_km = vehicle.battery_only_range_km
-        electric_distance = min(distance_km, electric_range_km)
-        ice_distance = max(0, distance_km - electric_range_km)
+        electric_distance = np.minimum(distance_km, electric_range_km)
+        ice_distance = np.maximum(0, distance_km - electric_range_km)
 
         electric_consumption_kwh = (vehicle.kwh_100_km_battery_only / 100) * electric_distance
         fuel_consumption_l_100km = 235.214583 / vehicle.mpg_gas_only
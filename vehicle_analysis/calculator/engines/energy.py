@@ -1,4 +1,6 @@
-from vehicles.models import ICEVehicle, HEVVehicle, EVVehicle, PHEVVehicle
+import numpy as np
+
+from calculator.instrumentation import engine_call
 
 
 class EnergyCalculator:
@@ -17,17 +19,19 @@ class EnergyCalculator:
     FUEL_ENERGY_DENSITY_MJ_PER_L = 34.5  # Энергетическая плотность топлива для бензина
 
     @classmethod
+    @engine_call('energy')
     def calculate_energy_consumption(cls, vehicle, distance_km, driving_conditions='mixed'):
         """
         Расчет общего энергопотребления
         """
-        if isinstance(vehicle, ICEVehicle):
+        vehicle_type = getattr(vehicle, 'vehicle_type', None)
+        if vehicle_type == 'ICE':
             return cls._calculate_ice_energy(vehicle, distance_km, driving_conditions)
-        elif isinstance(vehicle, EVVehicle):
+        elif vehicle_type == 'EV':
             return cls._calculate_ev_energy(vehicle, distance_km, driving_conditions)
-        elif isinstance(vehicle, HEVVehicle):
+        elif vehicle_type == 'HEV':
             return cls._calculate_hev_energy(vehicle, distance_km, driving_conditions)
-        elif isinstance(vehicle, PHEVVehicle):
+        elif vehicle_type == 'PHEV':
             return cls._calculate_phev_energy(vehicle, distance_km, driving_conditions)
         else:
             raise ValueError("Unsupported vehicle type")
@@ -100,8 +104,8 @@ class EnergyCalculator:
         electric_range_km = vehicle.battery_only_range_km
 
         # Расчет расстояний на электротяге и ДВС
-        electric_distance = min(distance_km, electric_range_km)
-        ice_distance = max(0, distance_km - electric_range_km)
+        electric_distance = np.minimum(distance_km, electric_range_km)
+        ice_distance = np.maximum(0, distance_km - electric_range_km)
 
         # Расчет потребления электроэнергии (кВтч)
         electric_consumption_kwh = (vehicle.kwh_100_km_battery_only / 100) * electric_distance
@@ -117,18 +121,19 @@ class EnergyCalculator:
         # Общая энергия (без учета КПД)
         total_energy_mj = electric_energy_mj + fuel_energy_mj
 
-        mpge = 0
-        if distance_km > 0:
-            electric_ratio = electric_distance / distance_km
-            mpge_ev = 100 / (vehicle.kwh_100_km_battery_only / 337)
-            mpge = 1 / ((electric_ratio / mpge_ev) + ((1 - electric_ratio) / vehicle.mpg_gas_only))
+        # доля электротяги и MPGe поэлементно: distance_km может быть массивом пробегов (парк ТС по дням);
+        # [()] возвращает скаляр numpy для скалярных входов
+        moving = np.asarray(distance_km) > 0
+        electric_ratio = np.where(moving, electric_distance / np.where(moving, distance_km, 1), 0)
+        mpge_ev = 100 / (vehicle.kwh_100_km_battery_only / 337)
+        mpge = np.where(moving, 1 / ((electric_ratio / mpge_ev) + ((1 - electric_ratio) / vehicle.mpg_gas_only)), 0)
 
         return {
             'fuel_liters': fuel_consumption_liters,
             'energy_kwh': electric_consumption_kwh,
             'total_energy_mj': total_energy_mj,
-            'electric_share': electric_distance / distance_km if distance_km > 0 else 0,
-            'MPGe': mpge,
+            'electric_share': electric_ratio[()],
+            'MPGe': mpge[()],
             'electric_distance_km': electric_distance,
             'ice_distance_km': ice_distance,
             'fuel_consumption_l_100km': fuel_consumption_l_100km
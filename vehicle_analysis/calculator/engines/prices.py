@@ -0,0 +1,70 @@
+import threading
+from pathlib import Path
+
+import numpy as np
+
+PRICE_SERIES_CSV = Path(__file__).resolve().parent.parent / 'data' / 'price_series.csv'
+FUEL_COLUMNS = {
+    'petrol': 'petrol_rub_l',
+    'diesel': 'diesel_rub_l',
+}
+ELECTRICITY_COLUMN = 'electricity_rub_kwh'
+MONTHS_PER_YEAR = 12
+
+_series = None
+_lock = threading.Lock()
+
+
+class PriceSeries:
+    """
+    Помесячные ряды цен на топливо (руб/л) и электроэнергию (руб/кВт·ч).
+
+    Месяцы хранятся как номера месяцев от 1970-01, значения - массивы float,
+    поэтому выравнивание с календарем расчета - одна векторная индексация.
+    До начала ряда цена равна первому значению, после конца - последнему
+    с ежегодной индексацией inflation.
+    """
+
+    def __init__(self, months, columns):
+        months = np.asarray(months, dtype=np.int64)
+        if len(months) == 0 or np.any(np.diff(months) != 1):
+            raise ValueError("Ряд цен должен содержать месяцы подряд без пропусков")
+        self.first_month = int(months[0])
+        self.columns = columns
+
+    @classmethod
+    def from_csv(cls, csv_path=PRICE_SERIES_CSV):
+        data = np.genfromtxt(csv_path, delimiter=',', names=True, dtype=None, encoding='utf-8')
+        months = data['month'].astype('datetime64[M]').astype(np.int64)
+        columns = {name: data[name].astype(float) for name in data.dtype.names if name != 'month'}
+        return cls(months, columns)
+
+    def at_months(self, name, months, inflation=0.0):
+        """Значения ряда для массива номеров месяцев"""
+        values = self.columns[name]
+        offset = np.asarray(months, dtype=np.int64) - self.first_month
+        result = values[np.clip(offset, 0, len(values) - 1)]
+        if inflation:
+            overrun = np.maximum(offset - (len(values) - 1), 0)
+            result = result * (1 + inflation) ** (overrun / MONTHS_PER_YEAR)
+        return result
+
+    def daily(self, name, start_date, end_date, inflation=0.0):
+        """Цена на каждый день периода (включительно)"""
+        dates = np.arange(np.datetime64(start_date, 'D'), np.datetime64(end_date, 'D') + 1)
+        return self.at_months(name, dates.astype('datetime64[M]').astype(np.int64), inflation)
+
+    def monthly(self, name, start_date, n_months, inflation=0.0):
+        """Цена на n_months месяцев начиная с месяца start_date"""
+        first = np.datetime64(start_date, 'M').astype(np.int64)
+        return self.at_months(name, first + np.arange(n_months), inflation)
+
+
+def load_price_series():
+    """Ряды цен из CSV (читаются один раз на процесс)"""
+    global _series
+    if _series is None:
+        with _lock:
+            if _series is None:
+                _series = PriceSeries.from_csv()
+    return _series
@@ -0,0 +1,199 @@
+import math
+import threading
+
+import numpy as np
+from sortedcontainers import SortedList
+
+from calculator import prometheus
+from calculator.instrumentation import engine_call
+from vehicles.catalogue import VEHICLE_MODELS, VehicleArrays, get_catalogue_state, get_catalogue_version
+from vehicles.shared import shared_columns, version_label
+from vehicles.models import BaseVehicle
+from .cost import TCOService
+from .emissions import EmissionsCalculator
+from .energy import EnergyCalculator
+
+
+def pareto_front(points):
+    """
+    Недоминируемое множество (минимизация всех критериев), O(n log n).
+
+    Точки сортируются лексикографически. Для двух критериев точка во фронте, если ее
+    2-й критерий меньше минимума по всем предыдущим (накопленный минимум numpy).
+    Для трех при проходе поддерживается «лестница» лучших значений по 2-му и 3-му
+    критериям в SortedList (вставка и удаление ступеней - O(log n)): точка доминируется,
+    если на лестнице есть точка, не хуже ее по обоим критериям.
+    Совпадающие точки либо все входят во фронт, либо все нет.
+
+    :param points: массив (n, 2) или (n, 3)
+    :return: булева маска точек фронта
+    """
+    points = np.asarray(points, dtype=float)
+    unique, inverse = np.unique(points, axis=0, return_inverse=True)
+    if unique.shape[1] == 2:
+        y = unique[:, 1]
+        on_front = y < np.minimum.accumulate(np.concatenate([[np.inf], y[:-1]]))
+        return on_front[inverse.ravel()]
+
+    on_front = np.zeros(len(unique), dtype=bool)
+    stairs = SortedList()  # (2-й, 3-й критерий): 2-й по возрастанию, 3-й строго по убыванию
+    for idx, (y, z) in enumerate(unique[:, 1:].tolist()):
+        pos = stairs.bisect_right((y, math.inf))
+        if pos and stairs[pos - 1][1] <= z:
+            continue
+        on_front[idx] = True
+        end = pos
+        for _, stair_z in stairs.islice(pos):
+            if stair_z < z:
+                break
+            end += 1
+        del stairs[pos:end]
+        stairs.add((y, z))
+    return on_front[inverse.ravel()]
+
+
+class MetricsIndex:
+    """
+    Предрасчитанный индекс удельных показателей каталога:
+    TCO (руб/км), выбросы CO₂ (г/км) и энергия (МДж/км) для каждого типа дороги
+    и источника энергии.
+
+    Индекс собирается одним воркером на версию каталога и разделяется остальными
+    через файлы .npy (vehicles.shared); в процессе он обновляется построчно по сигналам
+    изменения ТС, а если каталог изменился в другом процессе (версия ушла вперед),
+    подключается заново целиком.
+    """
+
+    METRICS = ('tco', 'co2', 'energy')
+    REFERENCE_DISTANCE_KM = 100  # пробег для расчета энергии и выбросов на км
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self.version = None
+        self.blocks = {}
+        self._views = {}
+
+    # --- построение ---
+
+    @classmethod
+    @engine_call('ranking')
+    def compute_block(cls, vehicles):
+        """Удельные показатели для VehicleArrays одного типа"""
+        lifetime_km = TCOService.ANNUAL_KM * TCOService.LIFETIME_YEARS
+        block = {
+            'id': vehicles.id,
+            'label': np.array(vehicles.labels(), dtype=object),
+        }
+        for road_type, _ in BaseVehicle.ROAD_TYPES:
+            block[('tco', road_type)] = TCOService._calculate_cost_per_km(vehicles, lifetime_km, road_type)
+            energy = EnergyCalculator.calculate_energy_consumption(vehicles, cls.REFERENCE_DISTANCE_KM, road_type)
+            energy_mj = energy['energy_mj'] if 'energy_mj' in energy else energy['total_energy_mj']
+            block[('energy', road_type)] = energy_mj / cls.REFERENCE_DISTANCE_KM
+            for source in EmissionsCalculator.EMISSION_FACTORS:
+                co2 = EmissionsCalculator.calculate_co2(vehicles, cls.REFERENCE_DISTANCE_KM, source, road_type)
+                block[('co2', road_type, source)] = co2 / cls.REFERENCE_DISTANCE_KM
+        return block
+
+    def rebuild(self):
+        """Блоки всех типов; вычисляются одним воркером на версию каталога и делятся через .npy"""
+        with self._lock:
+            state = get_catalogue_state()
+            label = version_label(*state)
+            self.blocks = {
+                vtype: shared_columns(
+                    f'ranking-{vtype}', label,
+                    lambda vtype=vtype: self.compute_block(VehicleArrays.shared(vtype, state)),
+                )
+                for vtype in VEHICLE_MODELS
+            }
+            self._views = {}
+            self.version = state[0]
+
+    def ensure_fresh(self):
+        if self.version is None or self.version != get_catalogue_version():
+            self.rebuild()
+
+    def update_vehicle(self, vehicle_type, vehicle_id, deleted=False):
+        """Пересчет одной строки индекса после изменения ТС"""
+        with self._lock:
+            if self.version is None:
+                return
+            version = get_catalogue_version()
+            if version != self.version + 1:
+                # пропущены изменения из других процессов - пересоберем при следующем запросе
+                self.version = None
+                return
+
+            block = self.blocks[vehicle_type]
+            keep = block['id'] != vehicle_id
+            block = {key: values[keep] for key, values in block.items()}
+            if not deleted:
+                model = VEHICLE_MODELS[vehicle_type]
+                row = self.compute_block(VehicleArrays.load(vehicle_type, model.objects.filter(pk=vehicle_id)))
+                block = {key: np.concatenate([values, row[key]]) for key, values in block.items()}
+            self.blocks[vehicle_type] = block
+            self._views = {}
+            self.version = version
+
+    # --- запросы ---
+
+    def view(self, road_type='mixed', energy_source='eu_avg'):
+        """Столбцы всего каталога для сочетания тип дороги / источник энергии"""
+        self.ensure_fresh()
+        key = (road_type, energy_source)
+        with self._lock:
+            prometheus.CACHE_REQUESTS.inc(cache='ranking', result='hit' if key in self._views else 'miss')
+            if key not in self._views:
+                blocks = [(vtype, block) for vtype, block in self.blocks.items() if len(block['id'])]
+                columns = {
+                    'type': np.concatenate([np.full(len(b['id']), vtype, dtype=object) for vtype, b in blocks]),
+                    'id': np.concatenate([b['id'] for _, b in blocks]),
+                    'label': np.concatenate([b['label'] for _, b in blocks]),
+                    'tco': np.concatenate([b[('tco', road_type)] for _, b in blocks]),
+                    'co2': np.concatenate([b[('co2', road_type, energy_source)] for _, b in blocks]),
+                    'energy': np.concatenate([b[('energy', road_type)] for _, b in blocks]),
+                }
+                valid = np.all([np.isfinite(columns[m]) for m in self.METRICS], axis=0)
+                self._views[key] = {name: values[valid] for name, values in columns.items()}
+            return self._views[key]
+
+    def top_k(self, metric='tco', k=10, road_type='mixed', energy_source='eu_avg', vehicle_type=None):
+        """k лучших (минимальных) ТС по показателю"""
+        columns = self.view(road_type, energy_source)
+        candidates = np.flatnonzero(columns['type'] == vehicle_type) if vehicle_type else None
+        values = columns[metric] if candidates is None else columns[metric][candidates]
+        k = min(k, len(values))
+        if not k:
+            return []
+        best = np.argpartition(values, k - 1)[:k]
+        best = best[np.argsort(values[best], kind='stable')]
+        if candidates is not None:
+            best = candidates[best]
+        return self._rows(columns, best)
+
+    def pareto(self, metrics=METRICS, road_type='mixed', energy_source='eu_avg'):
+        """Недоминируемые ТС по выбранным критериям (2 или 3), по возрастанию первого"""
+        columns = self.view(road_type, energy_source)
+        key = ('pareto', road_type, energy_source, tuple(metrics))
+        with self._lock:
+            prometheus.CACHE_REQUESTS.inc(cache='pareto', result='hit' if key in self._views else 'miss')
+            if key not in self._views:
+                mask = pareto_front(np.column_stack([columns[m] for m in metrics]))
+                front = np.flatnonzero(mask)
+                self._views[key] = front[np.argsort(columns[metrics[0]][front], kind='stable')]
+            front = self._views[key]
+        return self._rows(columns, front)
+
+    @classmethod
+    def _rows(cls, columns, index):
+        return [{
+            'type': columns['type'][i],
+            'id': int(columns['id'][i]),
+            'vehicle': str(columns['label'][i]),
+            'tco_per_km': float(columns['tco'][i]),
+            'co2_g_per_km': float(columns['co2'][i]),
+            'energy_mj_per_km': float(columns['energy'][i]),
+        } for i in index]
+
+
+metrics_index = MetricsIndex()
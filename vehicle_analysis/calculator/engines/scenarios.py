@@ -0,0 +1,236 @@
+from datetime import date, datetime
+
+import numpy as np
+
+from calculator.instrumentation import engine_call
+from vehicles.catalogue import VEHICLE_MODELS, VehicleArrays, get_catalogue_state
+from vehicles.models import BaseVehicle
+from .cost import TCOService
+from .emissions import EmissionsCalculator
+from .energy import EnergyCalculator
+from .prices import FUEL_COLUMNS
+
+MAX_SCENARIOS = 10_000
+AVERAGE_BLOCK = 1_000_000  # элементов (ТС каталога × сценариев) в одном блоке усреднения по типу
+OUTPUTS = ('energy_kwh', 'fuel_liters', 'co2_g', 'tco')
+PRICE_KEYS = ('fuel', 'hybrid_fuel', 'electricity', 'running_discount', 'residual_discount')
+ROAD_TYPES = {road_type for road_type, _ in BaseVehicle.ROAD_TYPES}
+
+# поля сценария и значения по умолчанию (как у формы калькулятора); проценты - %/год
+SCENARIO_DEFAULTS = {
+    'vehicle_type': None,
+    'vehicle_id': None,  # None - среднее по всем ТС типа
+    'distance_km': None,
+    'road_type': 'mixed',
+    'energy_source': 'eu_avg',
+    'fuel_price': None,
+    'electricity_price': None,
+    'start_date': None,
+    'fuel_grade': 'petrol',
+    'price_inflation': None,
+    'discount_rate': None,
+}
+
+
+def _number(value, name, minimum=None, maximum=None):
+    if isinstance(value, bool) or not isinstance(value, (int, float)) or value != value:
+        raise ValueError(f"{name} - число")
+    if minimum is not None and value < minimum or maximum is not None and value > maximum:
+        raise ValueError(f"{name} - от {minimum} до {maximum}" if maximum is not None else
+                         f"{name} - не меньше {minimum}")
+    return float(value)
+
+
+def _optional_number(value, name, minimum=None, maximum=None):
+    return None if value is None else _number(value, name, minimum, maximum)
+
+
+def _scenario(raw):
+    """Проверенный сценарий с подставленными значениями по умолчанию"""
+    unknown = set(raw) - set(SCENARIO_DEFAULTS)
+    if unknown:
+        raise ValueError(f"неизвестные поля: {', '.join(sorted(unknown))}")
+    scenario = {**SCENARIO_DEFAULTS, **raw}
+    if scenario['vehicle_type'] not in VEHICLE_MODELS:
+        raise ValueError(f"vehicle_type - одно из {', '.join(VEHICLE_MODELS)}")
+    vehicle_id = scenario['vehicle_id']
+    if vehicle_id is not None and (isinstance(vehicle_id, bool) or not isinstance(vehicle_id, int)
+                                   or vehicle_id < 1):
+        raise ValueError("vehicle_id - положительное целое или null (среднее по типу)")
+    if scenario['distance_km'] is None:
+        raise ValueError("distance_km обязателен")
+    scenario['distance_km'] = _number(scenario['distance_km'], 'distance_km', minimum=1)
+    if scenario['road_type'] not in ROAD_TYPES:
+        raise ValueError(f"road_type - одно из {', '.join(sorted(ROAD_TYPES))}")
+    if scenario['energy_source'] not in EmissionsCalculator.EMISSION_FACTORS:
+        raise ValueError(f"energy_source - одно из {', '.join(EmissionsCalculator.EMISSION_FACTORS)}")
+    if scenario['fuel_grade'] not in FUEL_COLUMNS:
+        raise ValueError(f"fuel_grade - одно из {', '.join(FUEL_COLUMNS)}")
+    scenario['fuel_price'] = _optional_number(scenario['fuel_price'], 'fuel_price', minimum=0)
+    scenario['electricity_price'] = _optional_number(scenario['electricity_price'], 'electricity_price', minimum=0)
+    scenario['price_inflation'] = _optional_number(scenario['price_inflation'], 'price_inflation', -50, 100)
+    scenario['discount_rate'] = _optional_number(scenario['discount_rate'], 'discount_rate', 0, 100)
+    if scenario['start_date'] is not None:
+        try:
+            scenario['start_date'] = date.fromisoformat(scenario['start_date'])
+        except (TypeError, ValueError):
+            raise ValueError("start_date - дата ГГГГ-ММ-ДД")
+    return scenario
+
+
+def scenario_prices(scenario):
+    """
+    Ценовой сценарий как у калькулятора: цены на срок службы по рядам, если задано начало
+    эксплуатации или ставка дисконтирования; явные fuel_price / electricity_price имеют приоритет
+    """
+    if scenario['start_date'] or scenario['discount_rate']:
+        prices = TCOService.get_lifetime_prices(
+            scenario['start_date'] or datetime.now().date(),
+            fuel_grade=scenario['fuel_grade'],
+            inflation=(scenario['price_inflation'] or 0) / 100,
+            discount_rate=(scenario['discount_rate'] or 0) / 100,
+        )
+    else:
+        prices = TCOService.get_prices()
+    if scenario['fuel_price'] is not None:
+        prices.update(fuel=scenario['fuel_price'], hybrid_fuel=scenario['fuel_price'])
+    if scenario['electricity_price'] is not None:
+        prices['electricity'] = scenario['electricity_price']
+    return {key: prices.get(key, 1) for key in PRICE_KEYS}
+
+
+def parse_scenarios(payload):
+    """
+    Пакет сценариев {"defaults": {...}, "scenarios": [{...}, ...]} в столбцы numpy.
+    Поля сценария - SCENARIO_DEFAULTS; defaults задает общие значения для всех сценариев.
+    Цены на срок службы считаются один раз на каждую различающуюся комбинацию ценовых полей.
+
+    :raises ValueError: описание ошибки с номером сценария
+    :return: словарь столбцов длины числа сценариев
+    """
+    if not isinstance(payload, dict) or not isinstance(payload.get('scenarios'), list):
+        raise ValueError("Ожидается объект {\"scenarios\": [...]}")
+    defaults = payload.get('defaults') or {}
+    if not isinstance(defaults, dict):
+        raise ValueError("defaults - объект с полями сценария")
+    raw_scenarios = payload['scenarios']
+    if not raw_scenarios:
+        raise ValueError("Укажите хотя бы один сценарий")
+    if len(raw_scenarios) > MAX_SCENARIOS:
+        raise ValueError(f"Не больше {MAX_SCENARIOS} сценариев за запрос")
+
+    rows, prices, price_cache = [], [], {}
+    for number, raw in enumerate(raw_scenarios, start=1):
+        if not isinstance(raw, dict):
+            raise ValueError(f"Сценарий {number}: ожидается объект")
+        try:
+            scenario = _scenario({**defaults, **raw})
+        except ValueError as e:
+            raise ValueError(f"Сценарий {number}: {e}")
+        price_key = tuple(scenario[name] for name in (
+            'start_date', 'fuel_grade', 'price_inflation', 'discount_rate', 'fuel_price', 'electricity_price'))
+        if price_key not in price_cache:
+            price_cache[price_key] = scenario_prices(scenario)
+        rows.append(scenario)
+        prices.append(price_cache[price_key])
+
+    columns = {
+        'vehicle_type': np.array([s['vehicle_type'] for s in rows], dtype=object),
+        'vehicle_id': np.array([s['vehicle_id'] or 0 for s in rows], dtype=np.int64),
+        'distance_km': np.array([s['distance_km'] for s in rows]),
+        'road_type': np.array([s['road_type'] for s in rows], dtype=object),
+        'emission_factor': np.array(
+            [EmissionsCalculator.EMISSION_FACTORS[s['energy_source']] for s in rows], dtype=float),
+    }
+    for key in PRICE_KEYS:
+        columns[key] = np.array([p[key] for p in prices], dtype=float)
+    return columns
+
+
+def _metrics(vehicles, distance_km, emission_factor, prices, road_type):
+    """Показатели сценариев движками калькулятора; аргументы согласованы по форме (broadcasting)"""
+    energy = EnergyCalculator.calculate_energy_consumption(vehicles, distance_km, road_type)
+    values = {
+        'energy_kwh': energy.get('energy_kwh'),
+        'fuel_liters': energy.get('fuel_liters'),
+        'co2_g': EmissionsCalculator.calculate_co2(vehicles, distance_km, None, road_type,
+                                                   emission_factor=emission_factor),
+        'tco': TCOService._calculate_total_cost(vehicles, distance_km, road_type, prices),
+    }
+    shape = np.broadcast(vehicles.id, distance_km).shape
+    return {name: None if value is None else np.broadcast_to(value, shape) for name, value in values.items()}
+
+
+def _mean(values):
+    """Среднее по ТС (ось 0) без NaN; NaN, если значений нет"""
+    finite = np.isfinite(values)
+    count = finite.sum(axis=0)
+    total = np.where(finite, values, 0).sum(axis=0)
+    return np.where(count > 0, total / np.maximum(count, 1), np.nan)
+
+
+def _subset(columns, rows, shape=(-1,)):
+    return (
+        columns['distance_km'][rows].reshape(shape),
+        columns['emission_factor'][rows].reshape(shape),
+        {key: columns[key][rows].reshape(shape) for key in PRICE_KEYS},
+    )
+
+
+@engine_call('scenarios')
+def evaluate_scenarios(columns, catalogues=None):
+    """
+    Все сценарии пакета одним векторным проходом: группы (тип ТС, тип дороги) считаются
+    движками калькулятора над столбцами VehicleArrays; сценарии с конкретным ТС - построчно
+    (ТС берутся из каталога по id), сценарии «среднее по типу» - матрицей ТС × сценарии
+    блоками до AVERAGE_BLOCK элементов, с усреднением по ТС, как в сравнении по типу калькулятора
+
+    :param columns: результат parse_scenarios
+    :param catalogues: {тип: VehicleArrays}; по умолчанию общий каталог (VehicleArrays.shared)
+    :raises ValueError: ТС с указанным id нет в каталоге или каталог типа пуст
+    :return: {показатель: массив float по сценариям} для OUTPUTS, NaN - показатель не применим к типу
+    """
+    count = len(columns['distance_km'])
+    results = {name: np.full(count, np.nan) for name in OUTPUTS}
+    if catalogues is None:
+        state = get_catalogue_state()
+        catalogues = {vtype: VehicleArrays.shared(vtype, state) for vtype in set(columns['vehicle_type'])}
+
+    for vehicle_type in sorted(set(columns['vehicle_type'])):
+        catalogue = catalogues[vehicle_type]
+        of_type = columns['vehicle_type'] == vehicle_type
+        for road_type in sorted(set(columns['road_type'][of_type])):
+            group = of_type & (columns['road_type'] == road_type)
+
+            single = np.flatnonzero(group & (columns['vehicle_id'] > 0))
+            if len(single):
+                ids = columns['vehicle_id'][single]
+                positions = np.minimum(np.searchsorted(catalogue.id, ids), max(len(catalogue) - 1, 0))
+                missing = ids[catalogue.id[positions] != ids] if len(catalogue) else ids
+                if len(missing):
+                    raise ValueError(f"ТС {vehicle_type} с id {int(missing[0])} не найдено")
+                values = _metrics(catalogue.take(positions), *_subset(columns, single), road_type)
+                for name, value in values.items():
+                    if value is not None:
+                        results[name][single] = value
+
+            average = np.flatnonzero(group & (columns['vehicle_id'] == 0))
+            if len(average) and not len(catalogue):
+                raise ValueError(f"В каталоге нет ТС типа {vehicle_type}")
+            block = max(AVERAGE_BLOCK // max(len(catalogue), 1), 1)
+            vehicles = catalogue.expand(0)
+            for start in range(0, len(average), block):
+                rows = average[start:start + block]
+                values = _metrics(vehicles, *_subset(columns, rows, (1, -1)), road_type)
+                for name, value in values.items():
+                    if value is not None:
+                        results[name][rows] = _mean(value)
+    return results
+
+
+def columnar_payload(results, digits=3):
+    """Столбцы результатов для JSON: округленные списки, NaN -> null"""
+    return {
+        name: [None if value != value else value for value in np.round(values, digits).tolist()]
+        for name, values in results.items()
+    }
@@ -1,5 +1,7 @@
 from django import forms
 from vehicles.models import ICEVehicle, EVVehicle, HEVVehicle, PHEVVehicle, BaseVehicle
+from calculator.engines.emissions import EmissionsCalculator
+from vehicles.catalogue import VEHICLE_MODELS
 
 
 class VehicleSelectForm(forms.Form):
@@ -67,3 +69,150 @@ class VehicleSelectForm(forms.Form):
         choices=BaseVehicle.ROAD_TYPES,
         label="Тип дороги"
     )
+    start_date = forms.DateField(
+        required=False,
+        label="Начало эксплуатации",
+        help_text="Если задано - цены из помесячных рядов на срок службы",
+        widget=forms.DateInput(attrs={'class': 'form-control', 'type': 'date'})
+    )
+    fuel_grade = forms.ChoiceField(
+        choices=[('petrol', 'Бензин'), ('diesel', 'Дизель')],
+        initial='petrol',
+        required=False,
+        label="Топливо",
+        widget=forms.Select(attrs={'class': 'form-select'})
+    )
+    price_inflation = forms.FloatField(
+        required=False,
+        min_value=-50,
+        max_value=100,
+        label="Рост цен после окончания ряда (%/год)",
+        widget=forms.NumberInput(attrs={'class': 'form-control', 'step': '0.5'})
+    )
+    discount_rate = forms.FloatField(
+        required=False,
+        min_value=0,
+        max_value=100,
+        label="Ставка дисконтирования (%/год)",
+        widget=forms.NumberInput(attrs={'class': 'form-control', 'step': '0.5'})
+    )
+
+
+class BreakEvenForm(forms.Form):
+    VEHICLE_TYPES = [
+        ('ICE', 'ДВС'),
+        ('EV', 'Электромобиль'),
+        ('HEV', 'Гибрид'),
+        ('PHEV', 'Заряжаемый гибрид'),
+    ]
+
+    candidate_type = forms.ChoiceField(
+        choices=VEHICLE_TYPES,
+        initial='EV',
+        label="Окупаемость для"
+    )
+    baseline_type = forms.ChoiceField(
+        choices=VEHICLE_TYPES,
+        initial='ICE',
+        label="По сравнению с"
+    )
+    baseline_id = forms.IntegerField(
+        required=False,
+        min_value=1,
+        label="ID базового ТС",
+        help_text="Пусто - все пары"
+    )
+    road_type = forms.ChoiceField(
+        choices=BaseVehicle.ROAD_TYPES,
+        initial='mixed',
+        required=False,
+        label="Тип дороги"
+    )
+    fuel_price = forms.FloatField(
+        required=False,
+        min_value=0,
+        label="Цена топлива (руб/л)"
+    )
+    electricity_price = forms.FloatField(
+        required=False,
+        min_value=0,
+        label="Цена электроэнергии (руб/кВт·ч)"
+    )
+    limit = forms.IntegerField(
+        required=False,
+        min_value=1,
+        max_value=5000,
+        initial=100,
+        label="Количество строк"
+    )
+    payback_only = forms.BooleanField(
+        required=False,
+        label="Только окупающиеся пары"
+    )
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        for name, field in self.fields.items():
+            if isinstance(field, forms.BooleanField):
+                css = 'form-check-input'
+            elif isinstance(field, forms.ChoiceField):
+                css = 'form-select'
+            else:
+                css = 'form-control'
+            field.widget.attrs.update({'class': css})
+
+
+class RankingForm(forms.Form):
+    METRICS = [
+        ('tco', 'Стоимость владения (руб/км)'),
+        ('co2', 'Выбросы CO₂ (г/км)'),
+        ('energy', 'Энергия (МДж/км)'),
+    ]
+
+    road_type = forms.ChoiceField(choices=BaseVehicle.ROAD_TYPES, required=False)
+    energy_source = forms.ChoiceField(
+        choices=[(src, src) for src in EmissionsCalculator.EMISSION_FACTORS],
+        required=False
+    )
+    metric = forms.ChoiceField(choices=METRICS, required=False)
+    metrics = forms.MultipleChoiceField(choices=METRICS, required=False)
+    k = forms.IntegerField(min_value=1, max_value=1000, required=False)
+    vehicle_type = forms.ChoiceField(choices=BreakEvenForm.VEHICLE_TYPES, required=False)
+
+    def clean_metrics(self):
+        metrics = self.cleaned_data['metrics'] or [m for m, _ in self.METRICS]
+        if len(metrics) not in (2, 3):
+            raise forms.ValidationError("Нужно выбрать 2 или 3 критерия")
+        return metrics
+
+
+class WhatIfForm(forms.Form):
+    """Параметры запроса ползунков «что если» (WhatIfAPIView)"""
+    CHANGED = [
+        ('distance_km', 'Пробег'),
+        ('fuel_price', 'Цена топлива'),
+        ('energy_source', 'Источник энергии'),
+    ]
+    MAX_ROWS = 8
+
+    rows = forms.CharField(max_length=200, help_text="Строки результатов: «тип:id» или «тип» (среднее по типу)")
+    distance_km = forms.FloatField(min_value=1)
+    fuel_price = forms.FloatField(min_value=0, required=False)
+    energy_source = forms.ChoiceField(choices=VehicleSelectForm.base_fields['energy_source'].choices)
+    road_type = forms.ChoiceField(choices=BaseVehicle.ROAD_TYPES)
+    start_date = forms.DateField(required=False)
+    fuel_grade = forms.ChoiceField(choices=VehicleSelectForm.base_fields['fuel_grade'].choices, required=False)
+    price_inflation = forms.FloatField(min_value=-50, max_value=100, required=False)
+    discount_rate = forms.FloatField(min_value=0, max_value=100, required=False)
+    changed = forms.ChoiceField(choices=CHANGED, required=False)
+
+    def clean_rows(self):
+        rows = []
+        for part in self.cleaned_data['rows'].split(','):
+            vehicle_type, _, vehicle_id = part.strip().partition(':')
+            if vehicle_type not in VEHICLE_MODELS or vehicle_id and not vehicle_id.isdigit():
+                raise forms.ValidationError(f"Строка «{part}»: ожидается «тип:id» или «тип»")
+            rows.append({'vehicle_type': vehicle_type, 'vehicle_id': int(vehicle_id) if vehicle_id else None})
+        if len(rows) > self.MAX_ROWS:
+            raise forms.ValidationError(f"Не больше {self.MAX_ROWS} строк")
+        return rows
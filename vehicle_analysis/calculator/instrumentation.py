@@ -0,0 +1,178 @@
+import contextvars
+import functools
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+
+from django.template.backends.django import DjangoTemplates
+
+from . import prometheus
+
+_current = contextvars.ContextVar('request_timings', default=None)
+_engine_tally = contextvars.ContextVar('engine_tally', default=None)  # (движок, тип ТС) -> [вызовы, сек]
+
+
+class RequestTimings:
+    """
+    Время этапов одного запроса: ORM-запросы (db), расчеты движков (engine),
+    построение графиков (plots) и рендеринг шаблонов (template).
+
+    Этапы могут перекрываться (запросы к БД внутри расчета учитываются и в db, и в engine),
+    вложенный этап с тем же именем не учитывается повторно.
+    """
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.durations = defaultdict(float)
+        self.counts = defaultdict(int)
+        self.active = set()
+
+    def add(self, name, seconds):
+        self.durations[name] += seconds
+        self.counts[name] += 1
+
+    def record_query(self, execute, sql, params, many, context):
+        """Обертка connection.execute_wrapper: время и количество SQL-запросов"""
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.add('db', time.perf_counter() - start)
+
+    @property
+    def total(self):
+        return time.perf_counter() - self.started
+
+    def server_timing(self):
+        """Значение заголовка Server-Timing (длительности в мс)"""
+        entries = []
+        for name, seconds in self.durations.items():
+            entry = f'{name};dur={seconds * 1000:.1f}'
+            if name == 'db':
+                entry += f';desc="{self.counts[name]} queries"'
+            entries.append(entry)
+        entries.append(f'total;dur={self.total * 1000:.1f}')
+        return ', '.join(entries)
+
+    def as_dict(self):
+        return {
+            'total_ms': round(self.total * 1000, 1),
+            'queries': self.counts.get('db', 0),
+            'stages': {name: {'ms': round(seconds * 1000, 1), 'count': self.counts[name]}
+                       for name, seconds in self.durations.items()},
+        }
+
+
+def start_request():
+    """Начать замер запроса в текущем контексте; возвращает (timings, token для finish_request)"""
+    timings = RequestTimings()
+    return timings, _current.set(timings)
+
+
+def finish_request(token):
+    _current.reset(token)
+
+
+def current_timings():
+    return _current.get()
+
+
+@contextmanager
+def stage(name):
+    """
+    Замер этапа запроса; работает и как декоратор.
+
+    Если запрос не попал в выборку (замер не начат), накладные расходы -
+    одно чтение ContextVar.
+    """
+    timings = _current.get()
+    if timings is None or name in timings.active:
+        yield
+        return
+    timings.active.add(name)
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings.active.discard(name)
+        timings.add(name, time.perf_counter() - start)
+
+
+def _vehicle_type(args, kwargs):
+    for arg in (*args[:2], kwargs.get('vehicle')):
+        vehicle_type = getattr(arg, 'vehicle_type', None)
+        if vehicle_type is not None:
+            return vehicle_type
+    return 'all'
+
+
+@contextmanager
+def engine_tally():
+    """
+    Счетчики движков внутри блока (запрос, фоновая задача) копятся в словаре
+    и пишутся в Prometheus один раз при выходе; вложенный блок пишет во внешний
+    """
+    if _engine_tally.get() is not None:
+        yield
+        return
+    tally = defaultdict(lambda: [0, 0.0])
+    token = _engine_tally.set(tally)
+    try:
+        yield
+    finally:
+        _engine_tally.reset(token)
+        for (engine, vehicle_type), (calls, seconds) in tally.items():
+            prometheus.ENGINE_CALLS.inc(calls, engine=engine, vehicle_type=vehicle_type)
+            prometheus.ENGINE_SECONDS.inc(seconds, engine=engine, vehicle_type=vehicle_type)
+
+
+def engine_call(name):
+    """
+    Декоратор входа в движок расчета: этап engine запроса и счетчики
+    engine_calls_total / engine_duration_seconds_total по типу ТС
+    (тип берется у первого аргумента или аргумента vehicle с атрибутом vehicle_type).
+
+    Вызовы (например, EnergyCalculator на каждый день симуляции) только добавляют
+    число и время в словарь engine_tally запроса; этап engine замеряется только в выборке.
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            tally = _engine_tally.get()
+            if tally is None:
+                with engine_tally():
+                    return wrapper(*args, **kwargs)
+            start = time.perf_counter()
+            try:
+                if _current.get() is None:
+                    return func(*args, **kwargs)
+                with stage('engine'):
+                    return func(*args, **kwargs)
+            finally:
+                entry = tally[name, _vehicle_type(args, kwargs)]
+                entry[0] += 1
+                entry[1] += time.perf_counter() - start
+        return wrapper
+    return decorator
+
+
+class _TimedTemplate:
+    def __init__(self, template):
+        self.template = template
+
+    def __getattr__(self, name):
+        return getattr(self.template, name)
+
+    def render(self, context=None, request=None):
+        with stage('template'):
+            return self.template.render(context, request)
+
+
+class TimedDjangoTemplates(DjangoTemplates):
+    """Шаблонный движок Django с замером рендеринга (этап template) для render() и TemplateResponse"""
+
+    def from_string(self, template_code):
+        return _TimedTemplate(super().from_string(template_code))
+
+    def get_template(self, template_name):
+        return _TimedTemplate(super().get_template(template_name))
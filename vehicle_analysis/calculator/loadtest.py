@@ -0,0 +1,233 @@
+import http.client
+import random
+import threading
+import time
+from datetime import date, datetime, timedelta
+from http.cookies import SimpleCookie
+from urllib.parse import urlencode, urlsplit
+
+import numpy as np
+
+from vehicles.catalogue import VEHICLE_MODELS
+
+VEHICLE_TYPES = list(VEHICLE_MODELS)
+SINGLE_FIELDS = {'ICE': 'ice_vehicle', 'EV': 'ev_vehicle', 'HEV': 'hevv_vehicle', 'PHEV': 'phevv_vehicle'}
+ROAD_TYPES = ('city', 'highway', 'mixed')
+ENERGY_SOURCES = ('coal', 'gas', 'nuclear', 'hydro', 'eu_avg')
+LIST_QUERIES = ('', '?type=ICE', '?type=EV&sort=tco_per_km', '?sort=-co2_g_per_km', '?max_tco_per_km=40')
+START_DATE = date(2024, 1, 1)
+PERCENTILES = (50, 90, 95, 99)
+DEFAULT_THRESHOLD = 0.2
+
+
+def _catalogue_list(rng, ids):
+    return 'GET', '/' + rng.choice(LIST_QUERIES), None
+
+
+def _vehicle_detail(rng, ids):
+    return 'GET', f"/{rng.choice(ids[rng.choice(VEHICLE_TYPES)])}/", None
+
+
+def _calculator_type_avg(rng, ids):
+    return 'POST', '/calculator/', {
+        'analysis_type': 'type_avg',
+        'compare_types': VEHICLE_TYPES,
+        'distance_km': rng.choice((100, 1000, 20000, 200000)),
+        'road_type': rng.choice(ROAD_TYPES),
+        'energy_source': rng.choice(ENERGY_SOURCES),
+    }
+
+
+def _calculator_single(rng, ids):
+    data = {
+        'analysis_type': 'single',
+        'distance_km': rng.choice((100, 1000, 20000)),
+        'road_type': rng.choice(ROAD_TYPES),
+        'energy_source': rng.choice(ENERGY_SOURCES),
+    }
+    for vehicle_type in rng.sample(VEHICLE_TYPES, rng.randint(1, 4)):
+        data[SINGLE_FIELDS[vehicle_type]] = rng.choice(ids[vehicle_type])
+    return 'POST', '/calculator/', data
+
+
+def _simulation_data(rng, days):
+    return {
+        'start_date': START_DATE.isoformat(),
+        'end_date': (START_DATE + timedelta(days=days - 1)).isoformat(),
+        'daily_distance': rng.choice((20, 50, 100)),
+        'daily_hours': rng.choice((2, 8, 12)),
+        'energy_source': rng.choice(ENERGY_SOURCES),
+        'driving_conditions': rng.choice(ROAD_TYPES),
+    }
+
+
+def _simulation_type_avg(rng, ids):
+    data = _simulation_data(rng, 365 * rng.randint(1, 10))
+    data.update({'analysis_type': 'type_avg', 'compare_types': VEHICLE_TYPES})
+    return 'POST', '/vehicle_simulation/', data
+
+
+def _simulation_single(rng, ids):
+    data = _simulation_data(rng, rng.choice((30, 90, 365)))
+    vehicle_type = rng.choice(VEHICLE_TYPES)
+    data.update({'analysis_type': 'single', SINGLE_FIELDS[vehicle_type]: rng.choice(ids[vehicle_type])})
+    return 'POST', '/vehicle_simulation/', data
+
+
+# сценарий: (вес в смеси, построитель запроса)
+SCENARIOS = {
+    'catalogue_list': (30, _catalogue_list),
+    'vehicle_detail': (20, _vehicle_detail),
+    'calculator_type_avg': (15, _calculator_type_avg),
+    'calculator_single': (10, _calculator_single),
+    'simulation_type_avg': (15, _simulation_type_avg),
+    'simulation_single': (10, _simulation_single),
+}
+
+
+def catalogue_ids():
+    """id ТС каждого типа из локальной БД (та же SQLite, что у запущенного сервера)"""
+    return {vtype: list(model.objects.values_list('id', flat=True)) for vtype, model in VEHICLE_MODELS.items()}
+
+
+class Session:
+    """Keep-alive соединение одного виртуального пользователя с cookie и CSRF-токеном"""
+
+    def __init__(self, base_url, timeout):
+        parts = urlsplit(base_url)
+        self.base_url = base_url.rstrip('/')
+        self.https = parts.scheme == 'https'
+        self.host = parts.netloc
+        self.timeout = timeout
+        self.cookies = SimpleCookie()
+        self.connection = None
+
+    def _connect(self):
+        cls = http.client.HTTPSConnection if self.https else http.client.HTTPConnection
+        self.connection = cls(self.host, timeout=self.timeout)
+
+    def request(self, method, path, data=None):
+        """(код ответа, размер ответа); соединение переоткрывается после ошибки"""
+        if self.connection is None:
+            self._connect()
+        headers = {}
+        body = None
+        if self.cookies:
+            headers['Cookie'] = '; '.join(f'{k}={m.value}' for k, m in self.cookies.items())
+        if method == 'POST':
+            body = urlencode(data or {}, doseq=True)
+            headers['Content-Type'] = 'application/x-www-form-urlencoded'
+            headers['Referer'] = self.base_url + path
+            if 'csrftoken' in self.cookies:
+                headers['X-CSRFToken'] = self.cookies['csrftoken'].value
+        try:
+            self.connection.request(method, path, body=body, headers=headers)
+            response = self.connection.getresponse()
+            content = response.read()
+        except (OSError, http.client.HTTPException):
+            self.connection.close()
+            self.connection = None
+            raise
+        for header in response.headers.get_all('Set-Cookie') or []:
+            self.cookies.load(header)
+        return response.status, len(content)
+
+
+def _worker(base_url, ids, deadline, max_requests, counter, lock, results, seed, timeout):
+    rng = random.Random(seed)
+    names = list(SCENARIOS)
+    weights = [SCENARIOS[name][0] for name in names]
+    session = Session(base_url, timeout)
+    try:
+        session.request('GET', '/calculator/')  # cookie csrftoken для POST-форм
+    except (OSError, http.client.HTTPException):
+        pass
+
+    while time.perf_counter() < deadline:
+        with lock:
+            if max_requests and counter[0] >= max_requests:
+                return
+            counter[0] += 1
+        name = rng.choices(names, weights)[0]
+        method, path, data = SCENARIOS[name][1](rng, ids)
+        start = time.perf_counter()
+        try:
+            status, size = session.request(method, path, data)
+            error = status >= 400
+        except (OSError, http.client.HTTPException):
+            status, size, error = None, 0, True
+        results.append((name, time.perf_counter() - start, status, size, error))
+
+
+def run_load(base_url, ids, concurrency=4, duration=30.0, max_requests=None, seed=0, timeout=120.0):
+    """
+    Нагрузка смесью SCENARIOS в concurrency потоков в течение duration секунд
+    (или до max_requests запросов)
+
+    :return: отчет {'meta', 'total', 'scenarios'}
+    """
+    results = []
+    lock = threading.Lock()
+    counter = [0]
+    started = time.perf_counter()
+    deadline = started + duration
+    threads = [
+        threading.Thread(target=_worker, args=(base_url, ids, deadline, max_requests, counter, lock, results,
+                                               seed + i, timeout))
+        for i in range(concurrency)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    return {
+        'meta': {
+            'created_at': datetime.now().isoformat(timespec='seconds'),
+            'base_url': base_url,
+            'concurrency': concurrency,
+            'duration_s': elapsed,
+            'seed': seed,
+            'catalogue': {vtype: len(values) for vtype, values in ids.items()},
+        },
+        'total': summarize(results, elapsed),
+        'scenarios': {name: summarize([r for r in results if r[0] == name], elapsed) for name in SCENARIOS},
+    }
+
+
+def summarize(results, elapsed):
+    """Пропускная способность, перцентили задержки (мс) и доля ошибок"""
+    latencies = np.array([r[1] for r in results]) * 1000
+    errors = sum(1 for r in results if r[4])
+    summary = {
+        'requests': len(results),
+        'errors': errors,
+        'error_rate': errors / len(results) if results else 0.0,
+        'throughput_rps': len(results) / elapsed if elapsed else 0.0,
+        'bytes': sum(r[3] for r in results),
+    }
+    for p in PERCENTILES:
+        summary[f'p{p}_ms'] = float(np.percentile(latencies, p)) if len(latencies) else None
+    summary['max_ms'] = float(latencies.max()) if len(latencies) else None
+    return summary
+
+
+def compare(current, baseline, threshold=DEFAULT_THRESHOLD):
+    """
+    Сравнение с сохраненным прогоном: регрессия - рост p95 или доли ошибок,
+    для итога также падение пропускной способности (по сценариям она зависит от смеси)
+    """
+    rows = []
+    for name in ['total', *SCENARIOS]:
+        now = current['total'] if name == 'total' else current['scenarios'].get(name)
+        base = baseline['total'] if name == 'total' else baseline['scenarios'].get(name)
+        if not now or not base or not now['requests'] or not base['requests']:
+            continue
+        regression = (
+            (name == 'total' and now['throughput_rps'] < base['throughput_rps'] * (1 - threshold))
+            or now['p95_ms'] > base['p95_ms'] * (1 + threshold)
+            or now['error_rate'] > base['error_rate'] + threshold / 10
+        )
+        rows.append({'name': name, 'baseline': base, 'current': now, 'regression': regression})
+    return rows
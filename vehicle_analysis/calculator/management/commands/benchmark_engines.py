@@ -0,0 +1,52 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from calculator import benchmarks
+
+
+class Command(BaseCommand):
+    help = ("Замеры движков расчета на синтетических каталогах (1k-1M ТС) и горизонтах симуляции; "
+            "результат в JSON, сравнение с базовой линией")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', type=int, nargs='+', default=list(benchmarks.DEFAULT_SIZES),
+                            help="Размеры синтетического каталога")
+        parser.add_argument('--horizons', type=int, nargs='+', default=list(benchmarks.DEFAULT_HORIZONS),
+                            help="Горизонты симуляции (дней)")
+        parser.add_argument('--type', dest='vehicle_types', action='append', choices=benchmarks.VEHICLE_TYPES,
+                            help="Тип ТС (можно несколько раз), по умолчанию все")
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--no-plots', action='store_true', help="Не замерять построение графиков")
+        parser.add_argument('--output', help="Файл JSON для результатов")
+        parser.add_argument('--compare', help="Файл JSON базовой линии")
+        parser.add_argument('--threshold', type=float, default=benchmarks.DEFAULT_THRESHOLD,
+                            help="Допустимое замедление (0.2 = 20%%)")
+
+    def handle(self, *args, **options):
+        report = benchmarks.run_benchmarks(
+            sizes=options['sizes'],
+            horizons=options['horizons'],
+            vehicle_types=options['vehicle_types'] or benchmarks.VEHICLE_TYPES,
+            seed=options['seed'],
+            plots=not options['no_plots'],
+            log=self._log,
+        )
+        if options['output']:
+            benchmarks.save(report, options['output'])
+            self.stdout.write(self.style.SUCCESS(f"Результаты сохранены: {options['output']}"))
+
+        if options['compare']:
+            rows = benchmarks.compare(report, benchmarks.load(options['compare']), options['threshold'])
+            regressions = [row for row in rows if row['regression']]
+            for row in rows:
+                line = "{:<60} {:>10.4f} -> {:>10.4f} с  x{:.2f}".format(
+                    ' / '.join(str(part) for part in row['key']), row['baseline_s'], row['current_s'], row['ratio'])
+                self.stdout.write(self.style.ERROR(line) if row['regression'] else line)
+            if regressions:
+                raise CommandError(f"Замедление более чем на {options['threshold']:.0%}: {len(regressions)} замеров")
+            self.stdout.write(self.style.SUCCESS(f"Регрессий нет ({len(rows)} замеров)"))
+
+    def _log(self, result):
+        horizon = f" {result['horizon_days']} дн" if result['horizon_days'] else ''
+        per_item = f"  {result['per_item_us']:.2f} мкс/ед" if result['per_item_us'] else ''
+        self.stdout.write(f"{result['name']:<18} {result['vehicle_type']:<5} {result['size']:>9}{horizon}: "
+                          f"{result['best_s'] * 1000:.2f} мс{per_item}")
@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from calculator import benchmarks
+
+
+class Command(BaseCommand):
+    help = ("Проверка холодного старта воркера: время настройки Django и импорта URLconf в новом процессе "
+            "и отсутствие тяжелых зависимостей (pandas, plotly) в импорте")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeat', type=int, default=5, help="Число запусков (берется лучший)")
+        parser.add_argument('--budget-ms', type=float, default=benchmarks.STARTUP_BUDGET_MS,
+                            help="Допустимое время импорта (мс)")
+
+    def handle(self, *args, **options):
+        result = benchmarks.benchmark_startup(options['repeat'])
+        self.stdout.write(
+            f"Импорт: лучший {result['best_s'] * 1000:.0f} мс, медиана {result['median_s'] * 1000:.0f} мс; "
+            f"процесс целиком {result['process_s'] * 1000:.0f} мс"
+        )
+
+        failures = []
+        if result['heavy_modules']:
+            failures.append(f"при старте загружены {', '.join(result['heavy_modules'])}")
+        if result['best_s'] * 1000 > options['budget_ms']:
+            failures.append(f"импорт {result['best_s'] * 1000:.0f} мс > {options['budget_ms']:.0f} мс")
+        if failures:
+            raise CommandError('; '.join(failures))
+        self.stdout.write(self.style.SUCCESS("Бюджет старта соблюден"))
@@ -0,0 +1,42 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.test.utils import setup_test_environment, teardown_test_environment
+
+from calculator import budgets
+
+
+class Command(BaseCommand):
+    help = ("Проверка бюджетов представлений: число SQL-запросов (холодный/теплый проход) и пиковый прирост "
+            "памяти (tracemalloc) на один запрос с фиксированными данными; каталог - из локальной БД "
+            "(см. seed_catalogue)")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--view', dest='views', action='append',
+                            help="Проверить только это представление (можно несколько раз)")
+        parser.add_argument('--memory-scale', type=float, default=1.0,
+                            help="Множитель бюджетов памяти (для каталога больше стандартного)")
+
+    def handle(self, *args, **options):
+        if not all(budgets.first_ids().values()):
+            raise CommandError("Каталог пуст хотя бы для одного типа ТС - выполните seed_catalogue")
+
+        setup_test_environment()
+        try:
+            rows = budgets.check_views(only=options['views'], scale=options['memory_scale'])
+        finally:
+            teardown_test_environment()
+
+        for row in rows:
+            line = "{:<22} {:>3}  запросов {:>3}/{:<3} (холодный {:>3})  память {:>8.0f}/{:<8.0f} КБ".format(
+                row['name'], row['status'], row['queries'], row['max_queries'], row['cold_queries'],
+                row['peak_kb'], row['max_peak_kb'])
+            if not row['failures']:
+                self.stdout.write(line)
+                continue
+            self.stdout.write(self.style.ERROR(f"{line}  {'; '.join(row['failures'])}"))
+            for sql, count in row['duplicates'].items():
+                self.stdout.write(f"    x{count} {sql[:200]}")
+
+        failed = [row['name'] for row in rows if row['failures']]
+        if failed:
+            raise CommandError(f"Превышен бюджет: {', '.join(failed)}")
+        self.stdout.write(self.style.SUCCESS(f"Бюджеты соблюдены ({len(rows)} представлений)"))
@@ -0,0 +1,62 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from calculator import benchmarks, loadtest
+
+
+class Command(BaseCommand):
+    help = ("Нагрузочный тест запущенного сервера (runserver/ASGI) смесью запросов к каталогу, "
+            "калькулятору и симулятору; каталог - из локальной БД (см. seed_catalogue)")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--base-url', default='http://127.0.0.1:8000')
+        parser.add_argument('--concurrency', type=int, default=4, help="Число виртуальных пользователей")
+        parser.add_argument('--duration', type=float, default=30.0, help="Длительность (сек)")
+        parser.add_argument('--requests', type=int, help="Остановиться после стольких запросов")
+        parser.add_argument('--timeout', type=float, default=120.0, help="Таймаут запроса (сек)")
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--output', help="Файл JSON для результатов")
+        parser.add_argument('--compare', help="Файл JSON предыдущего прогона")
+        parser.add_argument('--threshold', type=float, default=loadtest.DEFAULT_THRESHOLD)
+
+    def handle(self, *args, **options):
+        ids = loadtest.catalogue_ids()
+        if not all(ids.values()):
+            raise CommandError("Каталог пуст хотя бы для одного типа ТС - выполните seed_catalogue")
+
+        report = loadtest.run_load(
+            options['base_url'], ids,
+            concurrency=options['concurrency'],
+            duration=options['duration'],
+            max_requests=options['requests'],
+            seed=options['seed'],
+            timeout=options['timeout'],
+        )
+        self._print_row('total', report['total'])
+        for name, summary in report['scenarios'].items():
+            self._print_row(name, summary)
+
+        if options['output']:
+            benchmarks.save(report, options['output'])
+            self.stdout.write(self.style.SUCCESS(f"Результаты сохранены: {options['output']}"))
+
+        if options['compare']:
+            rows = loadtest.compare(report, benchmarks.load(options['compare']), options['threshold'])
+            for row in rows:
+                base, now = row['baseline'], row['current']
+                line = "{:<22} {:>8.2f} -> {:>8.2f} req/s  p95 {:>9.1f} -> {:>9.1f} мс  ошибки {:.1%} -> {:.1%}".format(
+                    row['name'], base['throughput_rps'], now['throughput_rps'], base['p95_ms'], now['p95_ms'],
+                    base['error_rate'], now['error_rate'])
+                self.stdout.write(self.style.ERROR(line) if row['regression'] else line)
+            regressions = [row['name'] for row in rows if row['regression']]
+            if regressions:
+                raise CommandError(f"Ухудшение относительно базового прогона: {', '.join(regressions)}")
+
+    def _print_row(self, name, summary):
+        if not summary['requests']:
+            self.stdout.write(f"{name:<22} нет запросов")
+            return
+        self.stdout.write(
+            f"{name:<22} {summary['requests']:>6} запр  {summary['throughput_rps']:>8.2f} req/s  "
+            f"p50 {summary['p50_ms']:>8.1f}  p95 {summary['p95_ms']:>8.1f}  p99 {summary['p99_ms']:>8.1f} мс  "
+            f"ошибки {summary['error_rate']:.1%}"
+        )
@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from calculator.metrics import rebuild_vehicle_metrics
+from vehicles.catalogue import VEHICLE_MODELS, bump_catalogue_version
+
+
+class Command(BaseCommand):
+    help = "Пересобирает таблицу VehicleMetrics по текущему каталогу"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--type', dest='vehicle_types', action='append', choices=list(VEHICLE_MODELS),
+                            help="Тип ТС (можно несколько раз), по умолчанию все")
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        total = rebuild_vehicle_metrics(options['vehicle_types'], batch_size=options['batch_size'])
+        # показатели на страницах каталога изменились - новая версия сбрасывает ETag и кэш фрагментов
+        bump_catalogue_version()
+        self.stdout.write(self.style.SUCCESS(f"Пересчитано показателей: {total}"))
@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from calculator.warmup import run_warm_up
+
+
+class Command(BaseCommand):
+    help = ("Прогрев кэшей: таблица показателей каталога, индекс ранжирования, безубыточность, профили сети "
+            "и стандартные сценарии калькулятора и симулятора. Общие для воркеров кэши (БД, файлы .npy) "
+            "остаются прогретыми; для кэшей в памяти воркера включите WARM_UP_ON_STARTUP")
+
+    def handle(self, *args, **options):
+        timings = run_warm_up(log=self._log)
+        total = sum(seconds for _, seconds in timings)
+        self.stdout.write(self.style.SUCCESS(f"Прогрев завершен за {total:.2f} с"))
+
+    def _log(self, label, seconds):
+        self.stdout.write(f"{label:<20} {seconds:.2f} с")
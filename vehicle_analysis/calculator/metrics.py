@@ -0,0 +1,118 @@
+import math
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.db import transaction
+
+from vehicles.catalogue import VEHICLE_MODELS, VehicleArrays
+from .engines.cost import TCOService
+from .engines.dynamics import VehicleDynamics
+from .engines.emissions import EmissionsCalculator
+from .engines.energy import EnergyCalculator
+from .models import VehicleMetrics
+
+STANDARD_ROAD_TYPE = 'mixed'
+STANDARD_ENERGY_SOURCE = 'eu_avg'
+REFERENCE_DISTANCE_KM = 100  # пробег для расчета энергии и выбросов на км
+CRUISE_SPEED_KMH = 100
+
+_deferred_types = ContextVar('deferred_vehicle_metrics', default=None)  # типы ТС, измененные при загрузке
+
+
+def _value(x):
+    x = float(x)
+    return None if math.isnan(x) or math.isinf(x) else x
+
+
+def _consumption(vehicles, i):
+    """
+    Расход и единица, как в списке каталога: расход топлива, если задан, иначе электроэнергии
+    (у PHEV обоих полей нет - расход пустой)
+    """
+    fuel = vehicles.columns.get('fuel_consumption_lp100km')
+    if fuel is not None and _value(fuel[i]):
+        return _value(fuel[i]), 'л/100км'
+    energy = vehicles.columns.get('energy_consumption_kwhp100km')
+    return (None if energy is None else _value(energy[i])), 'кВт·ч/100км'
+
+
+def compute_vehicle_metrics(vehicles):
+    """Строки VehicleMetrics для VehicleArrays одного типа (расчет векторный)"""
+    lifetime_km = TCOService.ANNUAL_KM * TCOService.LIFETIME_YEARS
+    tco_total = TCOService._calculate_total_cost(vehicles, lifetime_km, STANDARD_ROAD_TYPE)
+    energy = EnergyCalculator.calculate_energy_consumption(vehicles, REFERENCE_DISTANCE_KM, STANDARD_ROAD_TYPE)
+    energy_mj = energy['energy_mj'] if 'energy_mj' in energy else energy['total_energy_mj']
+    co2 = EmissionsCalculator.calculate_co2(vehicles, REFERENCE_DISTANCE_KM, STANDARD_ENERGY_SOURCE,
+                                            STANDARD_ROAD_TYPE)
+    cruise = VehicleDynamics().calculate_required_force(vehicles, CRUISE_SPEED_KMH, 0)
+    consumption = [_consumption(vehicles, i) for i in range(len(vehicles))]
+
+    return [
+        VehicleMetrics(
+            vehicle_type=vehicles.vehicle_type,
+            vehicle_id=int(vehicles.id[i]),
+            mark_name=vehicles.mark_name[i] or '',
+            model_name=vehicles.model_name[i] or '',
+            mass_kg=_value(vehicles.mass_kg[i]),
+            consumption=consumption[i][0],
+            consumption_unit=consumption[i][1],
+            tco_total=_value(tco_total[i]),
+            tco_per_km=_value(tco_total[i] / lifetime_km),
+            co2_g_per_km=_value(co2[i] / REFERENCE_DISTANCE_KM),
+            energy_mj_per_km=_value(energy_mj[i] / REFERENCE_DISTANCE_KM),
+            cruise_power_kw=_value(cruise['power_kw'][i]),
+        )
+        for i in range(len(vehicles))
+    ]
+
+
+def rebuild_vehicle_metrics(vehicle_types=None, batch_size=1000):
+    """Полная пересборка таблицы показателей для указанных типов (по умолчанию всех)"""
+    total = 0
+    for vehicle_type in vehicle_types or VEHICLE_MODELS:
+        rows = compute_vehicle_metrics(VehicleArrays.load(vehicle_type))
+        with transaction.atomic():
+            VehicleMetrics.objects.filter(vehicle_type=vehicle_type).delete()
+            VehicleMetrics.objects.bulk_create(rows, batch_size=batch_size)
+        total += len(rows)
+    return total
+
+
+def refresh_vehicle_metrics(vehicle_type, vehicle_id):
+    """Пересчет строки показателей одного ТС"""
+    model = VEHICLE_MODELS[vehicle_type]
+    rows = compute_vehicle_metrics(VehicleArrays.load(vehicle_type, model.objects.filter(pk=vehicle_id)))
+    with transaction.atomic():
+        delete_vehicle_metrics(vehicle_type, vehicle_id)
+        VehicleMetrics.objects.bulk_create(rows)
+
+
+def delete_vehicle_metrics(vehicle_type, vehicle_id):
+    VehicleMetrics.objects.filter(vehicle_type=vehicle_type, vehicle_id=vehicle_id).delete()
+
+
+@contextmanager
+def deferred_vehicle_metrics(rebuild=True):
+    """
+    Пакетная загрузка ТС (импорт в админке): сигналы сохранения не пересчитывают строку
+    показателей на каждое ТС, таблица пересобирается один раз на выходе по измененным типам
+
+    :param rebuild: False - не пересобирать (пробный импорт откатывается целиком)
+    """
+    touched = set()
+    token = _deferred_types.set(touched)
+    try:
+        yield
+    finally:
+        _deferred_types.reset(token)
+    if rebuild and touched:
+        rebuild_vehicle_metrics(sorted(touched))
+
+
+def defer_vehicle_metrics(vehicle_type):
+    """True, если идет пакетная загрузка: пересчет типа отложен до ее конца"""
+    touched = _deferred_types.get()
+    if touched is None:
+        return False
+    touched.add(vehicle_type)
+    return True
@@ -0,0 +1,84 @@
+import json
+import logging
+import random
+import time
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+
+from . import prometheus
+from .instrumentation import engine_tally, start_request, finish_request
+from .profiling import profile_requested, profile_call, save_profile
+
+logger = logging.getLogger(__name__)
+
+
+class ServerTimingMiddleware:
+    """
+    Замер этапов запроса (db, engine, plots, template) для доли запросов
+    SERVER_TIMING_SAMPLE_RATE: результат отдается в заголовке Server-Timing
+    и пишется в лог одной JSON-строкой.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if random.random() >= getattr(settings, 'SERVER_TIMING_SAMPLE_RATE', 0):
+            return self.get_response(request)
+
+        timings, token = start_request()
+        try:
+            with ExitStack() as stack:
+                for alias in connections:
+                    stack.enter_context(connections[alias].execute_wrapper(timings.record_query))
+                response = self.get_response(request)
+        finally:
+            finish_request(token)
+
+        response['Server-Timing'] = timings.server_timing()
+        logger.info(json.dumps(dict(
+            timings.as_dict(),
+            method=request.method,
+            path=request.path,
+            view=getattr(request.resolver_match, 'view_name', None),
+            status=response.status_code,
+        ), ensure_ascii=False))
+        return response
+
+
+class MetricsMiddleware:
+    """
+    Гистограмма времени ответа по представлениям (http_request_duration_seconds для /metrics);
+    счетчики движков запроса пишутся один раз по его завершении (engine_tally)
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        start = time.perf_counter()
+        with engine_tally():
+            response = self.get_response(request)
+        view = getattr(request.resolver_match, 'view_name', None) or 'unmatched'
+        prometheus.REQUEST_LATENCY.observe(time.perf_counter() - start, view=view, method=request.method)
+        return response
+
+
+class ProfilingMiddleware:
+    """
+    cProfile запроса по ?profile=1 или заголовку X-Profile (только is_staff).
+    Профиль сохраняется в RequestProfile, его id возвращается в заголовке X-Profile-Id.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not profile_requested(request):
+            return self.get_response(request)
+        response, profiler, seconds = profile_call(self.get_response, request)
+        profile = save_profile(request, response, profiler, seconds)
+        response['X-Profile-Id'] = str(profile.pk)
+        return response
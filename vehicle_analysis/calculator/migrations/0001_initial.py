@@ -0,0 +1,39 @@
+# Generated by Django 5.2 on 2026-10-19 09:28
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='VehicleMetrics',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('vehicle_type', models.CharField(choices=[('ICE', 'ДВС'), ('EV', 'Электромобиль'), ('HEV', 'Гибрид'), ('PHEV', 'Заряжаемый гибрид')], max_length=4, verbose_name='Тип ТС')),
+                ('vehicle_id', models.PositiveBigIntegerField(verbose_name='ID ТС')),
+                ('mark_name', models.CharField(default='', max_length=120, verbose_name='Название марки')),
+                ('model_name', models.CharField(max_length=100, verbose_name='Название модели')),
+                ('mass_kg', models.FloatField(null=True, verbose_name='Масса (кг)')),
+                ('consumption', models.FloatField(null=True, verbose_name='Расход на 100 км')),
+                ('consumption_unit', models.CharField(max_length=16, verbose_name='Единица расхода')),
+                ('tco_total', models.FloatField(null=True, verbose_name='TCO (руб)')),
+                ('tco_per_km', models.FloatField(db_index=True, null=True, verbose_name='TCO (руб/км)')),
+                ('co2_g_per_km', models.FloatField(db_index=True, null=True, verbose_name='Выбросы CO₂ (г/км)')),
+                ('energy_mj_per_km', models.FloatField(db_index=True, null=True, verbose_name='Энергия (МДж/км)')),
+                ('cruise_power_kw', models.FloatField(db_index=True, null=True, verbose_name='Мощность на 100 км/ч (кВт)')),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Показатели ТС',
+                'verbose_name_plural': 'Показатели ТС',
+                'indexes': [models.Index(fields=['vehicle_type', 'tco_per_km'], name='calculator__vehicle_aa689a_idx'), models.Index(fields=['vehicle_type', 'co2_g_per_km'], name='calculator__vehicle_e02e79_idx'), models.Index(fields=['vehicle_type', 'energy_mj_per_km'], name='calculator__vehicle_f9d487_idx')],
+                'constraints': [models.UniqueConstraint(fields=('vehicle_type', 'vehicle_id'), name='unique_vehicle_metrics')],
+            },
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 5.2 on 2026-10-19 09:38
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('calculator', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RequestProfile',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True, db_index=True, verbose_name='Создан')),
+                ('method', models.CharField(max_length=10, verbose_name='Метод')),
+                ('path', models.CharField(max_length=500, verbose_name='Путь')),
+                ('query_string', models.TextField(blank=True, verbose_name='Параметры запроса')),
+                ('view_name', models.CharField(blank=True, max_length=200, verbose_name='Представление')),
+                ('username', models.CharField(blank=True, max_length=150, verbose_name='Пользователь')),
+                ('status_code', models.PositiveSmallIntegerField(null=True, verbose_name='Код ответа')),
+                ('duration_ms', models.FloatField(verbose_name='Длительность (мс)')),
+                ('report', models.TextField(verbose_name='Отчет')),
+                ('stats', models.BinaryField(verbose_name='Данные pstats')),
+            ],
+            options={
+                'verbose_name': 'Профиль запроса',
+                'verbose_name_plural': 'Профили запросов',
+                'ordering': ['-created_at'],
+            },
+        ),
+    ]
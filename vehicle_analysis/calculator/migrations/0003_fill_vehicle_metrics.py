@@ -0,0 +1,20 @@
+from django.db import migrations
+
+
+def fill_vehicle_metrics(apps, schema_editor):
+    # показатели считают движки калькулятора по текущим моделям каталога
+    # (как команда rebuild_vehicle_metrics); пустой каталог - пустая таблица
+    from calculator.metrics import rebuild_vehicle_metrics
+    rebuild_vehicle_metrics()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('calculator', '0002_requestprofile'),
+        ('vehicles', '0009_catalogueversion'),
+    ]
+
+    operations = [
+        migrations.RunPython(fill_vehicle_metrics, migrations.RunPython.noop),
+    ]
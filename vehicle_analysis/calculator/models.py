@@ -0,0 +1,72 @@
+from django.db import models
+
+
+class VehicleMetrics(models.Model):
+    """
+    Денормализованные показатели ТС в стандартном сценарии
+    (пробег за срок службы, смешанный цикл, цены по умолчанию, среднее по ЕС).
+    Поддерживается сигналами и командой rebuild_vehicle_metrics.
+    """
+    VEHICLE_TYPES = (
+        ('ICE', 'ДВС'),
+        ('EV', 'Электромобиль'),
+        ('HEV', 'Гибрид'),
+        ('PHEV', 'Заряжаемый гибрид'),
+    )
+
+    vehicle_type = models.CharField(max_length=4, choices=VEHICLE_TYPES, verbose_name="Тип ТС")
+    vehicle_id = models.PositiveBigIntegerField(verbose_name="ID ТС")
+
+    mark_name = models.CharField(max_length=120, verbose_name="Название марки", default='')
+    model_name = models.CharField(max_length=100, verbose_name="Название модели")
+    mass_kg = models.FloatField(verbose_name="Масса (кг)", null=True)
+    consumption = models.FloatField(verbose_name="Расход на 100 км", null=True)
+    consumption_unit = models.CharField(max_length=16, verbose_name="Единица расхода")
+
+    tco_total = models.FloatField(verbose_name="TCO (руб)", null=True)
+    tco_per_km = models.FloatField(verbose_name="TCO (руб/км)", null=True, db_index=True)
+    co2_g_per_km = models.FloatField(verbose_name="Выбросы CO₂ (г/км)", null=True, db_index=True)
+    energy_mj_per_km = models.FloatField(verbose_name="Энергия (МДж/км)", null=True, db_index=True)
+    cruise_power_kw = models.FloatField(verbose_name="Мощность на 100 км/ч (кВт)", null=True, db_index=True)
+
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = "Показатели ТС"
+        verbose_name_plural = "Показатели ТС"
+        constraints = [
+            models.UniqueConstraint(fields=['vehicle_type', 'vehicle_id'], name='unique_vehicle_metrics'),
+        ]
+        indexes = [
+            models.Index(fields=['vehicle_type', 'tco_per_km']),
+            models.Index(fields=['vehicle_type', 'co2_g_per_km']),
+            models.Index(fields=['vehicle_type', 'energy_mj_per_km']),
+        ]
+
+    def __str__(self):
+        return f"{self.mark_name} {self.model_name} ({self.vehicle_type})"
+
+
+class RequestProfile(models.Model):
+    """
+    Профиль cProfile запроса сотрудника (?profile=1 или заголовок X-Profile).
+    Хранятся последние REQUEST_PROFILE_LIMIT профилей (кольцевой буфер).
+    """
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True, verbose_name="Создан")
+    method = models.CharField(max_length=10, verbose_name="Метод")
+    path = models.CharField(max_length=500, verbose_name="Путь")
+    query_string = models.TextField(blank=True, verbose_name="Параметры запроса")
+    view_name = models.CharField(max_length=200, blank=True, verbose_name="Представление")
+    username = models.CharField(max_length=150, blank=True, verbose_name="Пользователь")
+    status_code = models.PositiveSmallIntegerField(null=True, verbose_name="Код ответа")
+    duration_ms = models.FloatField(verbose_name="Длительность (мс)")
+    report = models.TextField(verbose_name="Отчет")
+    stats = models.BinaryField(verbose_name="Данные pstats")
+
+    class Meta:
+        ordering = ['-created_at']
+        verbose_name = "Профиль запроса"
+        verbose_name_plural = "Профили запросов"
+
+    def __str__(self):
+        return f"{self.method} {self.path} ({self.duration_ms:.0f} мс)"
@@ -0,0 +1,61 @@
+import cProfile
+import io
+import marshal
+import pstats
+import time
+
+from django.conf import settings
+
+from .models import RequestProfile
+
+# функции, для которых в отчет добавляется дерево вызываемых функций
+CALL_TREE_FUNCTIONS = ('run_simulation', 'calculate_results', 'create_plots', '_generate_plots')
+REPORT_LIMIT = 60  # строк в сводке по cumulative
+
+
+def profile_requested(request):
+    """Профилирование по ?profile=1 или заголовку X-Profile, только для сотрудников"""
+    if not (request.GET.get('profile') or request.headers.get('X-Profile')):
+        return False
+    user = getattr(request, 'user', None)
+    return bool(user and user.is_staff)
+
+
+def profile_call(func, *args):
+    """Вызов func под cProfile: (результат, профайлер, длительность в секундах)"""
+    profiler = cProfile.Profile()
+    start = time.perf_counter()
+    result = profiler.runcall(func, *args)
+    return result, profiler, time.perf_counter() - start
+
+
+def build_report(profiler):
+    """Текстовый отчет pstats и данные в формате .prof (marshal, как pstats.dump_stats)"""
+    stream = io.StringIO()
+    stats = pstats.Stats(profiler, stream=stream).sort_stats('cumulative')
+    stats.print_stats(REPORT_LIMIT)
+    for name in CALL_TREE_FUNCTIONS:
+        if any(func[2] == name for func in stats.stats):
+            stats.print_callees(rf'\({name}\)')
+    return stream.getvalue(), marshal.dumps(stats.stats)
+
+
+def save_profile(request, response, profiler, seconds):
+    """Сохраняет профиль и удаляет самые старые сверх REQUEST_PROFILE_LIMIT"""
+    report, data = build_report(profiler)
+    profile = RequestProfile.objects.create(
+        method=request.method,
+        path=request.path[:500],
+        query_string=request.META.get('QUERY_STRING', ''),
+        view_name=getattr(request.resolver_match, 'view_name', None) or '',
+        username=request.user.get_username(),
+        status_code=response.status_code,
+        duration_ms=seconds * 1000,
+        report=report,
+        stats=data,
+    )
+    limit = getattr(settings, 'REQUEST_PROFILE_LIMIT', 50)
+    stale = list(RequestProfile.objects.order_by('-created_at', '-id').values_list('id', flat=True)[limit:])
+    if stale:
+        RequestProfile.objects.filter(id__in=stale).delete()
+    return profile
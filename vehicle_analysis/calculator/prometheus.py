@@ -0,0 +1,259 @@
+import mmap
+import os
+import struct
+import threading
+from collections import defaultdict
+from pathlib import Path
+
+from django.conf import settings
+
+try:
+    import fcntl
+except ImportError:  # Windows: файлы завершившихся процессов не сворачиваются
+    fcntl = None
+
+INITIAL_FILE_SIZE = 64 * 1024
+_HEADER = struct.Struct('<Q')  # занятая длина файла
+_KEY_LENGTH = struct.Struct('<I')
+_VALUE = struct.Struct('<d')
+DEAD_PROCESSES_FILE = 'metrics-dead.db'  # накопленные значения завершившихся процессов
+
+_lock = threading.Lock()
+_store = None
+
+
+class MmapStore:
+    """
+    Значения метрик одного процесса в файле METRICS_DIR/metrics-<pid>.db, отображенном в память.
+
+    Формат: занятая длина (uint64), затем записи [длина ключа uint32][ключ][выравнивание до 8][float64].
+    Каждый процесс пишет только в свой файл (без межпроцессных блокировок),
+    /metrics суммирует значения по всем файлам каталога; файлы завершившихся процессов
+    сворачиваются в metrics-dead.db (fold_dead_processes).
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.pid = os.getpid()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._file = open(self.path, 'a+b')
+        if os.fstat(self._file.fileno()).st_size < INITIAL_FILE_SIZE:
+            self._file.truncate(INITIAL_FILE_SIZE)
+        self._map = mmap.mmap(self._file.fileno(), 0)
+        self._used = _HEADER.unpack_from(self._map, 0)[0] or _HEADER.size
+        self._offsets = {key: offset for key, offset, _ in read_records(self._map)}
+
+    def inc(self, key, amount=1.0):
+        offset = self._offsets.get(key)
+        if offset is None:
+            offset = self._add_key(key)
+        value = _VALUE.unpack_from(self._map, offset)[0]
+        _VALUE.pack_into(self._map, offset, value + amount)
+
+    def close(self):
+        self._map.close()
+        self._file.close()
+
+    def _add_key(self, key):
+        encoded = key.encode('utf-8')
+        padded = _KEY_LENGTH.size + len(encoded)
+        padded += -padded % 8
+        record_size = padded + _VALUE.size
+        if self._used + record_size > len(self._map):
+            self._grow(self._used + record_size)
+        _KEY_LENGTH.pack_into(self._map, self._used, len(encoded))
+        self._map[self._used + _KEY_LENGTH.size:self._used + _KEY_LENGTH.size + len(encoded)] = encoded
+        offset = self._used + padded
+        _VALUE.pack_into(self._map, offset, 0.0)
+        self._used += record_size
+        # запись видна читателям только после обновления заголовка
+        _HEADER.pack_into(self._map, 0, self._used)
+        self._offsets[key] = offset
+        return offset
+
+    def _grow(self, required):
+        size = len(self._map)
+        while size < required:
+            size *= 2
+        self._map.close()
+        self._file.truncate(size)
+        self._map = mmap.mmap(self._file.fileno(), 0)
+
+
+def read_records(buffer):
+    """(ключ, смещение значения, значение) всех записей файла метрик"""
+    used = _HEADER.unpack_from(buffer, 0)[0]
+    pos = _HEADER.size
+    while pos < used:
+        length = _KEY_LENGTH.unpack_from(buffer, pos)[0]
+        key = bytes(buffer[pos + _KEY_LENGTH.size:pos + _KEY_LENGTH.size + length]).decode('utf-8')
+        padded = _KEY_LENGTH.size + length
+        padded += -padded % 8
+        offset = pos + padded
+        yield key, offset, _VALUE.unpack_from(buffer, offset)[0]
+        pos = offset + _VALUE.size
+
+
+def get_store():
+    """Хранилище текущего процесса (после fork воркер открывает свой файл)"""
+    global _store
+    if _store is None or _store.pid != os.getpid():
+        _store = MmapStore(Path(settings.METRICS_DIR) / f'metrics-{os.getpid()}.db')
+    return _store
+
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def fold_dead_processes():
+    """
+    Файлы metrics-<pid>.db завершившихся процессов (перезапуски воркеров): значения
+    добавляются в METRICS_DIR/metrics-dead.db, чтобы счетчики не убывали, файлы удаляются
+    """
+    if fcntl is None:
+        return
+    root = Path(settings.METRICS_DIR)
+    root.mkdir(parents=True, exist_ok=True)
+    with open(root / 'fold.lock', 'a') as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        dead = [path for path in root.glob('metrics-*.db')
+                if path.stem[8:].isdigit() and not _pid_alive(int(path.stem[8:]))]
+        if not dead:
+            return
+        aggregate = MmapStore(root / DEAD_PROCESSES_FILE)
+        try:
+            for path in dead:
+                with open(path, 'rb') as f:
+                    data = f.read()
+                if len(data) >= _HEADER.size:
+                    for key, _, value in read_records(data):
+                        aggregate.inc(key, value)
+                aggregate._map.flush()
+                path.unlink()
+        finally:
+            aggregate.close()
+
+
+def collect():
+    """Сумма значений по файлам всех процессов (файлы завершившихся сначала сворачиваются)"""
+    fold_dead_processes()
+    totals = defaultdict(float)
+    for path in Path(settings.METRICS_DIR).glob('metrics-*.db'):
+        with open(path, 'rb') as f:
+            data = f.read()
+        if len(data) < _HEADER.size:
+            continue
+        for key, _, value in read_records(data):
+            totals[key] += value
+    return totals
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _sample_key(name, labels):
+    if not labels:
+        return name
+    return name + '{' + ','.join(f'{label}="{_escape(value)}"' for label, value in labels) + '}'
+
+
+class Metric:
+    kind = None
+    registry = []
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        Metric.registry.append(self)
+
+    def _labels(self, labels):
+        return [(name, labels.get(name, '')) for name in self.labelnames]
+
+    def _inc(self, key, amount):
+        with _lock:
+            get_store().inc(key, amount)
+
+
+class Counter(Metric):
+    kind = 'counter'
+
+    def inc(self, amount=1.0, **labels):
+        self._inc(_sample_key(self.name, self._labels(labels)), amount)
+
+
+class Histogram(Metric):
+    """Гистограмма: накопленные счетчики корзин (le), сумма и количество наблюдений"""
+
+    kind = 'histogram'
+    DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(buckets) + (float('inf'),)
+
+    def observe(self, value, **labels):
+        labels = self._labels(labels)
+        with _lock:
+            store = get_store()
+            for bound in self.buckets:
+                if value <= bound:
+                    le = '+Inf' if bound == float('inf') else repr(float(bound))
+                    store.inc(_sample_key(self.name + '_bucket', labels + [('le', le)]))
+            store.inc(_sample_key(self.name + '_sum', labels), value)
+            store.inc(_sample_key(self.name + '_count', labels))
+
+
+def render(gauges=()):
+    """
+    Текст в формате Prometheus
+
+    :param gauges: [(имя, описание, [(метки, значение), ...]), ...] - значения, снимаемые в момент запроса
+    """
+    totals = collect()
+    lines = []
+    for metric in Metric.registry:
+        lines.append(f'# HELP {metric.name} {metric.documentation}')
+        lines.append(f'# TYPE {metric.name} {metric.kind}')
+        prefixes = (metric.name + '{', metric.name + '_bucket', metric.name + '_sum', metric.name + '_count')
+        for key in sorted(totals):
+            if key == metric.name or key.startswith(prefixes):
+                lines.append(f'{key} {totals[key]!r}')
+    for name, documentation, samples in gauges:
+        lines.append(f'# HELP {name} {documentation}')
+        lines.append(f'# TYPE {name} gauge')
+        for labels, value in samples:
+            lines.append(f'{_sample_key(name, labels)} {float(value)!r}')
+    return '\n'.join(lines) + '\n'
+
+
+REQUEST_LATENCY = Histogram(
+    'http_request_duration_seconds', 'Время обработки запроса по представлениям', ('view', 'method'))
+ENGINE_CALLS = Counter('engine_calls_total', 'Вызовы движков расчета', ('engine', 'vehicle_type'))
+ENGINE_SECONDS = Counter(
+    'engine_duration_seconds_total', 'Суммарное время движков расчета', ('engine', 'vehicle_type'))
+CACHE_REQUESTS = Counter('cache_requests_total', 'Обращения к кэшам расчетов', ('cache', 'result'))
+ADMISSION_DECISIONS = Counter(
+    'admission_decisions_total', 'Допуск тяжелых запросов: light/heavy/queued/background/rejected',
+    ('view', 'decision'))
+SIMULATED_DAYS = Counter('simulated_days_total', 'Смоделированные дни (ТС x дни)', ('vehicle_type',))
+SIMULATION_LATENCY = Histogram(
+    'simulation_duration_seconds', 'Время run_simulation по длине периода (дней, не более)', ('range_days',),
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5))
+SIMULATION_RANGES = (31, 92, 366, 1827)
+
+
+def simulation_range_label(days):
+    """Метка длины периода симуляции: верхняя граница из SIMULATION_RANGES"""
+    for bound in SIMULATION_RANGES:
+        if days <= bound:
+            return str(bound)
+    return '+Inf'
@@ -0,0 +1,25 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from vehicles.catalogue import VEHICLE_MODELS
+from .engines.ranking import metrics_index
+from .metrics import defer_vehicle_metrics, refresh_vehicle_metrics, delete_vehicle_metrics
+
+
+@receiver(post_save)
+def on_vehicle_saved(sender, instance, **kwargs):
+    if sender in VEHICLE_MODELS.values():
+        # при пакетной загрузке индекс пересоберется при следующем запросе (версия каталога ушла вперед)
+        if defer_vehicle_metrics(sender.vehicle_type):
+            return
+        refresh_vehicle_metrics(sender.vehicle_type, instance.pk)
+        metrics_index.update_vehicle(sender.vehicle_type, instance.pk)
+
+
+@receiver(post_delete)
+def on_vehicle_deleted(sender, instance, **kwargs):
+    if sender in VEHICLE_MODELS.values():
+        if defer_vehicle_metrics(sender.vehicle_type):
+            return
+        delete_vehicle_metrics(sender.vehicle_type, instance.pk)
+        metrics_index.update_vehicle(sender.vehicle_type, instance.pk, deleted=True)
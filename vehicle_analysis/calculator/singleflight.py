@@ -0,0 +1,210 @@
+import hashlib
+import json
+import logging
+import os
+import pickle
+import stat
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from datetime import date, datetime
+from decimal import Decimal
+from pathlib import Path
+
+from django.conf import settings
+from django.db import models
+
+from . import prometheus
+from .instrumentation import stage
+
+try:
+    import fcntl
+except ImportError:  # Windows: объединение только между потоками одного процесса
+    fcntl = None
+
+SINGLE_FLIGHT_DIR = 'single_flight'
+POLL_INTERVAL = 0.05  # сек между попытками взять блокировку
+RESULT_KEEP_SECONDS = 300  # файлы результатов старше удаляются
+LOCK_KEEP_SECONDS = 24 * 60 * 60  # файлы блокировок, не использовавшиеся дольше, удаляются
+
+_thread_locks = defaultdict(threading.Lock)  # ключ -> блокировка, если нет fcntl
+
+logger = logging.getLogger(__name__)
+
+
+def _normalize(value):
+    if isinstance(value, models.Model):
+        return [value._meta.label, value.pk]
+    if isinstance(value, dict):
+        return {str(key): _normalize(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_normalize(item) for item in value]
+    if isinstance(value, (set, frozenset)):
+        return sorted(_normalize(item) for item in value)
+    if isinstance(value, (date, datetime, Decimal)):
+        return str(value)
+    return value
+
+
+def input_hash(namespace, data, exclude=()):
+    """
+    Хэш нормализованных входов расчета: ТС - по модели и pk, даты и Decimal - строками,
+    порядок списков сохраняется (от него зависит порядок результатов)
+    """
+    payload = {key: value for key, value in data.items() if key not in exclude}
+    raw = json.dumps([namespace, _normalize(payload)], sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(raw.encode()).hexdigest()
+
+
+def single_flight_root():
+    return Path(settings.PROFILE_CACHE_DIR) / SINGLE_FLIGHT_DIR
+
+
+def _owned_private(info):
+    """Файл или каталог принадлежит пользователю процесса и недоступен на запись остальным"""
+    if not hasattr(os, 'getuid'):  # Windows: права задает ACL каталога
+        return True
+    return info.st_uid == os.getuid() and not info.st_mode & (stat.S_IWGRP | stat.S_IWOTH)
+
+
+def _private_root():
+    """
+    Каталог результатов с правами 0o700. Результаты передаются через pickle, поэтому
+    каталог другого пользователя (например, заранее созданный в общем tempdir) не используется:
+    подложенный файл выполнил бы код в воркере. None - каталог небезопасен.
+    """
+    root = single_flight_root()
+    root.mkdir(mode=0o700, parents=True, exist_ok=True)
+    info = os.lstat(root)
+    if not stat.S_ISDIR(info.st_mode) or hasattr(os, 'getuid') and info.st_uid != os.getuid():
+        logger.warning("Каталог %s создан другим пользователем - одинаковые расчеты не объединяются", root)
+        return None
+    if stat.S_IMODE(info.st_mode) != 0o700:
+        os.chmod(root, 0o700)  # каталог, созданный до появления проверки
+    return root
+
+
+def single_flight(key, compute, timeout=None):
+    """
+    Объединение одинаковых одновременных расчетов между воркерами.
+
+    Первый запрос с ключом key берет файловую блокировку (flock) и считает compute();
+    запросы с тем же ключом, пришедшие во время расчета, ждут блокировку, отмечают
+    ожидание файлом <key>.wait и получают результат лидера из <key>.pickle.
+    Результат передается только ожидавшим: файл принимается, если записан после начала
+    ожидания, поэтому последовательные запросы считаются заново (это не кэш).
+    Если лидер завершился с ошибкой, следующий ожидающий считает сам;
+    по истечении timeout (SINGLE_FLIGHT_TIMEOUT) запрос считает без блокировки.
+
+    Файлы лежат в каталоге PROFILE_CACHE_DIR/single_flight с правами 0o700; результат
+    читается, только если файл принадлежит пользователю процесса. Если каталог принадлежит
+    другому пользователю, расчет выполняется без объединения.
+
+    :param compute: функция без аргументов; результат должен сериализоваться pickle
+    """
+    timeout = settings.SINGLE_FLIGHT_TIMEOUT if timeout is None else timeout
+    root = _private_root()
+    if root is None:
+        return compute()
+    result_path, wait_path = root / f'{key}.pickle', root / f'{key}.wait'
+    started = time.time()
+
+    with _acquire(root / f'{key}.lock', wait_path, started + timeout) as acquired:
+        if not acquired:
+            prometheus.CACHE_REQUESTS.inc(cache='single_flight', result='timeout')
+            return compute()
+        shared = _load_since(result_path, started)
+        if shared is not None:
+            prometheus.CACHE_REQUESTS.inc(cache='single_flight', result='shared')
+            return shared[0]
+
+        prometheus.CACHE_REQUESTS.inc(cache='single_flight', result='leader')
+        leader_started = time.time()
+        value = compute()
+        if _mtime(wait_path) >= leader_started:
+            _store(result_path, value)
+            _remove_stale(root)
+        return value
+
+
+@contextmanager
+def _acquire(lock_path, wait_path, deadline):
+    """
+    Файловая блокировка с ожиданием до deadline: True - взята, False - истек срок.
+    Пока ждет, обновляет файл-отметку wait_path (по ней лидер решает, сохранять ли результат).
+    """
+    if fcntl is None:
+        lock = _thread_locks[lock_path.name]
+        acquired = lock.acquire(blocking=False)
+        if not acquired:
+            wait_path.touch()
+            acquired = lock.acquire(timeout=max(deadline - time.time(), 0))
+        try:
+            yield acquired
+        finally:
+            if acquired:
+                lock.release()
+        return
+
+    # закрытие файла снимает flock
+    with open(lock_path, 'a') as lock_file:
+        os.utime(lock_path)
+        yield _flock(lock_file, wait_path, deadline)
+
+
+def _flock(lock_file, wait_path, deadline):
+    while True:
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            return True
+        except BlockingIOError:
+            pass
+        wait_path.touch()
+        if time.time() >= deadline:
+            return False
+        with stage('single_flight_wait'):
+            time.sleep(POLL_INTERVAL)
+
+
+def _mtime(path):
+    try:
+        return path.stat().st_mtime
+    except FileNotFoundError:
+        return 0.0
+
+
+def _load_since(path, started):
+    """(результат,) из файла своего пользователя, записанного не раньше started; иначе None"""
+    if _mtime(path) < started:
+        return None
+    try:
+        fd = os.open(path, os.O_RDONLY | getattr(os, 'O_NOFOLLOW', 0))
+    except OSError:
+        return None
+    with open(fd, 'rb') as f:
+        info = os.fstat(f.fileno())
+        if not stat.S_ISREG(info.st_mode) or not _owned_private(info):
+            return None
+        try:
+            return (pickle.load(f),)
+        except (OSError, EOFError, pickle.UnpicklingError):
+            return None
+
+
+def _store(path, value):
+    tmp_path = path.with_name(f'{path.name}.{os.getpid()}.{threading.get_ident()}.tmp')
+    with open(tmp_path, 'wb') as f:
+        pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp_path, path)
+
+
+def _remove_stale(root):
+    now = time.time()
+    for entry in root.iterdir():
+        keep = LOCK_KEEP_SECONDS if entry.suffix == '.lock' else RESULT_KEEP_SECONDS
+        if now - _mtime(entry) > keep:
+            try:
+                entry.unlink()
+            except OSError:
+                pass
@@ -0,0 +1,120 @@
+// Ползунки «что если»: пересчет через api/whatif/ и обновление таблицы и графиков на месте
+document.addEventListener('DOMContentLoaded', function () {
+    const dataElement = document.getElementById('whatif-data');
+    if (!dataElement) {
+        return;
+    }
+    const whatif = JSON.parse(dataElement.textContent);
+    const container = document.getElementById('whatif');
+    const inputs = {
+        distance_km: document.getElementById('whatif-distance'),
+        fuel_price: document.getElementById('whatif-fuel-price'),
+        energy_source: document.getElementById('whatif-energy-source'),
+    };
+    const rows = document.querySelectorAll('#resultsTable tbody tr[data-row]');
+    // цена топлива передается только после изменения: до этого действует ценовой сценарий формы
+    let fuelPriceChanged = false;
+    let inFlight = false;
+    const pending = new Set();
+
+    inputs.distance_km.max = Math.max(Math.ceil(whatif.distance_km * 4), 1000);
+    inputs.distance_km.value = whatif.distance_km;
+    inputs.fuel_price.value = whatif.fuel_price;
+    inputs.energy_source.value = whatif.energy_source;
+    showValues();
+
+    function showValues() {
+        container.querySelector('[data-value="distance_km"]').textContent = inputs.distance_km.value;
+        container.querySelector('[data-value="fuel_price"]').textContent = inputs.fuel_price.value;
+    }
+
+    function format(value) {
+        return (value === null ? 0 : value).toFixed(2);
+    }
+
+    function updateTable(results) {
+        rows.forEach(row => {
+            const index = Number(row.dataset.row);
+            Object.entries(results).forEach(([name, values]) => {
+                const cell = row.querySelector(`[data-field="${name}"]`);
+                if (cell) {
+                    cell.textContent = format(values[index]);
+                }
+            });
+            if (results.co2_g) {
+                row.dataset.emissions = results.co2_g[index];
+            }
+            if (results.tco) {
+                row.dataset.tco = results.tco[index];
+            }
+            if (results.energy_kwh || results.fuel_liters) {
+                const energy = results.energy_kwh && results.energy_kwh[index];
+                row.dataset.consumption = energy || (results.fuel_liters && results.fuel_liters[index]);
+            }
+        });
+    }
+
+    function updateCharts(results) {
+        if (!window.Plotly) {
+            return;
+        }
+        document.querySelectorAll('.chart-container[data-metric]').forEach(chart => {
+            const values = results[chart.dataset.metric];
+            const plot = chart.querySelector('.js-plotly-plot');
+            if (!values || !plot) {
+                return;
+            }
+            // номер строки результатов у каждой точки - в customdata
+            const ys = plot.data.map(trace => (trace.customdata || []).map(point => {
+                const value = values[point[0]];
+                return value === null ? 0 : Math.round(value * 100) / 100;
+            }));
+            const top = Math.max(0, ...ys.flat());
+            Plotly.restyle(plot, {y: ys, text: ys});
+            Plotly.relayout(plot, {'yaxis.range': [0, top * 1.1 || 1]});
+        });
+    }
+
+    function request(changed) {
+        if (inFlight) {
+            pending.add(changed);  // события во время запроса объединяются в один следующий запрос
+            return;
+        }
+        inFlight = true;
+        const params = new URLSearchParams(whatif.params);
+        params.set('distance_km', inputs.distance_km.value);
+        params.set('energy_source', inputs.energy_source.value);
+        if (fuelPriceChanged) {
+            params.set('fuel_price', inputs.fuel_price.value);
+        }
+        params.set('changed', changed);
+        fetch(`${whatif.url}?${params}`)
+            .then(response => response.ok ? response.json() : null)
+            .then(data => {
+                if (data) {
+                    updateTable(data.results);
+                    updateCharts(data.results);
+                }
+            })
+            .catch(() => null)
+            .finally(() => {
+                inFlight = false;
+                if (pending.size) {
+                    // изменились разные параметры - пересчитываются все показатели
+                    const next = pending.size === 1 ? [...pending][0] : '';
+                    pending.clear();
+                    request(next);
+                }
+            });
+    }
+
+    Object.entries(inputs).forEach(([name, input]) => {
+        input.addEventListener('input', function () {
+            if (name === 'fuel_price') {
+                fuelPriceChanged = true;
+            }
+            showValues();
+            request(name);
+        });
+    });
+});
@@ -0,0 +1,691 @@
+import json
+import marshal
+import os
+import pickle
+import stat
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import date
+from io import StringIO
+
+import numpy as np
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import RequestFactory, SimpleTestCase, TestCase
+from django.urls import reverse
+
+from vehicles.catalogue import VEHICLE_MODELS
+from vehicles.models import EVVehicle, ICEVehicle, PHEVVehicle
+from vehicles.synthetic import synthetic_arrays, synthetic_vehicles
+from . import admission, benchmarks, budgets, instrumentation, prometheus
+from .engines.breakeven import BreakEvenSolver
+from .engines.cost import TCOService
+from .engines.emissions import EmissionsCalculator
+from .engines.energy import EnergyCalculator
+from .engines.prices import PriceSeries, load_price_series
+from .engines.ranking import MetricsIndex, metrics_index, pareto_front
+from .models import RequestProfile
+from .engines.scenarios import evaluate_scenarios, parse_scenarios
+from .singleflight import RESULT_KEEP_SECONDS, _load_since, single_flight, single_flight_root
+from .views import CalculateView
+
+ROAD_TYPES = ('city', 'highway', 'mixed')
+
+
+def seed_catalogue(size=20):
+    """Синтетический каталог тестовой БД: size ТС каждого типа и таблица показателей"""
+    call_command('seed_catalogue', synthetic=size, stdout=StringIO())
+
+
+class ViewBudgetTests(TestCase):
+    """Бюджеты представлений (calculator.budgets): запросы в холодном и теплом проходе, память"""
+
+    @classmethod
+    def setUpTestData(cls):
+        seed_catalogue()
+
+    def test_view_budgets(self):
+        for row in budgets.check_views():
+            with self.subTest(view=row['name']):
+                self.assertEqual(row['failures'], [])
+
+    def test_vehicle_list_cold_and_warm(self):
+        cache.clear()
+        with self.assertNumQueries(2):  # версия каталога и строки показателей
+            self.client.get('/')
+        with self.assertNumQueries(1):  # строки - из кэша фрагментов
+            self.client.get('/')
+
+
+class ServerTimingTests(TestCase):
+    """Server-Timing: этапы запроса в заголовке и JSON-строке лога только для запросов из выборки"""
+
+    @classmethod
+    def setUpTestData(cls):
+        seed_catalogue(2)
+
+    def setUp(self):
+        cache.clear()
+
+    def test_sampled_request_reports_stages(self):
+        with self.settings(SERVER_TIMING_SAMPLE_RATE=1.0), \
+                self.assertLogs('calculator.middleware', 'INFO') as logs, self.assertNumQueries(2):
+            response = self.client.get('/?type=EV')
+        header = dict(entry.split(';', 1) for entry in response['Server-Timing'].split(', '))
+        self.assertEqual(set(header), {'db', 'template', 'total'})
+        self.assertTrue(header['db'].endswith(';desc="2 queries"'))
+        record = json.loads(logs.records[0].getMessage())
+        self.assertEqual({key: record[key] for key in ('method', 'path', 'view', 'status', 'queries')},
+                         {'method': 'GET', 'path': '/', 'view': 'vehicles:vehicle_list', 'status': 200, 'queries': 2})
+        self.assertEqual(set(record['stages']), {'db', 'template'})
+        self.assertGreaterEqual(record['total_ms'], record['stages']['template']['ms'])
+
+    def test_unsampled_request_is_untouched(self):
+        with self.settings(SERVER_TIMING_SAMPLE_RATE=0), self.assertNoLogs('calculator.middleware', 'INFO'):
+            response = self.client.get('/')
+        self.assertNotIn('Server-Timing', response)
+
+    def test_nested_stages_are_counted_once(self):
+        vehicle = synthetic_vehicles('ICE', 1)[0]
+        timings, token = instrumentation.start_request()
+        try:
+            with instrumentation.stage('plots'):
+                with instrumentation.stage('plots'):
+                    TCOService.calculate_tco(vehicle)
+        finally:
+            instrumentation.finish_request(token)
+        self.assertEqual(dict(timings.counts), {'plots': 1, 'engine': 1})
+        self.assertIsNone(instrumentation.current_timings())
+        with instrumentation.stage('plots'):  # вне замера - без записи
+            pass
+        self.assertEqual(timings.counts['plots'], 1)
+
+
+class PrometheusMetricsTests(TestCase):
+    """MetricsMiddleware и /metrics: гистограмма по представлениям, счетчики движков, файлы завершившихся процессов"""
+
+    @classmethod
+    def setUpTestData(cls):
+        seed_catalogue(2)
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+        override = self.settings(METRICS_DIR=self.directory)
+        override.enable()
+        self.addCleanup(override.disable)
+        self.addCleanup(setattr, prometheus, '_store', prometheus._store)
+        prometheus._store = None
+        self.addCleanup(lambda: prometheus._store and prometheus._store.close())
+
+    def samples(self):
+        response = self.client.get('/metrics')
+        self.assertEqual(response.status_code, 200)
+        lines = response.content.decode().splitlines()
+        return dict(line.rsplit(' ', 1) for line in lines if not line.startswith('#'))
+
+    def test_request_latency_and_engine_counters(self):
+        self.client.get('/')
+        self.client.get('/')
+        with instrumentation.engine_tally():
+            for vehicle in synthetic_vehicles('ICE', 3):
+                TCOService.calculate_tco(vehicle)
+        samples = self.samples()
+        view = 'view="vehicles:vehicle_list",method="GET"'
+        self.assertEqual(samples[f'http_request_duration_seconds_count{{{view}}}'], '2.0')
+        self.assertEqual(samples[f'http_request_duration_seconds_bucket{{{view},le="+Inf"}}'], '2.0')
+        self.assertIn(f'http_request_duration_seconds_sum{{{view}}}', samples)
+        self.assertEqual(samples['engine_calls_total{engine="tco",vehicle_type="ICE"}'], '3.0')
+        self.assertEqual(samples['catalogue_vehicles{vehicle_type="EV"}'], '2.0')
+        # сам /metrics учитывается после ответа
+        self.assertEqual(self.samples()['http_request_duration_seconds_count{view="metrics",method="GET"}'], '1.0')
+
+    def test_dead_process_files_are_folded(self):
+        dead = prometheus.MmapStore(os.path.join(self.directory, 'metrics-999999999.db'))
+        dead.inc('engine_calls_total{engine="tco",vehicle_type="EV"}', 5)
+        dead.close()
+        prometheus.ENGINE_CALLS.inc(2, engine='tco', vehicle_type='EV')
+        key = 'engine_calls_total{engine="tco",vehicle_type="EV"}'
+        self.assertEqual(self.samples()[key], '7.0')
+        self.assertFalse(os.path.exists(os.path.join(self.directory, 'metrics-999999999.db')))
+        self.assertTrue(os.path.exists(os.path.join(self.directory, prometheus.DEAD_PROCESSES_FILE)))
+        self.assertEqual(self.samples()[key], '7.0')
+
+
+class RequestProfileTests(TestCase):
+    """Профилирование запросов сотрудников: заголовок X-Profile-Id и кольцевой буфер REQUEST_PROFILE_LIMIT"""
+
+    @classmethod
+    def setUpTestData(cls):
+        seed_catalogue(2)
+        cls.staff = User.objects.create_user('staff', password='x', is_staff=True, is_superuser=True)
+        cls.user = User.objects.create_user('user', password='x')
+
+    def test_only_staff_requests_are_profiled(self):
+        response = self.client.get('/?profile=1')
+        self.assertNotIn('X-Profile-Id', response)
+        self.client.force_login(self.user)
+        response = self.client.get('/', HTTP_X_PROFILE='1')
+        self.assertNotIn('X-Profile-Id', response)
+        self.assertFalse(RequestProfile.objects.exists())
+
+        self.client.force_login(self.staff)
+        response = self.client.get('/?profile=1&type=EV')
+        profile = RequestProfile.objects.get(pk=response['X-Profile-Id'])
+        self.assertEqual((profile.path, profile.query_string, profile.view_name, profile.username, profile.status_code),
+                         ('/', 'profile=1&type=EV', 'vehicles:vehicle_list', 'staff', 200))
+        self.assertIn('cumulative', profile.report)
+
+        download = self.client.get(reverse('admin:calculator_requestprofile_download', args=[profile.pk]))
+        self.assertEqual(download.status_code, 200)
+        self.assertIsInstance(marshal.loads(download.content), dict)
+
+    def test_ring_buffer_keeps_latest_profiles(self):
+        self.client.force_login(self.staff)
+        with self.settings(REQUEST_PROFILE_LIMIT=3):
+            ids = [int(self.client.get('/', HTTP_X_PROFILE='1')['X-Profile-Id']) for _ in range(5)]
+        self.assertEqual(sorted(RequestProfile.objects.values_list('id', flat=True)), ids[-3:])
+
+
+class StartupImportTests(SimpleTestCase):
+    """Старт воркера (WSGI-приложение и URLconf) без тяжелых зависимостей - они импортируются лениво"""
+
+    SCRIPT = (
+        "import json, sys\n"
+        "from django.core.wsgi import get_wsgi_application\n"
+        "get_wsgi_application()\n"
+        "from django.urls import get_resolver\n"
+        "get_resolver().url_patterns\n"
+        "print(json.dumps([m for m in %r if m in sys.modules]))\n"
+    )
+
+    def test_no_heavy_modules_at_startup(self):
+        env = dict(os.environ, DJANGO_SETTINGS_MODULE=settings.SETTINGS_MODULE)
+        env.pop('WARM_UP_ON_STARTUP', None)  # прогрев кэшей при старте загружает движки
+        output = subprocess.run(
+            [sys.executable, '-c', self.SCRIPT % (benchmarks.HEAVY_MODULES,)],
+            cwd=settings.BASE_DIR, env=env, capture_output=True, text=True, check=True,
+        ).stdout
+        self.assertEqual(json.loads(output.strip().splitlines()[-1]), [])
+
+
+class VectorizedEngineTests(SimpleTestCase):
+    """Движки над столбцами VehicleArrays дают те же значения, что поштучный расчет по экземплярам модели"""
+
+    SIZE = 30
+
+    def test_arrays_match_scalar_calculators(self):
+        for vehicle_type in VEHICLE_MODELS:
+            arrays = synthetic_arrays(vehicle_type, self.SIZE, seed=1)
+            vehicles = synthetic_vehicles(vehicle_type, self.SIZE, seed=1)
+            for road_type in ROAD_TYPES:
+                energy = EnergyCalculator.calculate_energy_consumption(arrays, 20000, road_type)
+                co2 = EmissionsCalculator.calculate_co2(arrays, 20000, 'eu_avg', road_type)
+                tco = TCOService._calculate_total_cost(arrays, 20000, road_type)
+                for i, vehicle in enumerate(vehicles):
+                    with self.subTest(vehicle_type=vehicle_type, road_type=road_type, row=i):
+                        expected = EnergyCalculator.calculate_energy_consumption(vehicle, 20000, road_type)
+                        for key, value in expected.items():
+                            np.testing.assert_allclose(np.broadcast_to(energy[key], (self.SIZE,))[i], value,
+                                                       rtol=1e-9, err_msg=key)
+                        np.testing.assert_allclose(
+                            co2[i], EmissionsCalculator.calculate_co2(vehicle, 20000, 'eu_avg', road_type), rtol=1e-9)
+                        np.testing.assert_allclose(
+                            tco[i], TCOService._calculate_total_cost(vehicle, 20000, road_type), rtol=1e-9)
+
+
+class PriceSeriesTests(SimpleTestCase):
+    """Ряды цен: выравнивание по месяцам, края ряда с индексацией и сценарий на срок службы"""
+
+    def test_alignment_and_edges(self):
+        first = np.datetime64('2024-01', 'M').astype(np.int64)
+        series = PriceSeries(first + np.arange(3), {'fuel': np.array([10.0, 20.0, 30.0])})
+        np.testing.assert_array_equal(series.monthly('fuel', date(2023, 11, 15), 6), [10, 10, 10, 20, 30, 30])
+        np.testing.assert_array_equal(series.daily('fuel', date(2024, 1, 30), date(2024, 2, 2)), [10, 10, 20, 20])
+        # после конца ряда - индексация от последнего значения, до начала - без нее
+        np.testing.assert_allclose(series.monthly('fuel', date(2023, 12, 1), 17, inflation=0.1)[[0, 3, 15, 16]],
+                                   [10, 30, 30 * 1.1, 30 * 1.1 ** (13 / 12)])
+        for months in ([], [first, first + 2]):
+            with self.subTest(months=months), self.assertRaises(ValueError):
+                PriceSeries(months, {'fuel': np.ones(len(months))})
+
+    def test_csv_series_and_daily_prices(self):
+        series = load_price_series()
+        np.testing.assert_allclose(series.daily('petrol_rub_l', date(2020, 1, 31), date(2020, 2, 1)), [46.15, 46.31])
+        prices = TCOService.get_daily_prices(date(2020, 1, 1), date(2020, 12, 31), fuel_grade='diesel')
+        self.assertEqual(prices['fuel'].shape, (366,))
+        self.assertEqual(prices['fuel'][0], 47.70)
+        np.testing.assert_array_equal(prices['hybrid_fuel'], prices['fuel'])
+        np.testing.assert_array_equal(prices['electricity'],
+                                      series.daily('electricity_rub_kwh', date(2020, 1, 1), date(2020, 12, 31)))
+
+    def test_lifetime_prices_and_npv(self):
+        series = load_price_series()
+        months = TCOService.LIFETIME_YEARS * 12
+        plain = TCOService.get_lifetime_prices(date(2022, 1, 1), inflation=0.05)
+        self.assertAlmostEqual(plain['fuel'], series.monthly('petrol_rub_l', date(2022, 1, 1), months, 0.05).mean())
+        self.assertEqual((plain['running_discount'], plain['residual_discount']), (1.0, 1.0))
+
+        discounted = TCOService.get_lifetime_prices(date(2022, 1, 1), inflation=0.05, discount_rate=0.08)
+        self.assertLess(discounted['fuel'], plain['fuel'])
+        self.assertLess(discounted['running_discount'], 1)
+        self.assertAlmostEqual(discounted['residual_discount'], 1.08 ** -TCOService.LIFETIME_YEARS)
+
+        # без дисконтирования сценарий равен постоянным ценам того же уровня
+        vehicle = synthetic_vehicles('PHEV', 1, seed=4)[0]
+        flat = TCOService.get_prices(plain['fuel'], plain['electricity'])
+        self.assertAlmostEqual(TCOService._calculate_total_cost(vehicle, 200000, 'mixed', plain),
+                               TCOService._calculate_total_cost(vehicle, 200000, 'mixed', flat))
+        self.assertLess(TCOService._calculate_total_cost(vehicle, 200000, 'mixed', discounted),
+                        TCOService._calculate_total_cost(vehicle, 200000, 'mixed', plain))
+
+
+class BreakEvenSolverTests(SimpleTestCase):
+    """Пробег безубыточности: разность TCO по поштучному расчету меняет знак ровно в найденной точке"""
+
+    SIZE = 12
+    PAIRS = (('EV', 'ICE'), ('HEV', 'ICE'), ('PHEV', 'ICE'), ('EV', 'PHEV'))
+
+    def difference(self, candidate, baseline, distance_km, road_type):
+        return (TCOService._calculate_total_cost(candidate, distance_km, road_type)
+                - TCOService._calculate_total_cost(baseline, distance_km, road_type))
+
+    def test_distance_is_first_crossing(self):
+        for candidate_type, baseline_type in self.PAIRS:
+            candidates = synthetic_vehicles(candidate_type, self.SIZE, seed=2)
+            baselines = synthetic_vehicles(baseline_type, self.SIZE, seed=3)
+            for road_type in ROAD_TYPES:
+                distance = BreakEvenSolver.solve(
+                    synthetic_arrays(candidate_type, self.SIZE, seed=2),
+                    synthetic_arrays(baseline_type, self.SIZE, seed=3), road_type)['distance_km']
+                self.assertEqual(distance.shape, (self.SIZE, self.SIZE))
+                for (i, j), d in np.ndenumerate(distance):
+                    a, b = candidates[i], baselines[j]
+                    scale = TCOService._calculate_total_cost(b, 0, road_type)
+                    with self.subTest(pair=(candidate_type, baseline_type), road_type=road_type, i=i, j=j, d=d):
+                        if d == 0:
+                            self.assertLessEqual(self.difference(a, b, 0, road_type), 0)
+                        elif np.isinf(d):
+                            for probe in np.linspace(0, BreakEvenSolver.MAX_DISTANCE_KM, 41):
+                                self.assertGreater(self.difference(a, b, probe, road_type), 0)
+                        else:
+                            self.assertAlmostEqual(self.difference(a, b, d, road_type) / scale, 0, places=6)
+                            for probe in np.linspace(0, d * 0.999, 21):
+                                self.assertGreater(self.difference(a, b, probe, road_type), 0)
+
+    def test_payback_years(self):
+        solution = BreakEvenSolver.solve(synthetic_arrays('EV', 5), synthetic_arrays('ICE', 5))
+        np.testing.assert_array_equal(solution['payback_years'], solution['distance_km'] / TCOService.ANNUAL_KM)
+
+
+class BreakEvenCatalogueTests(TestCase):
+    """Кэш безубыточности по каталогу: разные ценовые сценарии не делят одно решение"""
+
+    @classmethod
+    def setUpTestData(cls):
+        seed_catalogue(8)
+
+    def setUp(self):
+        cache.clear()
+
+    def test_cache_key_covers_every_price(self):
+        base = TCOService.get_prices()
+        scenarios = [base, dict(base, running_discount=0.6, residual_discount=0.5), dict(base, hybrid_fuel=90.0)]
+        for candidate_type, prices in (('EV', scenarios[0]), ('EV', scenarios[1]), ('HEV', scenarios[2])):
+            with self.subTest(candidate_type=candidate_type, prices=prices):
+                cached = BreakEvenSolver.solve_catalogue(candidate_type, 'ICE', prices=dict(base))
+                columns = BreakEvenSolver.solve_catalogue(candidate_type, 'ICE', prices=prices)
+                cache.clear()
+                expected = BreakEvenSolver.solve_catalogue(candidate_type, 'ICE', prices=prices)
+                np.testing.assert_array_equal(columns['distance_km'], expected['distance_km'])
+                if prices is not base:
+                    self.assertFalse(np.array_equal(columns['distance_km'], cached['distance_km']))
+
+
+def brute_force_front(points):
+    """Эталон O(n²): точка во фронте, если ее не доминирует ни одна другая"""
+    points = np.asarray(points, dtype=float)
+    dominated = [
+        any(np.all(other <= point) and np.any(other < point) for other in points)
+        for point in points
+    ]
+    return ~np.array(dominated)
+
+
+class ParetoFrontTests(SimpleTestCase):
+
+    def test_matches_brute_force(self):
+        rng = np.random.default_rng(0)
+        for dims in (2, 3):
+            for size in (1, 7, 200):
+                # округление дает совпадающие точки и равенства по отдельным критериям
+                points = np.round(rng.random((size, dims)) * 10)
+                with self.subTest(dims=dims, size=size):
+                    np.testing.assert_array_equal(pareto_front(points), brute_force_front(points))
+
+    def test_staircase_inserted_at_front(self):
+        # каждая точка встает в начало лестницы, ничего не вытесняя (худший случай вставок)
+        t = np.arange(2000, dtype=float)
+        self.assertTrue(pareto_front(np.column_stack([t, -t, t])).all())
+        points = np.column_stack([t, -t, t])[::3] + [0.5, 0, 0]
+        points = np.concatenate([np.column_stack([t, -t, t]), points])
+        np.testing.assert_array_equal(pareto_front(points), brute_force_front(points))
+
+    def test_duplicates_share_membership(self):
+        points = [[1, 2], [1, 2], [2, 1], [2, 2]]
+        np.testing.assert_array_equal(pareto_front(points), [True, True, True, False])
+
+
+class MetricsIndexTests(TestCase):
+    """Индекс удельных показателей: блоки - как поштучный расчет, top_k и Парето - как сортировка и перебор"""
+
+    @classmethod
+    def setUpTestData(cls):
+        seed_catalogue()
+
+    def setUp(self):
+        metrics_index.version = None
+
+    def test_block_matches_scalar_per_km(self):
+        arrays = synthetic_arrays('PHEV', 10, seed=4)
+        block = MetricsIndex.compute_block(arrays)
+        lifetime_km = TCOService.ANNUAL_KM * TCOService.LIFETIME_YEARS
+        for i, vehicle in enumerate(synthetic_vehicles('PHEV', 10, seed=4)):
+            for road_type in ROAD_TYPES:
+                with self.subTest(row=i, road_type=road_type):
+                    self.assertAlmostEqual(block[('tco', road_type)][i] / TCOService._calculate_cost_per_km(
+                        vehicle, lifetime_km, road_type), 1, places=9)
+                    # у PHEV выбросы нелинейны по пробегу (запас хода на батарее) - эталон на том же пробеге
+                    distance = MetricsIndex.REFERENCE_DISTANCE_KM
+                    self.assertAlmostEqual(block[('co2', road_type, 'eu_avg')][i] * distance
+                                           / EmissionsCalculator.calculate_co2(vehicle, distance, 'eu_avg', road_type),
+                                           1, places=9)
+
+    def test_top_k_matches_sort(self):
+        columns = metrics_index.view('city', 'eu_avg')
+        for metric in MetricsIndex.METRICS:
+            for vehicle_type in (None, 'EV'):
+                with self.subTest(metric=metric, vehicle_type=vehicle_type):
+                    rows = metrics_index.top_k(metric, 5, 'city', 'eu_avg', vehicle_type)
+                    self.assertEqual(len(rows), 5)
+                    mask = np.ones(len(columns['id']), dtype=bool) if vehicle_type is None \
+                        else columns['type'] == vehicle_type
+                    expected = np.sort(columns[metric][mask])[:5]
+                    key = {'tco': 'tco_per_km', 'co2': 'co2_g_per_km', 'energy': 'energy_mj_per_km'}[metric]
+                    np.testing.assert_allclose([row[key] for row in rows], expected)
+                    if vehicle_type:
+                        self.assertEqual({row['type'] for row in rows}, {vehicle_type})
+
+    def test_pareto_rows_are_the_front(self):
+        columns = metrics_index.view('mixed', 'eu_avg')
+        for metrics in (('tco', 'co2'), MetricsIndex.METRICS):
+            with self.subTest(metrics=metrics):
+                rows = metrics_index.pareto(metrics, 'mixed', 'eu_avg')
+                self.assertTrue(rows)
+                points = np.column_stack([columns[m] for m in metrics])
+                expected = {(columns['type'][i], int(columns['id'][i]))
+                            for i in np.flatnonzero(brute_force_front(points))}
+                self.assertEqual({(row['type'], row['id']) for row in rows}, expected)
+                first = [row['tco_per_km'] for row in rows]
+                self.assertEqual(first, sorted(first))
+
+
+class ScenarioBatchTests(TestCase):
+    """Пакет сценариев дает те же значения, что калькулятор: сравнение по типу и расчет по одному ТС"""
+
+    # показатель пакета - ключ результата CalculateView
+    OUTPUTS = {'energy_kwh': 'energy_kwh', 'fuel_liters': 'fuel_liters', 'co2_g': 'emissions', 'tco': 'tco'}
+    CASES = (
+        dict(distance_km=15000, road_type='city', energy_source='eu_avg'),
+        dict(distance_km=80000, road_type='highway', energy_source='coal',
+             start_date='2022-03-01', fuel_grade='diesel', price_inflation=4, discount_rate=7),
+    )
+
+    @classmethod
+    def setUpTestData(cls):
+        seed_catalogue(8)
+
+    def assertSame(self, actual, expected):
+        if expected is None:
+            self.assertTrue(np.isnan(actual))
+        else:
+            self.assertAlmostEqual(actual / expected, 1, places=9)
+
+    def test_type_average_matches_calculate_view(self):
+        for case in self.CASES:
+            results = evaluate_scenarios(parse_scenarios(
+                {'defaults': case, 'scenarios': [{'vehicle_type': vtype} for vtype in VEHICLE_MODELS]}))
+            view = CalculateView()
+            view.request = RequestFactory().post('/calculator/', {'compare_types': list(VEHICLE_MODELS)})
+            data = dict(case, analysis_type='type_avg')
+            if 'start_date' in case:
+                data['start_date'] = date.fromisoformat(case['start_date'])
+            expected = {row['vehicle_type']: row for row in view.calculate_results(data)}
+            for i, vtype in enumerate(VEHICLE_MODELS):
+                for output, key in self.OUTPUTS.items():
+                    with self.subTest(case=case['road_type'], vehicle_type=vtype, output=output):
+                        self.assertSame(results[output][i], expected[vtype][key])
+
+    def test_single_vehicle_matches_scalar_engines(self):
+        vehicles = [*ICEVehicle.objects.all()[:3], *PHEVVehicle.objects.all()[:3]]
+        for case in self.CASES:
+            columns = parse_scenarios({'defaults': case, 'scenarios': [
+                {'vehicle_type': vehicle.vehicle_type, 'vehicle_id': vehicle.pk} for vehicle in vehicles]})
+            results = evaluate_scenarios(columns)
+            data = dict(case)
+            if 'start_date' in case:
+                data['start_date'] = date.fromisoformat(case['start_date'])
+            prices = CalculateView.get_prices(data)
+            distance, road_type = case['distance_km'], case['road_type']
+            for i, vehicle in enumerate(vehicles):
+                energy = EnergyCalculator.calculate_energy_consumption(vehicle, distance, road_type)
+                expected = {
+                    'energy_kwh': energy.get('energy_kwh'),
+                    'fuel_liters': energy.get('fuel_liters'),
+                    'co2_g': EmissionsCalculator.calculate_co2(vehicle, distance, case['energy_source'], road_type),
+                    'tco': TCOService.calculate_tco(vehicle, distance, road_type, prices)['tco_total'],
+                }
+                for output, value in expected.items():
+                    with self.subTest(case=road_type, vehicle=vehicle.pk, output=output):
+                        self.assertSame(results[output][i], value)
+
+
+class WhatIfAPITests(TestCase):
+    """Ползунки «что если»: строки результатов пересчитываются пакетом сценариев, в ответе - только измененные"""
+
+    @classmethod
+    def setUpTestData(cls):
+        seed_catalogue(4)
+
+    def setUp(self):
+        self.vehicle = EVVehicle.objects.order_by('pk').last()
+
+    def get(self, **params):
+        return self.client.get(reverse('calculator:whatif_api'), dict({
+            'rows': f'ICE, EV:{self.vehicle.pk}', 'distance_km': 30000, 'energy_source': 'coal',
+            'road_type': 'city', 'fuel_price': 60,
+        }, **params))
+
+    def test_results_match_scenarios(self):
+        response = self.get(start_date='2023-05-01', fuel_grade='diesel', discount_rate=5)
+        self.assertEqual(response.status_code, 200)
+        defaults = dict(distance_km=30000, energy_source='coal', road_type='city', fuel_price=60,
+                        start_date='2023-05-01', fuel_grade='diesel', discount_rate=5)
+        expected = evaluate_scenarios(parse_scenarios({'defaults': defaults, 'scenarios': [
+            {'vehicle_type': 'ICE', 'vehicle_id': None}, {'vehicle_type': 'EV', 'vehicle_id': self.vehicle.pk}]}))
+        results = response.json()['results']
+        self.assertEqual(set(results), {'energy_kwh', 'fuel_liters', 'co2_g', 'tco'})
+        self.assertEqual(results['tco'], np.round(expected['tco'], 3).tolist())
+        self.assertEqual(results['co2_g'], np.round(expected['co2_g'], 3).tolist())
+        self.assertIsNone(results['fuel_liters'][1])
+
+    def test_only_affected_outputs_are_returned(self):
+        for changed, outputs in (('fuel_price', {'tco'}), ('energy_source', {'co2_g'}),
+                                 ('distance_km', {'energy_kwh', 'fuel_liters', 'co2_g', 'tco'})):
+            with self.subTest(changed=changed):
+                self.assertEqual(set(self.get(changed=changed).json()['results']), outputs)
+        cheap, dear = (self.get(changed='fuel_price', fuel_price=price).json()['results']['tco'] for price in (40, 80))
+        self.assertLess(cheap[0], dear[0])
+        self.assertEqual(cheap[1], dear[1])  # электромобиль от цены топлива не зависит
+
+    def test_invalid_requests(self):
+        for params, field in (({'rows': 'BUS'}, 'rows'), ({'rows': ','.join(['ICE'] * 9)}, 'rows'),
+                              ({'rows': 'EV:999999'}, 'rows'), ({'distance_km': 0}, 'distance_km'),
+                              ({'energy_source': 'wind'}, 'energy_source')):
+            with self.subTest(params=params):
+                response = self.get(**params)
+                self.assertEqual(response.status_code, 400)
+                self.assertIn(field, response.json()['errors'])
+
+
+class SingleFlightTests(SimpleTestCase):
+    """Объединение одинаковых расчетов: ожидающий получает результат лидера, по таймауту считает сам"""
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        settings_override = self.settings(PROFILE_CACHE_DIR=directory.name)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.root = single_flight_root()
+        self.calls = []
+
+    def compute(self, value, release=None):
+        def run():
+            self.calls.append(value)
+            if release is not None:
+                release.wait(5)
+            return value
+        return run
+
+    def wait_for(self, path):
+        for _ in range(200):
+            if path.exists():
+                return
+            time.sleep(0.01)
+        self.fail(f"{path.name} не появился")
+
+    def run_leader(self, key, release):
+        results = []
+        leader = threading.Thread(target=lambda: results.append(single_flight(key, self.compute('leader', release))))
+        leader.start()
+        self.wait_for(self.root / f'{key}.lock')
+        while not self.calls:
+            time.sleep(0.01)
+        return leader, results
+
+    def test_waiter_receives_leader_result(self):
+        release = threading.Event()
+        leader, results = self.run_leader('key', release)
+        waiter = threading.Thread(target=lambda: results.append(single_flight('key', self.compute('waiter'))))
+        waiter.start()
+        self.wait_for(self.root / 'key.wait')
+        release.set()
+        leader.join(5)
+        waiter.join(5)
+        self.assertEqual(results, ['leader', 'leader'])
+        self.assertEqual(self.calls, ['leader'])
+        # последовательный запрос считается заново
+        self.assertEqual(single_flight('key', self.compute('next')), 'next')
+
+    def test_timeout_computes_without_lock(self):
+        release = threading.Event()
+        leader, results = self.run_leader('key', release)
+        try:
+            self.assertEqual(single_flight('key', self.compute('waiter'), timeout=0.1), 'waiter')
+        finally:
+            release.set()
+            leader.join(5)
+        self.assertEqual(self.calls, ['leader', 'waiter'])
+
+    def test_stale_files_removed_after_shared_result(self):
+        self.root.mkdir(parents=True)
+        old_result, old_lock = self.root / 'old.pickle', self.root / 'old.lock'
+        for path in (old_result, old_lock):
+            path.touch()
+        stale = time.time() - RESULT_KEEP_SECONDS - 10
+        os.utime(old_result, (stale, stale))
+        os.utime(old_lock, (stale, stale))
+
+        def compute():
+            time.sleep(0.05)  # mtime файлов - по грубым часам ядра
+            (self.root / 'key.wait').touch()  # ожидающий появился во время расчета
+            return 'value'
+        self.assertEqual(single_flight('key', compute), 'value')
+        self.assertFalse(old_result.exists())
+        self.assertTrue(old_lock.exists())  # блокировки живут дольше (LOCK_KEEP_SECONDS)
+        self.assertTrue((self.root / 'key.pickle').exists())
+        self.assertEqual(stat.S_IMODE(os.stat(self.root).st_mode), 0o700)
+
+    def test_result_writable_by_others_is_ignored(self):
+        self.root.mkdir(mode=0o777, parents=True)
+        result = self.root / 'key.pickle'
+        started = time.time()
+        with open(result, 'wb') as f:
+            pickle.dump('planted', f)
+        os.chmod(result, 0o666)
+        single_flight('other', self.compute('value'))
+        self.assertEqual(stat.S_IMODE(os.stat(self.root).st_mode), 0o700)
+        self.assertIsNone(_load_since(result, started))
+        os.chmod(result, 0o600)
+        self.assertEqual(_load_since(result, started), ('planted',))
+
+
+class AdmissionTests(SimpleTestCase):
+    """Допуск тяжелых расчетов: классы по оценке времени, слоты heavy и ограниченная фоновая очередь"""
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        settings_override = self.settings(PROFILE_CACHE_DIR=directory.name, SIMULATION_HEAVY_SECONDS=1,
+                                          SIMULATION_BACKGROUND_SECONDS=5, SIMULATION_HEAVY_SLOTS=1,
+                                          SIMULATION_BACKGROUND_QUEUE=1)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+    def test_classify(self):
+        for seconds, expected in ((0, admission.LIGHT), (0.99, admission.LIGHT), (1, admission.HEAVY),
+                                  (4.99, admission.HEAVY), (5, admission.BACKGROUND), (60, admission.BACKGROUND)):
+            with self.subTest(seconds=seconds):
+                self.assertEqual(admission.classify(seconds), expected)
+
+    def test_heavy_slot_exhaustion_rejects(self):
+        entered, release = threading.Event(), threading.Event()
+
+        def hold():
+            with admission.admit('test', admission.HEAVY):
+                entered.set()
+                release.wait(5)
+        holder = threading.Thread(target=hold)
+        holder.start()
+        try:
+            self.assertTrue(entered.wait(5))
+            with self.assertRaises(admission.Rejected) as rejected:
+                with admission.admit('test', admission.HEAVY, timeout=0.1):
+                    self.fail("слот heavy занят")
+            self.assertEqual(rejected.exception.retry_after, 1)
+            with admission.admit('test', admission.LIGHT):  # легкие запросы слотов не занимают
+                pass
+        finally:
+            release.set()
+            holder.join(5)
+        with admission.admit('test', admission.HEAVY, timeout=0.1):
+            pass
+
+    def test_background_queue_is_bounded(self):
+        release = threading.Event()
+        future = admission.submit_background('test', release.wait, 5)
+        try:
+            with self.assertRaises(admission.Rejected) as rejected:
+                admission.submit_background('test', lambda: None)
+            self.assertEqual(rejected.exception.retry_after, admission.BACKGROUND_RETRY_AFTER)
+        finally:
+            release.set()
+        self.assertTrue(future.result(5))
+        self.assertEqual(admission.submit_background('test', lambda: 'done').result(5), 'done')
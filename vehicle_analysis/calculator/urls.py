@@ -4,4 +4,10 @@ from . import views
 app_name = 'calculator'
 urlpatterns = [
     path('', views.CalculateView.as_view(), name='calculator'),
+    path('breakeven/', views.BreakEvenView.as_view(), name='breakeven'),
+    path('api/breakeven/', views.BreakEvenAPIView.as_view(), name='breakeven_api'),
+    path('api/ranking/', views.RankingAPIView.as_view(), name='ranking_api'),
+    path('api/pareto/', views.ParetoAPIView.as_view(), name='pareto_api'),
+    path('api/whatif/', views.WhatIfAPIView.as_view(), name='whatif_api'),
+    path('api/scenarios/', views.ScenarioBatchAPIView.as_view(), name='scenarios_api'),
 ]
@@ -1,13 +1,29 @@
-from django.views.generic import FormView
+import json
+import logging
+from datetime import datetime
+
+from django.views.generic import FormView, View
 from django.apps import apps
-import plotly.express as px
-from plotly.offline import plot
-import pandas as pd
+from django.http import HttpResponse, JsonResponse
+from django.shortcuts import render
+from django.urls import reverse
+from django.utils.decorators import method_decorator
+from django.views.decorators.csrf import csrf_exempt
 
-from .forms import VehicleSelectForm
+from .forms import VehicleSelectForm, BreakEvenForm, RankingForm, WhatIfForm
 from calculator.engines.energy import EnergyCalculator
 from calculator.engines.emissions import EmissionsCalculator
 from calculator.engines.cost import TCOService
+from calculator.engines.breakeven import BreakEvenSolver
+from calculator.engines.ranking import metrics_index
+from calculator.engines.scenarios import OUTPUTS, columnar_payload, evaluate_scenarios, parse_scenarios
+from calculator.instrumentation import stage
+from calculator import prometheus
+from calculator.singleflight import input_hash, single_flight
+from vehicles.catalogue import VEHICLE_MODELS, get_catalogue_version
+from vehicles.display import number, vehicle_label
+
+logger = logging.getLogger(__name__)
 
 
 class CalculateView(FormView):
@@ -21,19 +37,50 @@ class CalculateView(FormView):
         return context
 
     def form_valid(self, form):
-        results = self.calculate_results(form.cleaned_data)
+        # одинаковые одновременные запросы считаются один раз, остальные ждут результат
+        # (типы для сравнения приходят вне формы и тоже входят в ключ)
+        key = input_hash('calculator', {**form.cleaned_data,
+                                        'compare_types': self.request.POST.getlist('compare_types')})
+        computed = single_flight(key, lambda: self._compute(form.cleaned_data))
         context = self.get_context_data(form=form)
-
-        # Создаем графики
-        graphs = self.create_plots(results) if results else None
-
         context.update({
-            'results': results,
+            'results': computed['results'],
             'show_results': True,
-            'plots': graphs
+            'plots': computed['plots'],
+            'whatif': self.whatif_context(form.cleaned_data, computed['results']),
         })
         return self.render_to_response(context)
 
+    def whatif_context(self, data, results):
+        """Начальные значения ползунков «что если» и неизменяемые параметры запросов к WhatIfAPIView"""
+        if not results:
+            return None
+        prices = self.get_prices(data) or TCOService.get_prices()
+        params = {
+            'rows': ','.join(f"{r['vehicle_type']}:{r['vehicle_id']}" if r['vehicle_id'] else r['vehicle_type']
+                             for r in results),
+            'road_type': data['road_type'],
+            'start_date': data['start_date'].isoformat() if data.get('start_date') else None,
+            'fuel_grade': data.get('fuel_grade'),
+            'price_inflation': data.get('price_inflation'),
+            'discount_rate': data.get('discount_rate'),
+        }
+        return {
+            'url': reverse('calculator:whatif_api'),
+            'params': {name: value for name, value in params.items() if value not in (None, '')},
+            'distance_km': data['distance_km'],
+            'fuel_price': round(prices['fuel'], 2),
+            'energy_source': data['energy_source'],
+        }
+
+    def _compute(self, data):
+        results = self.calculate_results(data)
+        self.add_display_fields(results)
+        # Создаем графики
+        graphs = self.create_plots(results) if results else None
+        return {'results': results, 'plots': graphs}
+
+    @stage('engine')
     def calculate_results(self, data):
         from collections import defaultdict
 
@@ -54,6 +101,7 @@ class CalculateView(FormView):
         distance = data['distance_km']
         energy_source = data['energy_source']
         road_type = data['road_type']
+        prices = self.get_prices(data)
 
         if data['analysis_type'] == 'single':
             vehicles = []
@@ -71,10 +119,13 @@ class CalculateView(FormView):
             for vehicle in vehicles:
                 energy_result = EnergyCalculator.calculate_energy_consumption(vehicle, distance, road_type)
                 emissions_result = EmissionsCalculator.calculate_co2(vehicle, distance, energy_source, road_type)
-                tco_result = TCOService.calculate_tco(vehicle, distance, road_type)
+                tco_result = TCOService.calculate_tco(vehicle, distance, road_type, prices)
 
                 results.append({
                     'vehicle': vehicle,
+                    'name': vehicle_label(vehicle),
+                    'vehicle_type': vehicle.vehicle_type,
+                    'vehicle_id': vehicle.pk,
                     'energy_kwh': energy_result.get('energy_kwh'),
                     'fuel_liters': energy_result.get('fuel_liters'),
                     'emissions': emissions_result,
@@ -95,7 +146,7 @@ class CalculateView(FormView):
                         energy_result = EnergyCalculator.calculate_energy_consumption(vehicle, distance, road_type)
                         emissions_result = EmissionsCalculator.calculate_co2(vehicle, distance, energy_source,
                                                                              road_type)
-                        tco_result = TCOService.calculate_tco(vehicle, distance, road_type)
+                        tco_result = TCOService.calculate_tco(vehicle, distance, road_type, prices)
 
                         results_raw[vtype].append({
                             'vehicle': vehicle,
@@ -105,7 +156,7 @@ class CalculateView(FormView):
                             'tco': tco_result['tco_total'],
                         })
                     except Exception as e:
-                        print(f"Ошибка при расчете для {vehicle}: {e}")
+                        logger.warning("Ошибка при расчете для %s: %s", vehicle, e)
                         continue
 
             # Усреднение
@@ -123,6 +174,9 @@ class CalculateView(FormView):
 
                 averaged_results.append({
                     'vehicle': f"{vtype} (среднее по {n} авто)",
+                    'name': f"{vtype} (среднее по {n} авто)",
+                    'vehicle_type': vtype,
+                    'vehicle_id': None,
                     'energy_kwh': sum_energy_kwh / n if sum_energy_kwh else None,
                     'fuel_liters': sum_fuel_liters / n if sum_fuel_liters else None,
                     'emissions': sum_emissions / n,
@@ -131,19 +185,47 @@ class CalculateView(FormView):
 
             return averaged_results
 
+    @staticmethod
+    def add_display_fields(results):
+        """Значения таблицы результатов, отформатированные один раз: шаблон выводит их без фильтров"""
+        for result in results:
+            energy_kwh, fuel_liters = result['energy_kwh'], result['fuel_liters']
+            result['display'] = {
+                'energy_kwh': number(energy_kwh, 2) if energy_kwh else '0',
+                'fuel_liters': number(fuel_liters, 2) if fuel_liters else '0',
+                'emissions': number(result['emissions'], 2),
+                'tco': number(result['tco'], 2),
+                # атрибуты data-* для сортировки таблицы - полная точность
+                'consumption_raw': str(energy_kwh or fuel_liters),
+                'emissions_raw': str(result['emissions']),
+                'tco_raw': str(result['tco']),
+            }
+
+    @staticmethod
+    def get_prices(data):
+        """Цены на срок службы по рядам цен, если задано начало эксплуатации или ставка дисконтирования"""
+        if not data.get('start_date') and not data.get('discount_rate'):
+            return None
+        return TCOService.get_lifetime_prices(
+            data.get('start_date') or datetime.now().date(),
+            fuel_grade=data.get('fuel_grade') or 'petrol',
+            inflation=(data.get('price_inflation') or 0) / 100,
+            discount_rate=(data.get('discount_rate') or 0) / 100,
+        )
+
+    @stage('plots')
     def create_plots(self, results):
         if not results:
             return None
+        # pandas и plotly импортируются только при построении графиков (~0.7 с на старте воркера)
+        import pandas as pd
+        import plotly.express as px
+        from plotly.offline import plot
 
         plot_data = []
-        for result in results:
-            vehicle = result['vehicle']
-            if isinstance(vehicle, str):
-                name = vehicle[:40]
-                vehicle_type = vehicle.split()[0]  # EV, ICE и т.д.
-            else:
-                name = f"{vehicle.mark_name} {vehicle.model_name}"[:40]
-                vehicle_type = vehicle.__class__.__name__.replace('Vehicle', '')
+        for row, result in enumerate(results):
+            name = result['name'][:40]
+            vehicle_type = result['vehicle_type']
 
             if result['fuel_liters'] is not None:
                 plot_data.append({
@@ -152,7 +234,8 @@ class CalculateView(FormView):
                     'Расход': round(result['fuel_liters'], 2),
                     'Единица': 'л',
                     'Выбросы': round(result['emissions'], 2),
-                    'Стоимость': round(result['tco'], 2)
+                    'Стоимость': round(result['tco'], 2),
+                    'Строка': row,
                 })
             if result['energy_kwh'] is not None:
                 plot_data.append({
@@ -161,9 +244,11 @@ class CalculateView(FormView):
                     'Расход': round(result['energy_kwh'], 2),
                     'Единица': 'кВт·ч',
                     'Выбросы': round(result['emissions'], 2),
-                    'Стоимость': round(result['tco'], 2)
+                    'Стоимость': round(result['tco'], 2),
+                    'Строка': row,
                 })
 
+        # номер строки результатов в customdata - по нему ползунки «что если» обновляют столбцы на месте
         df = pd.DataFrame(plot_data)
 
         # Общий стиль и цвета
@@ -190,7 +275,8 @@ class CalculateView(FormView):
         df_fuel = df[df['Единица'] == 'л']
         fig_fuel = px.bar(
             df_fuel, x='Транспорт', y='Расход', color='Тип', color_discrete_map=color_map,
-            text='Расход', title='<b>Расход топлива (л)</b>'
+            text='Расход', title='<b>Расход топлива (л)</b>',
+            custom_data=['Строка']
         )
         fig_fuel.update_traces(textposition='inside')
         fig_fuel.update_layout(yaxis_title='л', **common_style['layout'])
@@ -200,7 +286,8 @@ class CalculateView(FormView):
         df_energy = df[df['Единица'] == 'кВт·ч']
         fig_energy = px.bar(
             df_energy, x='Транспорт', y='Расход', color='Тип', color_discrete_map=color_map,
-            text='Расход', title='<b>Расход энергии (кВт·ч)</b>'
+            text='Расход', title='<b>Расход энергии (кВт·ч)</b>',
+            custom_data=['Строка']
         )
         fig_energy.update_traces(textposition='outside')
         fig_energy.update_layout(yaxis_title='кВт·ч', **common_style['layout'])
@@ -211,7 +298,8 @@ class CalculateView(FormView):
         # Выбросы
         fig_emissions = px.bar(
             df_unique.sort_values('Выбросы'), x='Транспорт', y='Выбросы', color='Тип',
-            color_discrete_map=color_map, text='Выбросы', title='<b>Выбросы CO₂</b>'
+            color_discrete_map=color_map, text='Выбросы', title='<b>Выбросы CO₂</b>',
+            custom_data=['Строка']
         )
         fig_emissions.update_traces(textposition='outside')
         fig_emissions.update_layout(yaxis_title='г', **common_style['layout'])
@@ -220,7 +308,8 @@ class CalculateView(FormView):
         # Стоимость
         fig_cost = px.bar(
             df_unique.sort_values('Стоимость'), x='Транспорт', y='Стоимость', color='Тип',
-            color_discrete_map=color_map, text='Стоимость', title='<b>Стоимость владения</b>'
+            color_discrete_map=color_map, text='Стоимость', title='<b>Стоимость владения</b>',
+            custom_data=['Строка']
         )
         fig_cost.update_traces(
             texttemplate='%{y:,.0f}',
@@ -228,9 +317,144 @@ class CalculateView(FormView):
         )
         fig_cost.update_layout(yaxis_title='руб', **common_style['layout'])
         fig_cost.update_yaxes(range=[0, df_unique['Стоимость'].max() * 1.1])
+        # plotly.js (~3.5 МБ) встраивается только в первый график страницы, остальные его используют
         return {
             'consumption_fuel': plot(fig_fuel, output_type='div', config=common_style['config']),
-            'consumption_energy': plot(fig_energy, output_type='div', config=common_style['config']),
-            'emissions': plot(fig_emissions, output_type='div', config=common_style['config']),
-            'cost': plot(fig_cost, output_type='div', config=common_style['config']),
+            'consumption_energy': plot(fig_energy, output_type='div', config=common_style['config'],
+                                       include_plotlyjs=False),
+            'emissions': plot(fig_emissions, output_type='div', config=common_style['config'],
+                              include_plotlyjs=False),
+            'cost': plot(fig_cost, output_type='div', config=common_style['config'], include_plotlyjs=False),
         }
+
+
+class BreakEvenView(View):
+    """Таблица пробега безубыточности и срока окупаемости по каталогу"""
+    template_name = 'calculator/breakeven.html'
+
+    def get(self, request, *args, **kwargs):
+        form = BreakEvenForm(request.GET or None)
+        rows = None
+        if form.is_valid():
+            rows = self.build_rows(form.cleaned_data)
+        return render(request, self.template_name, {'form': form, 'rows': rows})
+
+    @staticmethod
+    def build_rows(data):
+        prices = TCOService.get_prices(data.get('fuel_price'), data.get('electricity_price'))
+        return BreakEvenSolver.build_table(
+            data['candidate_type'],
+            data['baseline_type'],
+            baseline_id=data.get('baseline_id'),
+            driving_conditions=data.get('road_type') or 'mixed',
+            prices=prices,
+            limit=data.get('limit') or 100,
+            payback_only=data.get('payback_only', False),
+        )
+
+
+class BreakEvenAPIView(View):
+    """JSON API точки безубыточности (параметры - как у BreakEvenView)"""
+
+    def get(self, request, *args, **kwargs):
+        form = BreakEvenForm(request.GET)
+        if not form.is_valid():
+            return JsonResponse({'errors': form.errors}, status=400)
+        return JsonResponse({'results': BreakEvenView.build_rows(form.cleaned_data)})
+
+
+class RankingAPIView(View):
+    """Топ-k ТС по удельному показателю из предрасчитанного индекса"""
+
+    def get(self, request, *args, **kwargs):
+        form = RankingForm(request.GET)
+        if not form.is_valid():
+            return JsonResponse({'errors': form.errors}, status=400)
+        data = form.cleaned_data
+        rows = metrics_index.top_k(
+            metric=data['metric'] or 'tco',
+            k=data['k'] or 10,
+            road_type=data['road_type'] or 'mixed',
+            energy_source=data['energy_source'] or 'eu_avg',
+            vehicle_type=data['vehicle_type'] or None,
+        )
+        return JsonResponse({'results': rows})
+
+
+class ParetoAPIView(View):
+    """Парето-фронт каталога по стоимости, выбросам и энергии"""
+
+    def get(self, request, *args, **kwargs):
+        form = RankingForm(request.GET)
+        if not form.is_valid():
+            return JsonResponse({'errors': form.errors}, status=400)
+        data = form.cleaned_data
+        rows = metrics_index.pareto(
+            metrics=data['metrics'],
+            road_type=data['road_type'] or 'mixed',
+            energy_source=data['energy_source'] or 'eu_avg',
+        )
+        return JsonResponse({'results': rows})
+
+
+class WhatIfAPIView(View):
+    """
+    Ползунки «что если» страницы калькулятора: пересчет строк результатов (rows) при новых
+    пробеге, цене топлива или источнике энергии без формы, графиков и рендеринга страницы.
+    ТС берутся из общего для воркеров каталога (столбцы VehicleArrays уже в памяти процесса),
+    расчет - векторными движками, как в ScenarioBatchAPIView; в ответе только показатели,
+    зависящие от измененного параметра (changed)
+    """
+    AFFECTED = {
+        'distance_km': OUTPUTS,
+        'fuel_price': ('tco',),
+        'energy_source': ('co2_g',),
+    }
+    SCENARIO_FIELDS = ('distance_km', 'road_type', 'energy_source', 'fuel_price', 'fuel_grade',
+                       'price_inflation', 'discount_rate')
+
+    def get(self, request, *args, **kwargs):
+        form = WhatIfForm(request.GET)
+        if not form.is_valid():
+            return JsonResponse({'errors': form.errors}, status=400)
+        data = form.cleaned_data
+        defaults = {name: data[name] for name in self.SCENARIO_FIELDS if data[name] not in (None, '')}
+        if data['start_date']:
+            defaults['start_date'] = data['start_date'].isoformat()
+        try:
+            results = evaluate_scenarios(parse_scenarios({'defaults': defaults, 'scenarios': data['rows']}))
+        except ValueError as e:
+            return JsonResponse({'errors': {'rows': [str(e)]}}, status=400)
+        outputs = self.AFFECTED.get(data['changed'], OUTPUTS)
+        return JsonResponse({'results': columnar_payload({name: results[name] for name in outputs})})
+
+
+@method_decorator(csrf_exempt, name='dispatch')
+class ScenarioBatchAPIView(View):
+    """
+    Пакетный расчет сценариев: POST JSON {"defaults": {...}, "scenarios": [{...}, ...]}
+    (поля - calculator.engines.scenarios.SCENARIO_DEFAULTS), все сценарии одним векторным проходом.
+    Ответ - столбцы показателей в порядке сценариев.
+    """
+
+    def post(self, request, *args, **kwargs):
+        try:
+            columns = parse_scenarios(json.loads(request.body))
+            results = evaluate_scenarios(columns)
+        except json.JSONDecodeError:
+            return JsonResponse({'errors': {'scenarios': ["Тело запроса - JSON"]}}, status=400)
+        except ValueError as e:
+            return JsonResponse({'errors': {'scenarios': [str(e)]}}, status=400)
+        return JsonResponse({'count': len(columns['distance_km']), 'results': columnar_payload(results)})
+
+
+class MetricsView(View):
+    """Метрики всех процессов в текстовом формате Prometheus"""
+
+    def get(self, request, *args, **kwargs):
+        gauges = [
+            ('catalogue_vehicles', 'Количество ТС в каталоге',
+             [([('vehicle_type', vtype)], model.objects.count()) for vtype, model in VEHICLE_MODELS.items()]),
+            ('catalogue_version', 'Версия каталога', [([], get_catalogue_version())]),
+        ]
+        return HttpResponse(prometheus.render(gauges), content_type='text/plain; version=0.0.4; charset=utf-8')
@@ -0,0 +1,43 @@
+import logging
+import time
+
+from django.apps import apps
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+
+def run_warm_up(log=None):
+    """
+    Прогрев кэшей процесса: вызывает warm_up() у всех конфигураций приложений, где он есть
+    (в порядке INSTALLED_APPS)
+
+    :return: список (метка приложения, секунды)
+    """
+    timings = []
+    for config in apps.get_app_configs():
+        warm_up = getattr(config, 'warm_up', None)
+        if warm_up is None:
+            continue
+        start = time.perf_counter()
+        warm_up()
+        timings.append((config.label, time.perf_counter() - start))
+        if log:
+            log(*timings[-1])
+    return timings
+
+
+def warm_up_on_startup():
+    """
+    Прогрев воркера до приема трафика (вызывается из wsgi.py/asgi.py при WARM_UP_ON_STARTUP).
+    Не из AppConfig.ready(): там нельзя обращаться к БД, и он выполняется для каждой команды manage.py.
+    Ошибка прогрева не мешает старту - кэши соберутся на первых запросах.
+    """
+    if not settings.WARM_UP_ON_STARTUP:
+        return
+    try:
+        timings = run_warm_up()
+    except Exception:
+        logger.exception("Прогрев не выполнен")
+        return
+    logger.info("Прогрев завершен: %s", ', '.join(f'{label} {seconds:.2f} с' for label, seconds in timings))
@@ -2,6 +2,10 @@ import os
 
 from django.core.asgi import get_asgi_application
 
+from calculator.warmup import warm_up_on_startup
+
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'vehicle_analysis.settings')
 
 application = get_asgi_application()
+
+warm_up_on_startup()
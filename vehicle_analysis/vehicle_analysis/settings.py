@@ -1,6 +1,7 @@
 from pathlib import Path
 from dotenv import load_dotenv
 import os
+import tempfile
 
 load_dotenv()
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -27,11 +28,14 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'calculator.middleware.MetricsMiddleware',
+    'calculator.middleware.ServerTimingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'calculator.middleware.ProfilingMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware'
 ]
@@ -40,7 +44,7 @@ ROOT_URLCONF = 'vehicle_analysis.urls'
 
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        'BACKEND': 'calculator.instrumentation.TimedDjangoTemplates',
         'DIRS': [os.path.join(BASE_DIR, 'templates')],
         'APP_DIRS': True,
         'OPTIONS': {
@@ -92,3 +96,55 @@ STATICFILES_DIRS = [
 PROJECT_DIR = os.path.dirname(os.path.abspath(__file__))
 STATIC_ROOT = os.path.join(PROJECT_DIR, 'static')
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
+
+# Каталог для бинарных (.npy) копий профилей и массивов, общих для всех воркеров
+PROFILE_CACHE_DIR = os.getenv('PROFILE_CACHE_DIR', os.path.join(tempfile.gettempdir(), 'vehicle_analysis'))
+
+# Каталог файлов метрик процессов (mmap), суммируются при запросе /metrics
+METRICS_DIR = os.getenv('METRICS_DIR', os.path.join(PROFILE_CACHE_DIR, 'metrics'))
+
+# Каталог сохраненных результатов симуляции парка (матрицы ТС x дни в .npy);
+# по умолчанию временный - для хранения между перезапусками задайте постоянный путь
+SIMULATION_RESULTS_DIR = os.getenv('SIMULATION_RESULTS_DIR', os.path.join(PROFILE_CACHE_DIR, 'simulations'))
+
+# Сколько секунд одинаковый расчет ждет результат уже идущего (calculator.singleflight),
+# прежде чем считать самостоятельно
+SINGLE_FLIGHT_TIMEOUT = float(os.getenv('SINGLE_FLIGHT_TIMEOUT', '60'))
+
+# Допуск тяжелых симуляций (calculator.admission) по оценке времени расчета (сек):
+# от HEAVY - не больше HEAVY_SLOTS одновременно на все воркеры с ожиданием до QUEUE_TIMEOUT,
+# от BACKGROUND - расчет в фоне с сохранением прогона (не больше BACKGROUND_SLOTS одновременно;
+# в очереди воркера не больше BACKGROUND_QUEUE задач, дальше - 503 с Retry-After)
+SIMULATION_HEAVY_SECONDS = float(os.getenv('SIMULATION_HEAVY_SECONDS', '1'))
+SIMULATION_BACKGROUND_SECONDS = float(os.getenv('SIMULATION_BACKGROUND_SECONDS', '5'))
+SIMULATION_HEAVY_SLOTS = int(os.getenv('SIMULATION_HEAVY_SLOTS', '2'))
+SIMULATION_BACKGROUND_SLOTS = int(os.getenv('SIMULATION_BACKGROUND_SLOTS', '1'))
+SIMULATION_BACKGROUND_QUEUE = int(os.getenv('SIMULATION_BACKGROUND_QUEUE', '4'))
+SIMULATION_QUEUE_TIMEOUT = float(os.getenv('SIMULATION_QUEUE_TIMEOUT', '10'))
+
+# Версия разметки страниц каталога в ETag (например, номер релиза); пусто - хэш шаблонов
+CATALOGUE_PAGE_VERSION = os.getenv('CATALOGUE_PAGE_VERSION', '')
+
+# Срок хранения (сек) фрагментов строк каталога в кэше шаблонов; ключ включает версию каталога,
+# поэтому после изменения ТС или импорта фрагменты строятся заново независимо от срока
+CATALOGUE_FRAGMENT_TIMEOUT = int(os.getenv('CATALOGUE_FRAGMENT_TIMEOUT', str(24 * 60 * 60)))
+
+# Сколько последних профилей запросов (?profile=1 для сотрудников) хранить
+REQUEST_PROFILE_LIMIT = int(os.getenv('REQUEST_PROFILE_LIMIT', '50'))
+
+# Прогрев кэшей воркера при загрузке wsgi/asgi, до приема трафика (см. calculator.warmup)
+WARM_UP_ON_STARTUP = os.getenv('WARM_UP_ON_STARTUP') == 'True'
+
+# Доля запросов с замером этапов (заголовок Server-Timing и лог calculator.middleware)
+SERVER_TIMING_SAMPLE_RATE = float(os.getenv('SERVER_TIMING_SAMPLE_RATE', '1.0' if DEBUG else '0.01'))
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'calculator': {'handlers': ['console'], 'level': os.getenv('CALCULATOR_LOG_LEVEL', 'INFO')},
+    },
+}
@@ -1,10 +1,13 @@
 from django.contrib import admin
 from django.urls import path, include
 
+from calculator.views import MetricsView
+
 urlpatterns = [
     path('', include('vehicles.urls')),
     path('calculator/', include('calculator.urls')),
     path('vehicle_simulation/', include('vehicle_simulation.urls', namespace='vehicle_simulation')),
     path('admin/', admin.site.urls),
+    path('metrics', MetricsView.as_view(), name='metrics'),
 
 ]
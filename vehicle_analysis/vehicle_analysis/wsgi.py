@@ -11,6 +11,10 @@ import os
 
 from django.core.wsgi import get_wsgi_application
 
+from calculator.warmup import warm_up_on_startup
+
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'vehicle_analysis.settings')
 
 application = get_wsgi_application()
+
+warm_up_on_startup()
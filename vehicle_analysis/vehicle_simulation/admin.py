@@ -0,0 +1,14 @@
+from django.contrib import admin
+
+from .models import SimulationRun
+
+
+@admin.register(SimulationRun)
+class SimulationRunAdmin(admin.ModelAdmin):
+    list_display = ('__str__', 'kind', 'created_at', 'start_date', 'end_date', 'seed', 'catalogue_version')
+    list_filter = ('kind',)
+    search_fields = ('name', 'results_dir')
+    readonly_fields = [f.name for f in SimulationRun._meta.fields]
+
+    def has_add_permission(self, request):
+        return False
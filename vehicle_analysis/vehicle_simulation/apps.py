@@ -4,3 +4,44 @@ from django.apps import AppConfig
 class VehicleSimulationConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'vehicle_simulation'
+
+    # стандартный сценарий прогрева: средние ТС всех типов на год
+    WARM_UP_DAYS = 365
+    WARM_UP_DAILY_KM = 50
+    WARM_UP_DAILY_HOURS = 8
+
+    def ready(self):
+        from . import signals  # noqa: F401
+
+    def warm_up(self):
+        """Профили сети, средние ТС по типам, симуляция и графики стандартного сценария"""
+        from datetime import date, timedelta
+        from django.template.loader import get_template
+        from vehicles.catalogue import VEHICLE_MODELS
+        from .engines import grid_profiles
+        from .engines.simulator import run_simulation
+        from .views import SimulationView
+
+        grid_profiles.load_profiles()
+        view = SimulationView()
+        start_date = date.today()
+        end_date = start_date + timedelta(days=self.WARM_UP_DAYS - 1)
+        results = []
+        for vehicle_type, model in VEHICLE_MODELS.items():
+            vehicle = view._create_average_vehicle(model, vehicle_type)
+            if vehicle is None:
+                continue
+            results.append({
+                'vehicle': vehicle,
+                'daily': run_simulation(vehicle, start_date, end_date, self.WARM_UP_DAILY_KM,
+                                        daily_hours=self.WARM_UP_DAILY_HOURS, seed=0),
+            })
+        if results:
+            view._add_charging_report(results, {
+                'start_date': start_date,
+                'end_date': end_date,
+                'daily_hours': self.WARM_UP_DAILY_HOURS,
+                'energy_source': 'eu_avg',
+            })
+            view._generate_plots(results)
+        get_template(SimulationView.template_name)
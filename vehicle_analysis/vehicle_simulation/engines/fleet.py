@@ -0,0 +1,358 @@
+import json
+import math
+import os
+import shutil
+from datetime import date
+from pathlib import Path
+
+import numpy as np
+
+from calculator import prometheus
+from calculator.engines.cost import TCOService
+from calculator.engines.emissions import EmissionsCalculator
+from calculator.engines.energy import EnergyCalculator
+from calculator.instrumentation import engine_call
+from vehicles.catalogue import VEHICLE_MODELS
+from . import grid_profiles
+from .time_based_cost import daily_prices
+
+UNIT_CHUNK = 256  # ТС за один проход (память: ТС x дни x 8 байт на каждый промежуточный массив)
+RNG_UNITS = 64  # ТС на один генератор множителей дней (UNIT_CHUNK кратен ему - выборка без лишних столбцов)
+DAY_CHUNK = 366  # дней за один проход при записи на диск
+SEASON_AMPLITUDE = 0.1  # сезонное колебание расхода ±10%, как в посуточной симуляции
+DEFAULT_UNIT_CV = 0.25  # разброс среднего пробега между ТС сегмента
+DEFAULT_DAILY_CV = 0.3  # разброс пробега одного ТС день ко дню
+DEFAULT_WEEKEND_FACTOR = 0.6  # пробег в выходной относительно буднего дня
+DAYS_PER_YEAR = 365
+METRICS = ('distance_km', 'fuel_liters', 'energy_kwh', 'energy_mj', 'co2_g', 'cost_rub')
+RESULT_DTYPE = np.float32  # значения ТС x дни на диске
+MANIFEST = 'fleet.json'
+
+
+def fleet_segment(vehicle, count, mean_km, weekend_factor=DEFAULT_WEEKEND_FACTOR,
+                  unit_cv=DEFAULT_UNIT_CV, daily_cv=DEFAULT_DAILY_CV, label=None):
+    """Сегмент парка: count ТС одной модели со средним пробегом mean_km в будний день"""
+    return {
+        'vehicle': vehicle,
+        'count': int(count),
+        'mean_km': float(mean_km),
+        'weekend_factor': float(weekend_factor),
+        'unit_cv': float(unit_cv),
+        'daily_cv': float(daily_cv),
+        'label': label or f"{vehicle.mark_name} {vehicle.model_name}",
+    }
+
+
+def parse_fleet(text):
+    """
+    Состав парка построчно: «<тип> <id> <кол-во> <км в будний день> [<коэф. выходных>]»;
+    ТС каждого типа загружаются одним запросом
+
+    :raises ValueError: описание ошибки с номером строки
+    :return: список {'vehicle', 'count', 'mean_km', 'weekend_factor'} (аргументы fleet_segment)
+    """
+    rows = []
+    for number, line in enumerate(text.splitlines(), start=1):
+        parts = line.split()
+        if not parts:
+            continue
+        if len(parts) not in (4, 5) or parts[0].upper() not in VEHICLE_MODELS:
+            raise ValueError(f"Строка {number}: ожидается «тип id количество км [коэф. выходных]»")
+        try:
+            vehicle_id, count = int(parts[1]), int(parts[2])
+            mean_km = float(parts[3])
+            weekend_factor = float(parts[4]) if len(parts) == 5 else DEFAULT_WEEKEND_FACTOR
+        except ValueError:
+            raise ValueError(f"Строка {number}: id и количество - целые, пробег и коэффициент - числа")
+        if count < 1 or mean_km < 0 or weekend_factor < 0:
+            raise ValueError(
+                f"Строка {number}: количество должно быть положительным, пробег и коэффициент - не меньше 0")
+        rows.append((parts[0].upper(), vehicle_id, count, mean_km, weekend_factor))
+    if not rows:
+        raise ValueError("Укажите хотя бы один сегмент парка")
+
+    vehicles = {
+        vehicle_type: VEHICLE_MODELS[vehicle_type].objects.in_bulk({row[1] for row in rows if row[0] == vehicle_type})
+        for vehicle_type in {row[0] for row in rows}
+    }
+    segments = []
+    for vehicle_type, vehicle_id, count, mean_km, weekend_factor in rows:
+        vehicle = vehicles[vehicle_type].get(vehicle_id)
+        if vehicle is None:
+            raise ValueError(f"ТС {vehicle_type} с id {vehicle_id} не найдено")
+        segments.append({'vehicle': vehicle, 'count': count, 'mean_km': mean_km, 'weekend_factor': weekend_factor})
+    return segments
+
+
+def lognormal_factor(rng, cv, size):
+    """Случайные множители со средним 1 и коэффициентом вариации cv"""
+    if not cv:
+        return np.ones(size)
+    sigma = math.sqrt(math.log1p(cv ** 2))
+    return rng.lognormal(-sigma ** 2 / 2, sigma, size)
+
+
+def fleet_calendar(start_date, end_date):
+    """Даты периода, признак выходного и сезонный множитель расхода: массивы (дни,)"""
+    dates = np.arange(np.datetime64(start_date, 'D'), np.datetime64(end_date, 'D') + 1)
+    weekday = (dates.astype(np.int64) + 3) % 7  # 1970-01-01 - четверг, 0 - понедельник
+    month = dates.astype('datetime64[M]').astype(np.int64) % 12
+    season = 1 + SEASON_AMPLITUDE * np.sin(2 * np.pi * month / 12)
+    return dates, weekday >= 5, season
+
+
+def _segment_blocks(segment, seed, index, start_date, end_date, driving_conditions, energy_source,
+                    daily_hours, fuel_grade, inflation, unit_chunk, day_chunk):
+    """
+    Показатели сегмента блоками: (первое ТС, первый день, {показатель: (ТС блока, дни блока)}).
+    Множители пробега ТС выбираются один раз на сегмент, множители дней - из своего генератора
+    на каждые RNG_UNITS ТС в порядке дней, так что случайные значения не зависят ни от unit_chunk,
+    ни от day_chunk.
+    """
+    vehicle = segment['vehicle']
+    dates, weekend, season = fleet_calendar(start_date, end_date)
+    day_factor = np.where(weekend, segment['weekend_factor'], 1.0)
+    prices = daily_prices(vehicle, start_date, end_date, daily_hours, fuel_grade, inflation)
+    emission_factor = None
+    if (daily_hours is not None and grid_profiles.is_grid_charged(vehicle)
+            and grid_profiles.has_profile(energy_source)):
+        emission_factor = grid_profiles.daily_weighted_average(energy_source, start_date, end_date, daily_hours)
+    fixed_per_day = (TCOService.INSURANCE_COST + vehicle.production_price * TCOService.TAX_RATE) / DAYS_PER_YEAR
+
+    all_unit_km = segment['mean_km'] * lognormal_factor(
+        np.random.default_rng([seed, index]), segment['unit_cv'], segment['count'])
+    for first_unit in range(0, segment['count'], unit_chunk):
+        unit_km = all_unit_km[first_unit:first_unit + unit_chunk]
+        # генераторы групп RNG_UNITS ТС, пересекающихся с блоком; столбцы вне блока отбрасываются
+        first_group = first_unit - first_unit % RNG_UNITS
+        groups = [(np.random.default_rng([seed, index, first]), min(RNG_UNITS, segment['count'] - first))
+                  for first in range(first_group, first_unit + len(unit_km), RNG_UNITS)]
+        columns = slice(first_unit - first_group, first_unit - first_group + len(unit_km))
+        for first_day in range(0, len(dates), day_chunk):
+            days = slice(first_day, first_day + day_chunk)
+            block_prices = {key: value[days] if np.ndim(value) else value for key, value in prices.items()}
+            # выборка (дни, ТС): блоки дней подряд дают те же значения, что одна выборка за весь период
+            day_factors = np.concatenate([
+                lognormal_factor(rng, segment['daily_cv'], (len(season[days]), units)) for rng, units in groups
+            ], axis=1)[:, columns]
+            km = unit_km[:, None] * day_factor[days] * day_factors.T
+
+            energy = EnergyCalculator.calculate_energy_consumption(vehicle, km, driving_conditions)
+            co2 = EmissionsCalculator.calculate_co2(
+                vehicle, km, energy_source, driving_conditions,
+                emission_factor=None if emission_factor is None else emission_factor[days],
+            )
+            energy_cost = TCOService._calculate_energy_cost(vehicle, km, driving_conditions, block_prices)
+            maintenance = TCOService._calculate_maintenance_cost(vehicle, km)
+            block_season = season[days]
+            values = {
+                'distance_km': km,
+                'fuel_liters': energy.get('fuel_liters'),
+                'energy_kwh': energy.get('energy_kwh'),
+                'energy_mj': energy.get('energy_mj', energy.get('total_energy_mj')),
+                'co2_g': co2,
+            }
+            block = {'distance_km': km}
+            for metric in ('fuel_liters', 'energy_kwh', 'energy_mj', 'co2_g'):
+                block[metric] = (np.zeros(km.shape) if values[metric] is None
+                                 else np.broadcast_to(values[metric], km.shape) * block_season)
+            block['cost_rub'] = np.broadcast_to(energy_cost * block_season + maintenance + fixed_per_day, km.shape)
+            yield first_unit, first_day, block
+
+
+def _segment_row(segment, totals):
+    return {
+        'label': segment['label'],
+        'vehicle_type': segment['vehicle'].vehicle_type,
+        'vehicle_id': segment['vehicle'].pk,
+        'count': segment['count'],
+        'mean_km': segment['mean_km'],
+        'weekend_factor': segment['weekend_factor'],
+        'totals': {metric: float(values.sum()) for metric, values in totals.items()},
+    }
+
+
+def _summarize(dates, segment_daily, segment_rows):
+    """Итоги по парку и типам ТС из посуточных сумм сегментов"""
+    daily = {metric: np.sum([values[metric] for values in segment_daily], axis=0) for metric in METRICS}
+    by_type = {}
+    for row in segment_rows:
+        totals = by_type.setdefault(row['vehicle_type'], {'count': 0, **{metric: 0.0 for metric in METRICS}})
+        totals['count'] += row['count']
+        for metric in METRICS:
+            totals[metric] += row['totals'][metric]
+    return {
+        'dates': dates,
+        'daily': daily,
+        'segments': segment_rows,
+        'by_type': by_type,
+        'totals': {metric: float(values.sum()) for metric, values in daily.items()},
+    }
+
+
+@engine_call('fleet')
+def simulate_fleet(segments, start_date, end_date, driving_conditions='mixed', energy_source='eu_avg',
+                   daily_hours=None, fuel_grade='petrol', inflation=0.0, seed=0, unit_chunk=UNIT_CHUNK):
+    """
+    Симуляция парка: каждое ТС сегмента - строка матрицы пробегов ТС x дни,
+    движки расчета применяются ко всей матрице блоками по unit_chunk ТС,
+    так что память не зависит от размера парка, а посуточные словари не строятся.
+
+    Пробег ТС за день = mean_km сегмента x множитель ТС (unit_cv) x множитель дня (daily_cv),
+    в выходные дополнительно x weekend_factor. Расход, выбросы и стоимость энергии
+    меняются по сезону; ТО - по пробегу; страховка и налог - годовые, по дням.
+
+    :param segments: список fleet_segment(...)
+    :return: {'dates': (дни,), 'daily': {показатель: (дни,)} по парку,
+              'segments': итоги по сегментам, 'by_type': итоги по типам ТС, 'totals': итоги парка}
+    """
+    dates = fleet_calendar(start_date, end_date)[0]
+    segment_daily, segment_rows = [], []
+    for index, segment in enumerate(segments):
+        totals = {metric: np.zeros(len(dates)) for metric in METRICS}
+        blocks = _segment_blocks(segment, seed, index, start_date, end_date,
+                                 driving_conditions, energy_source, daily_hours, fuel_grade, inflation,
+                                 unit_chunk, len(dates))
+        for _, _, block in blocks:
+            for metric in METRICS:
+                totals[metric] += block[metric].sum(axis=0)
+        segment_daily.append(totals)
+        segment_rows.append(_segment_row(segment, totals))
+        prometheus.SIMULATED_DAYS.inc(segment['count'] * len(dates), vehicle_type=segment['vehicle'].vehicle_type)
+    return _summarize(dates, segment_daily, segment_rows)
+
+
+@engine_call('fleet')
+def simulate_fleet_to_disk(segments, start_date, end_date, path, driving_conditions='mixed',
+                           energy_source='eu_avg', daily_hours=None, fuel_grade='petrol', inflation=0.0,
+                           seed=0, unit_chunk=UNIT_CHUNK, day_chunk=DAY_CHUNK):
+    """
+    Симуляция парка вне памяти: значения каждого ТС по дням пишутся в файлы
+    <path>/<показатель>.npy (ТС x дни, float32) через np.lib.format.open_memmap
+    блоками unit_chunk ТС x day_chunk дней; суммы по дням сегментов и по ТС
+    накапливаются на лету. Пиковая память зависит только от размера блока.
+
+    Результат собирается во временном каталоге и переименовывается в path целиком;
+    открывается повторно без пересчета через open_fleet_results(path).
+
+    :return: FleetResults
+    """
+    path = Path(path)
+    dates = fleet_calendar(start_date, end_date)[0]
+    units = sum(segment['count'] for segment in segments)
+    tmp_path = path.with_name(f'{path.name}.{os.getpid()}.tmp')
+    tmp_path.mkdir(parents=True, exist_ok=True)
+    try:
+        outputs = {
+            metric: np.lib.format.open_memmap(tmp_path / f'{metric}.npy', mode='w+', dtype=RESULT_DTYPE,
+                                              shape=(units, len(dates)))
+            for metric in METRICS
+        }
+        unit_totals = np.lib.format.open_memmap(tmp_path / 'unit_totals.npy', mode='w+', dtype=np.float64,
+                                                shape=(units, len(METRICS)))
+        segment_daily, segment_rows = [], []
+        offset = 0
+        for index, segment in enumerate(segments):
+            totals = {metric: np.zeros(len(dates)) for metric in METRICS}
+            blocks = _segment_blocks(segment, seed, index, start_date, end_date,
+                                     driving_conditions, energy_source, daily_hours, fuel_grade, inflation,
+                                     unit_chunk, day_chunk)
+            for first_unit, first_day, block in blocks:
+                rows = slice(offset + first_unit, offset + first_unit + len(block['distance_km']))
+                days = slice(first_day, first_day + block['distance_km'].shape[1])
+                for column, metric in enumerate(METRICS):
+                    outputs[metric][rows, days] = block[metric]
+                    totals[metric][days] += block[metric].sum(axis=0)
+                    unit_totals[rows, column] += block[metric].sum(axis=1)
+            segment_rows.append({**_segment_row(segment, totals), 'offset': offset})
+            segment_daily.append(totals)
+            offset += segment['count']
+            prometheus.SIMULATED_DAYS.inc(segment['count'] * len(dates),
+                                          vehicle_type=segment['vehicle'].vehicle_type)
+        for values in (*outputs.values(), unit_totals):
+            values.flush()
+        del outputs, unit_totals
+
+        summary = _summarize(dates, segment_daily, segment_rows)
+        with open(tmp_path / 'daily.npz', 'wb') as f:
+            np.savez_compressed(f, **{metric: np.array([d[metric] for d in segment_daily]) for metric in METRICS})
+        with open(tmp_path / MANIFEST, 'w', encoding='utf-8') as f:
+            json.dump({
+                'start_date': start_date.isoformat(),
+                'end_date': end_date.isoformat(),
+                'units': units,
+                'metrics': list(METRICS),
+                'parameters': {
+                    'driving_conditions': driving_conditions,
+                    'energy_source': energy_source,
+                    'daily_hours': daily_hours,
+                    'fuel_grade': fuel_grade,
+                    'inflation': inflation,
+                    'seed': seed,
+                    'unit_chunk': unit_chunk,
+                    'day_chunk': day_chunk,
+                },
+                'segments': summary['segments'],
+                'by_type': summary['by_type'],
+                'totals': summary['totals'],
+            }, f, ensure_ascii=False, indent=2)
+        if path.exists():
+            shutil.rmtree(path)
+        os.rename(tmp_path, path)
+    except BaseException:
+        shutil.rmtree(tmp_path, ignore_errors=True)
+        raise
+    return open_fleet_results(path)
+
+
+class FleetResults:
+    """
+    Сохраненные результаты simulate_fleet_to_disk: значения ТС x дни открываются
+    через mmap (страницы читаются с диска по мере обращения), итоги - из манифеста
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        with open(self.path / MANIFEST, encoding='utf-8') as f:
+            self.manifest = json.load(f)
+        self.start_date = date.fromisoformat(self.manifest['start_date'])
+        self.end_date = date.fromisoformat(self.manifest['end_date'])
+        self.dates = fleet_calendar(self.start_date, self.end_date)[0]
+        self.segments = self.manifest['segments']
+        self.by_type = self.manifest['by_type']
+        self.totals = self.manifest['totals']
+
+    def summary(self):
+        """Итоги в формате simulate_fleet (суммы по дням - из daily.npz)"""
+        with np.load(self.path / 'daily.npz') as data:
+            daily = {metric: data[metric].sum(axis=0) for metric in METRICS}
+        return {
+            'dates': self.dates,
+            'daily': daily,
+            'segments': self.segments,
+            'by_type': self.by_type,
+            'totals': self.totals,
+        }
+
+    def values(self, metric):
+        """Матрица ТС x дни показателя (только чтение, без загрузки в память)"""
+        return np.load(self.path / f'{metric}.npy', mmap_mode='r')
+
+    def segment_values(self, index, metric):
+        """Строки ТС сегмента index"""
+        segment = self.segments[index]
+        return self.values(metric)[segment['offset']:segment['offset'] + segment['count']]
+
+    def daily(self, metric, segment=None):
+        """Сумма по дням: по всему парку или по сегменту"""
+        with np.load(self.path / 'daily.npz') as data:
+            values = data[metric]
+        return values.sum(axis=0) if segment is None else values[segment]
+
+    def unit_totals(self, metric):
+        """Сумма за период по каждому ТС (в порядке сегментов)"""
+        return np.load(self.path / 'unit_totals.npy', mmap_mode='r')[:, METRICS.index(metric)]
+
+
+def open_fleet_results(path):
+    return FleetResults(path)
@@ -0,0 +1,91 @@
+import math
+import os
+import threading
+from pathlib import Path
+
+import numpy as np
+from django.conf import settings
+
+PROFILES_CSV = Path(__file__).resolve().parent.parent / 'data' / 'grid_profiles.csv'
+HOURS_PER_DAY = 24
+DAYS_PER_YEAR = 365
+TARIFF_COLUMN = 'tariff_rub_kwh'
+DEPARTURE_HOUR = 8  # начало ежедневной эксплуатации ТС (ч)
+
+_profiles = None
+_lock = threading.Lock()
+
+
+def load_profiles():
+    """
+    Почасовые (8760 точек) профили углеродоемкости сети (г/кВт·ч по источникам) и тарифа.
+
+    CSV читается один раз и сохраняется в .npy (имя зависит от размера и времени
+    изменения CSV), который открывается через np.load(mmap_mode='r'):
+    все воркеры разделяют одни и те же страницы памяти.
+    """
+    global _profiles
+    if _profiles is None:
+        with _lock:
+            if _profiles is None:
+                _profiles = _open_profiles(PROFILES_CSV)
+    return _profiles
+
+
+def _open_profiles(csv_path):
+    stat = csv_path.stat()
+    cache_dir = Path(settings.PROFILE_CACHE_DIR)
+    npy_path = cache_dir / f'{csv_path.stem}-{stat.st_size}-{stat.st_mtime_ns}.npy'
+    if not npy_path.exists():
+        cache_dir.mkdir(parents=True, exist_ok=True)
+        data = np.genfromtxt(csv_path, delimiter=',', names=True, dtype=float)
+        if len(data) != HOURS_PER_DAY * DAYS_PER_YEAR:
+            raise ValueError(f"{csv_path}: ожидается {HOURS_PER_DAY * DAYS_PER_YEAR} часов, получено {len(data)}")
+        tmp_path = npy_path.with_suffix(f'.{os.getpid()}.tmp')
+        with open(tmp_path, 'wb') as f:
+            np.save(f, data)
+        os.replace(tmp_path, npy_path)
+    return np.load(npy_path, mmap_mode='r')
+
+
+def has_profile(name):
+    return name in load_profiles().dtype.names
+
+
+def charging_window_hours(daily_hours):
+    """Часы суток подключения к зарядке по порядку: от возвращения ТС (DEPARTURE_HOUR + daily_hours) до выезда"""
+    busy_hours = min(HOURS_PER_DAY - 1, math.ceil(daily_hours or 0))
+    return (DEPARTURE_HOUR + busy_hours + np.arange(HOURS_PER_DAY - busy_hours)) % HOURS_PER_DAY
+
+
+def charging_weights(daily_hours):
+    """Доли зарядки по часам суток (24,): энергия распределяется равномерно по окну подключения"""
+    window = charging_window_hours(daily_hours)
+    weights = np.zeros(HOURS_PER_DAY)
+    weights[window] = 1.0 / len(window)
+    return weights
+
+
+def day_of_year_index(start_date, end_date):
+    """Номер дня года (0..364) для каждого дня периода, без разбора дат по одной"""
+    dates = np.arange(np.datetime64(start_date, 'D'), np.datetime64(end_date, 'D') + 1)
+    day_index = (dates - dates.astype('datetime64[Y]')).astype(np.int64)
+    return np.minimum(day_index, DAYS_PER_YEAR - 1)
+
+
+def daily_profile_matrix(name, start_date, end_date):
+    """Почасовые значения профиля за период: матрица (дни, 24)"""
+    hourly = np.asarray(load_profiles()[name]).reshape(DAYS_PER_YEAR, HOURS_PER_DAY)
+    return hourly[day_of_year_index(start_date, end_date)]
+
+
+def daily_weighted_average(name, start_date, end_date, daily_hours):
+    """Средневзвешенное по окну зарядки значение профиля для каждого дня: (дни,)"""
+    return daily_profile_matrix(name, start_date, end_date) @ charging_weights(daily_hours)
+
+
+GRID_CHARGED_TYPES = ('EV', 'PHEV')
+
+
+def is_grid_charged(vehicle):
+    return getattr(vehicle, 'vehicle_type', None) in GRID_CHARGED_TYPES
@@ -0,0 +1,106 @@
+import threading
+from collections import OrderedDict
+from datetime import timedelta
+
+import numpy as np
+
+from calculator import prometheus
+
+# входы, от которых зависит каждая посуточная симуляция (кроме ТС, дат и зерна);
+# изменение входа пересчитывает только зависящие от него части
+DEPENDENCIES = {
+    'energy': ('daily_km', 'driving_conditions'),
+    'emissions': ('daily_km', 'energy_source', 'driving_conditions', 'use_recuperation', 'urban_share', 'daily_hours'),
+    'cost': ('daily_km', 'driving_conditions', 'daily_hours', 'fuel_grade', 'inflation'),
+}
+NOISE_STREAMS = {'energy': 0, 'emissions': 1, 'cost': 2}
+DAYS_PER_LEAP_YEAR = 366
+
+
+def daily_noise(seed, component, start_date, end_date, sigma):
+    """
+    Шумовые множители N(1, sigma) по дням: значение дня зависит только от зерна, симуляции и даты,
+    поэтому части периода можно считать отдельно и склеивать (по генератору на год)
+    """
+    days = np.arange(np.datetime64(start_date, 'D'), np.datetime64(end_date, 'D') + 1)
+    years = days.astype('datetime64[Y]')
+    day_of_year = (days - years).astype(np.int64)
+    year_numbers = years.astype(np.int64) + 1970
+    noise = np.empty(len(days))
+    for year in np.unique(year_numbers):
+        mask = year_numbers == year
+        rng = np.random.default_rng([seed, NOISE_STREAMS[component], int(year)])
+        noise[mask] = rng.normal(1, sigma, DAYS_PER_LEAP_YEAR)[day_of_year[mask]]
+    return noise
+
+
+def vehicle_fingerprint(vehicle):
+    """Ключ ТС по значениям полей (среднее ТС типа и измененное ТС получают новый ключ)"""
+    return (vehicle.vehicle_type, tuple(getattr(vehicle, field.attname) for field in vehicle._meta.concrete_fields))
+
+
+class IncrementalSimulator:
+    """
+    Кэш посуточных симуляций с пересчетом только изменившейся части.
+
+    Результат симуляции (energy, emissions, cost) хранится по ключу
+    (ТС, зерно, значения входов из DEPENDENCIES) вместе с непрерывным диапазоном дат.
+    Запрос внутри диапазона - срез кэша; пересекающийся или смежный - досчитываются
+    только недостающие дни слева и справа, диапазон расширяется; иначе - полный расчет.
+    Работает только с заданным зерном: шум дня детерминирован (daily_noise).
+
+    Элементы списков - общие словари кэша, изменять их нельзя.
+    """
+    MAX_ENTRIES = 64
+
+    def __init__(self):
+        self._entries = OrderedDict()  # ключ -> (первый день, [день, ...])
+        self._lock = threading.Lock()
+
+    def evaluate(self, component, compute, vehicle, start_date, end_date, seed, **inputs):
+        """
+        Посуточный результат симуляции component за [start_date, end_date]
+
+        :param compute: функция симуляции (vehicle, start_date, end_date, seed=..., **входы)
+        :param inputs: все входы сценария; учитываются только DEPENDENCIES[component]
+        """
+        inputs = {name: inputs[name] for name in DEPENDENCIES[component]}
+        key = (component, vehicle_fingerprint(vehicle), seed, tuple(inputs.items()))
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+
+        if entry is not None:
+            cached_start, cached_days = entry
+            cached_end = cached_start + timedelta(days=len(cached_days) - 1)
+            if start_date > cached_end + timedelta(days=1) or end_date < cached_start - timedelta(days=1):
+                entry = None  # диапазоны не пересекаются и не смежны
+        if entry is None:
+            result = 'miss'
+            span_start, days = start_date, compute(vehicle, start_date, end_date, seed=seed, **inputs)
+        else:
+            left = right = []
+            if start_date < cached_start:
+                left = compute(vehicle, start_date, cached_start - timedelta(days=1), seed=seed, **inputs)
+            if end_date > cached_end:
+                right = compute(vehicle, cached_end + timedelta(days=1), end_date, seed=seed, **inputs)
+            result = 'partial' if left or right else 'hit'
+            span_start, days = min(start_date, cached_start), left + cached_days + right
+
+        prometheus.CACHE_REQUESTS.inc(cache=f'simulation_{component}', result=result)
+        if result != 'hit':
+            with self._lock:
+                self._entries[key] = (span_start, days)
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.MAX_ENTRIES:
+                    self._entries.popitem(last=False)
+        offset = (start_date - span_start).days
+        return days[offset:offset + (end_date - start_date).days + 1]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+incremental_simulator = IncrementalSimulator()
@@ -1,8 +1,14 @@
+import time
+
+from calculator import prometheus
+from calculator.instrumentation import engine_call
 from .time_based_energy import simulate_daily_energy
 from .time_based_emissions import simulate_daily_emissions
 from .time_based_cost import simulate_daily_cost
+from .incremental import incremental_simulator
 
 
+@engine_call('simulation')
 def run_simulation(vehicle,
                    start_date,
                    end_date,
@@ -10,16 +16,41 @@ def run_simulation(vehicle,
                    driving_conditions='mixed',
                    energy_source='eu_avg',
                    use_recuperation=True,
-                   urban_share=0.5):
+                   urban_share=0.5,
+                   daily_hours=None,
+                   fuel_grade='petrol',
+                   inflation=0.0,
+                   seed=None):
     """
     Собирает три симуляции в один список:
       [{'date':…, 'energy':{…}, 'co2_g':…, 'cost_rub':…}, …]
+
+    daily_hours (часы эксплуатации в день) задает окно зарядки EV/PHEV
+    для почасовых профилей сети; None - постоянные коэффициенты.
+    fuel_grade и inflation задают ряд цен топлива и индексацию цен после его окончания.
+
+    С заданным seed шум дня детерминирован, и части считаются инкрементально
+    (incremental_simulator): смена источника энергии пересчитывает только выбросы,
+    цен - только затраты, продление периода - только новые дни.
     """
-    e = simulate_daily_energy(vehicle, start_date, end_date, daily_km, driving_conditions)
-    em = simulate_daily_emissions(vehicle, start_date, end_date, daily_km,
-                                  energy_source, driving_conditions,
-                                  use_recuperation, urban_share)
-    c = simulate_daily_cost(vehicle, start_date, end_date, daily_km, driving_conditions)
+    started = time.perf_counter()
+    if seed is None:
+        e = simulate_daily_energy(vehicle, start_date, end_date, daily_km, driving_conditions)
+        em = simulate_daily_emissions(vehicle, start_date, end_date, daily_km,
+                                      energy_source, driving_conditions,
+                                      use_recuperation, urban_share, daily_hours)
+        c = simulate_daily_cost(vehicle, start_date, end_date, daily_km, driving_conditions, daily_hours,
+                                fuel_grade, inflation)
+    else:
+        inputs = dict(daily_km=daily_km, driving_conditions=driving_conditions, energy_source=energy_source,
+                      use_recuperation=use_recuperation, urban_share=urban_share, daily_hours=daily_hours,
+                      fuel_grade=fuel_grade, inflation=inflation)
+        e = incremental_simulator.evaluate('energy', simulate_daily_energy, vehicle, start_date, end_date, seed,
+                                           **inputs)
+        em = incremental_simulator.evaluate('emissions', simulate_daily_emissions, vehicle, start_date, end_date,
+                                            seed, **inputs)
+        c = incremental_simulator.evaluate('cost', simulate_daily_cost, vehicle, start_date, end_date, seed,
+                                           **inputs)
 
     combined = []
     for ener, emis, cost in zip(e, em, c):
@@ -29,4 +60,8 @@ def run_simulation(vehicle,
             'co2_g': emis['co2_g'],
             'cost_rub': cost['cost_rub'],
         })
+
+    prometheus.SIMULATED_DAYS.inc(len(combined), vehicle_type=getattr(vehicle, 'vehicle_type', ''))
+    prometheus.SIMULATION_LATENCY.observe(time.perf_counter() - started,
+                                          range_days=prometheus.simulation_range_label(len(combined)))
     return combined
@@ -0,0 +1,87 @@
+import numpy as np
+
+from calculator.engines.energy import EnergyCalculator
+from calculator.instrumentation import engine_call
+from . import grid_profiles
+
+DEFAULT_CHARGER_POWER_KW = 7.4  # домашняя зарядка (кВт)
+OBJECTIVES = ('cost', 'co2')
+VEHICLE_CHUNK = 256  # ТС за один проход (ограничивает память: ТС x дни x часы окна)
+
+
+def daily_energy_need(vehicles, daily_km, driving_conditions='mixed'):
+    """Суточная потребность EV/PHEV в энергии из сети (кВт·ч) по EnergyCalculator"""
+    return EnergyCalculator.calculate_energy_consumption(vehicles, daily_km, driving_conditions)['energy_kwh']
+
+
+def _allocate(need, power, tariff, intensity):
+    """
+    Заполнение часов окна по порядку: в k-й час попадает clip(E - k*P, 0, P).
+
+    :param need: (V, D) потребность, кВт·ч
+    :param power: (V, 1) мощность зарядки, кВт
+    :param tariff: (D, H) тариф в порядке заполнения часов
+    :param intensity: (D, H) углеродоемкость в порядке заполнения часов
+    :return: стоимость (V, D), выбросы (V, D), недозаряд (V, D)
+    """
+    slots = np.arange(tariff.shape[1])
+    energy = np.clip(need[:, :, None] - slots * power[:, :, None], 0, power[:, :, None])  # (V, D, H)
+    cost = np.einsum('vdh,dh->vd', energy, tariff)
+    co2 = np.einsum('vdh,dh->vd', energy, intensity)
+    unmet = np.maximum(need - power * len(slots), 0)
+    return cost, co2, unmet
+
+
+@engine_call('smart_charging')
+def optimize_charging(daily_kwh, start_date, end_date, daily_hours, energy_source='eu_avg',
+                      objective='cost', charger_power_kw=DEFAULT_CHARGER_POWER_KW):
+    """
+    Умная зарядка: для каждого ТС и дня энергия распределяется по самым дешевым
+    (или самым «чистым») часам окна подключения; сравнение с неуправляемой
+    зарядкой (сразу после подключения, на полной мощности).
+
+    Часы окна сортируются один раз на день для всех ТС, после чего распределение -
+    чистая векторная операция над массивом (ТС, дни, часы окна).
+
+    :param daily_kwh: потребность (V, D) или (V,) - одинаковая во все дни
+    :param charger_power_kw: мощность зарядки, скаляр или (V,)
+    :param objective: 'cost' - минимум затрат, 'co2' - минимум выбросов
+    :return: словарь массивов (V, D): smart_cost, smart_co2, uncontrolled_cost, uncontrolled_co2, unmet_kwh
+    """
+    if objective not in OBJECTIVES:
+        raise ValueError(f"Unknown objective: {objective}")
+
+    hours = grid_profiles.charging_window_hours(daily_hours)
+    tariff = grid_profiles.daily_profile_matrix(grid_profiles.TARIFF_COLUMN, start_date, end_date)[:, hours]
+    intensity = grid_profiles.daily_profile_matrix(energy_source, start_date, end_date)[:, hours]
+    n_days = tariff.shape[0]
+
+    daily_kwh = np.nan_to_num(np.asarray(daily_kwh, dtype=float))
+    if daily_kwh.ndim == 1:
+        daily_kwh = np.repeat(daily_kwh[:, None], n_days, axis=1)
+    power = np.broadcast_to(np.asarray(charger_power_kw, dtype=float), (daily_kwh.shape[0],))[:, None]
+
+    signal = tariff if objective == 'cost' else intensity
+    # при равных значениях сигнала сохраняем хронологический порядок
+    order = np.argsort(signal, axis=1, kind='stable')
+    smart_tariff = np.take_along_axis(tariff, order, axis=1)
+    smart_intensity = np.take_along_axis(intensity, order, axis=1)
+
+    result = {name: np.empty_like(daily_kwh) for name in (
+        'smart_cost', 'smart_co2', 'uncontrolled_cost', 'uncontrolled_co2', 'unmet_kwh')}
+    for start in range(0, daily_kwh.shape[0], VEHICLE_CHUNK):
+        chunk = slice(start, start + VEHICLE_CHUNK)
+        need, chunk_power = daily_kwh[chunk], power[chunk]
+        (result['smart_cost'][chunk], result['smart_co2'][chunk],
+         result['unmet_kwh'][chunk]) = _allocate(need, chunk_power, smart_tariff, smart_intensity)
+        (result['uncontrolled_cost'][chunk], result['uncontrolled_co2'][chunk],
+         _) = _allocate(need, chunk_power, tariff, intensity)
+    return result
+
+
+def summarize_savings(result):
+    """Итоги по каждому ТС: затраты и выбросы зарядки, экономия умной зарядки"""
+    totals = {name: values.sum(axis=1) for name, values in result.items()}
+    totals['cost_saving'] = totals['uncontrolled_cost'] - totals['smart_cost']
+    totals['co2_saving'] = totals['uncontrolled_co2'] - totals['smart_co2']
+    return totals
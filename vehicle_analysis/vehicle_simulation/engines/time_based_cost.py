@@ -1,27 +1,61 @@
 from datetime import timedelta
 import math
 import random
+
+import numpy as np
+
 from calculator.engines.cost import TCOService
+from . import grid_profiles
+from .incremental import daily_noise
+
 
+def simulate_daily_cost(vehicle, start_date, end_date, daily_km, driving_conditions, daily_hours=None,
+                        fuel_grade='petrol', inflation=0.0, seed=None):
+    """
+    Эксплуатационные затраты по дням.
 
-def simulate_daily_cost(vehicle, start_date, end_date, daily_km, driving_conditions):
+    Цены топлива и электроэнергии берутся из помесячных рядов цен (inflation -
+    годовая индексация после окончания ряда). Если задано daily_hours, для EV/PHEV
+    цена электроэнергии дополнительно умножается на отношение тарифа почасового
+    профиля в окне зарядки к среднегодовому тарифу.
+    seed делает шум дня детерминированным (иначе - случайный при каждом вызове).
+    """
     results = []
     current = start_date
     alpha = 0.1
     sigma = 0.03
+    n_days = (end_date - start_date).days + 1
+    day_noise = None if seed is None else daily_noise(seed, 'cost', start_date, end_date, sigma)
 
-    while current <= end_date:
-        base_cost = TCOService._calculate_usage_cost(
-            vehicle,
-            distance_km=daily_km,
-            driving_conditions=driving_conditions
-        )
+    prices = daily_prices(vehicle, start_date, end_date, daily_hours, fuel_grade, inflation)
+    base_cost = TCOService._calculate_usage_cost(
+        vehicle,
+        distance_km=daily_km,
+        driving_conditions=driving_conditions,
+        prices=prices
+    )
+    base_cost = np.broadcast_to(base_cost, (max(n_days, 0),))
+
+    for day in range(n_days):
         month_idx = current.month - 1
         season = 1 + alpha * math.sin(2 * math.pi * month_idx / 12)
-        noise = random.gauss(1, sigma)
+        noise = random.gauss(1, sigma) if day_noise is None else day_noise[day]
 
-        cost = base_cost * season * noise
+        cost = float(base_cost[day]) * season * noise
         results.append({'date': current, 'cost_rub': cost})
         current += timedelta(days=1)
 
     return results
+
+
+def daily_prices(vehicle, start_date, end_date, daily_hours=None, fuel_grade='petrol', inflation=0.0):
+    """
+    Цены по дням периода (массивы (дни,)); для EV/PHEV при заданном daily_hours
+    цена электроэнергии умножается на отношение тарифа в окне зарядки к среднегодовому
+    """
+    prices = TCOService.get_daily_prices(start_date, end_date, fuel_grade, inflation)
+    if daily_hours is not None and grid_profiles.is_grid_charged(vehicle):
+        tariff = grid_profiles.daily_weighted_average(grid_profiles.TARIFF_COLUMN, start_date, end_date, daily_hours)
+        annual_tariff = np.mean(grid_profiles.load_profiles()[grid_profiles.TARIFF_COLUMN])
+        prices['electricity'] = prices['electricity'] * tariff / annual_tariff
+    return prices
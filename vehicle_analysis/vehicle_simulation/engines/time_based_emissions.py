@@ -1,31 +1,54 @@
 from datetime import timedelta
 import math
 import random
+
+import numpy as np
+
 from calculator.engines.emissions import EmissionsCalculator
+from . import grid_profiles
+from .incremental import daily_noise
 
 
 def simulate_daily_emissions(vehicle, start_date, end_date, daily_km,
                              energy_source, driving_conditions,
-                             use_recuperation=True, urban_share=0.5):
+                             use_recuperation=True, urban_share=0.5,
+                             daily_hours=None, seed=None):
+    """
+    Выбросы CO₂ по дням.
+
+    Если задано daily_hours, для EV/PHEV углеродоемкость сети берется из почасового
+    профиля источника, усредненного по окну зарядки каждого дня.
+    seed делает шум дня детерминированным (иначе - случайный при каждом вызове).
+    """
     results = []
     current = start_date
     alpha = 0.1
     sigma = 0.03
+    n_days = (end_date - start_date).days + 1
+    day_noise = None if seed is None else daily_noise(seed, 'emissions', start_date, end_date, sigma)
+
+    emission_factor = None
+    if (daily_hours is not None and grid_profiles.is_grid_charged(vehicle)
+            and grid_profiles.has_profile(energy_source)):
+        emission_factor = grid_profiles.daily_weighted_average(energy_source, start_date, end_date, daily_hours)
+
+    base_co2 = EmissionsCalculator.calculate_co2(
+        vehicle,
+        distance_km=daily_km,
+        energy_source=energy_source,
+        driving_conditions=driving_conditions,
+        use_recuperation=use_recuperation,
+        urban_share=urban_share,
+        emission_factor=emission_factor
+    )
+    base_co2 = np.broadcast_to(base_co2, (max(n_days, 0),))
 
-    while current <= end_date:
-        base_co2 = EmissionsCalculator.calculate_co2(
-            vehicle,
-            distance_km=daily_km,
-            energy_source=energy_source,
-            driving_conditions=driving_conditions,
-            use_recuperation=use_recuperation,
-            urban_share=urban_share
-        )
+    for day in range(n_days):
         month_idx = current.month - 1
         season = 1 + alpha * math.sin(2 * math.pi * month_idx / 12)
-        noise = random.gauss(1, sigma)
+        noise = random.gauss(1, sigma) if day_noise is None else day_noise[day]
 
-        co2 = base_co2 * season * noise
+        co2 = float(base_co2[day]) * season * noise
         results.append({'date': current, 'co2_g': co2})
         current += timedelta(days=1)
 
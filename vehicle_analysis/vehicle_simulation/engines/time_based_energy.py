@@ -2,13 +2,16 @@ from datetime import timedelta
 import math
 import random
 from calculator.engines.energy import EnergyCalculator
+from .incremental import daily_noise
 
 
-def simulate_daily_energy(vehicle, start_date, end_date, daily_km, driving_conditions):
+def simulate_daily_energy(vehicle, start_date, end_date, daily_km, driving_conditions, seed=None):
+    """Энергия по дням; seed делает шум дня детерминированным (иначе - случайный при каждом вызове)"""
     results = []
     current = start_date
     alpha = 0.1  # амплитуда сезонного колебания ±10%
     sigma = 0.03  # стандартное отклонение шума 3%
+    day_noise = None if seed is None else daily_noise(seed, 'energy', start_date, end_date, sigma)
 
     while current <= end_date:
         # базовый расчёт
@@ -23,7 +26,7 @@ def simulate_daily_energy(vehicle, start_date, end_date, daily_km, driving_condi
         season = 1 + alpha * math.sin(2 * math.pi * month_idx / 12)
 
         # шумовой множитель
-        noise = random.gauss(1, sigma)
+        noise = random.gauss(1, sigma) if day_noise is None else day_noise[len(results)]
 
         # Список всех числовых полей, которые нужно скорректировать
         numeric_fields = [
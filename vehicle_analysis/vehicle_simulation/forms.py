@@ -2,6 +2,7 @@ from django import forms
 from datetime import datetime, timedelta
 from vehicles.models import ICEVehicle, HEVVehicle, PHEVVehicle, EVVehicle
 from calculator.engines.emissions import EmissionsCalculator
+from .engines.smart_charging import DEFAULT_CHARGER_POWER_KW
 
 
 class VehicleSelectForm(forms.Form):
@@ -99,6 +100,48 @@ class VehicleSelectForm(forms.Form):
         required=True
     )
 
+    charging_objective = forms.ChoiceField(
+        choices=[
+            ('cost', 'Минимум затрат'),
+            ('co2', 'Минимум выбросов CO₂')
+        ],
+        initial='cost',
+        label="Умная зарядка EV/PHEV",
+        widget=forms.Select(attrs={'class': 'form-select'}),
+        required=False
+    )
+    charger_power_kw = forms.FloatField(
+        label='Мощность зарядки (кВт)',
+        min_value=1,
+        widget=forms.NumberInput(attrs={
+            'class': 'form-control',
+            'step': '0.1'
+        }),
+        initial=DEFAULT_CHARGER_POWER_KW,
+        required=False
+    )
+    fuel_grade = forms.ChoiceField(
+        choices=[
+            ('petrol', 'Бензин'),
+            ('diesel', 'Дизель')
+        ],
+        initial='petrol',
+        label="Топливо",
+        widget=forms.Select(attrs={'class': 'form-select'}),
+        required=False
+    )
+    price_inflation = forms.FloatField(
+        label='Рост цен после окончания ряда (%/год)',
+        min_value=-50,
+        max_value=100,
+        widget=forms.NumberInput(attrs={
+            'class': 'form-control',
+            'step': '0.5'
+        }),
+        initial=0,
+        required=False
+    )
+
     compare_types = forms.MultipleChoiceField(
         choices=[
             ('ICE', 'ДВС'),
@@ -111,6 +154,24 @@ class VehicleSelectForm(forms.Form):
         required=False
     )
 
+    seed = forms.IntegerField(
+        label='Зерно генератора',
+        min_value=0,
+        widget=forms.NumberInput(attrs={'class': 'form-control', 'placeholder': 'случайное'}),
+        required=False
+    )
+    save_run = forms.BooleanField(
+        label='Сохранить прогон',
+        widget=forms.CheckboxInput(attrs={'class': 'form-check-input'}),
+        required=False
+    )
+    run_name = forms.CharField(
+        label='Название прогона',
+        max_length=200,
+        widget=forms.TextInput(attrs={'class': 'form-control'}),
+        required=False
+    )
+
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
         if not self.data:
@@ -142,3 +203,67 @@ class VehicleSelectForm(forms.Form):
                 self.add_error(None, "Выберите хотя бы одно транспортное средство")
 
         return cleaned_data
+
+
+class FleetSimulationForm(forms.Form):
+    """Состав парка построчно: «<тип> <id> <кол-во> <км в будний день> [<коэф. выходных>]»"""
+    MAX_UNITS = 100_000
+    MAX_DAYS = 3653
+
+    fleet = forms.CharField(
+        label='Состав парка',
+        widget=forms.Textarea(attrs={'rows': 6, 'placeholder': 'ICE 12 3000 60 0.5\nEV 219 500 80'}),
+        help_text='Строка на сегмент: тип (ICE/HEV/PHEV/EV), id ТС, количество, км в будний день, '
+                  'коэффициент выходных (необязательно)'
+    )
+    start_date = forms.DateField(label='Дата начала', widget=forms.DateInput(attrs={'type': 'date'}),
+                                 initial=datetime.now().date)
+    end_date = forms.DateField(label='Дата окончания', widget=forms.DateInput(attrs={'type': 'date'}),
+                               initial=lambda: datetime.now().date() + timedelta(days=364))
+    driving_conditions = forms.ChoiceField(
+        choices=[('city', 'Городской цикл'), ('highway', 'Трасса'), ('mixed', 'Смешанный цикл')],
+        initial='mixed', label='Условия движения'
+    )
+    energy_source = forms.ChoiceField(
+        choices=[(src['id'], src['name']) for src in EmissionsCalculator.get_energy_sources()],
+        initial='eu_avg', label='Источник электроэнергии'
+    )
+    daily_hours = forms.FloatField(label='Часов эксплуатации в день', min_value=0, max_value=24, initial=8)
+    fuel_grade = forms.ChoiceField(choices=[('petrol', 'Бензин'), ('diesel', 'Дизель')], initial='petrol',
+                                   label='Топливо')
+    unit_cv = forms.FloatField(label='Разброс пробега между ТС (%)', min_value=0, max_value=200, initial=25)
+    daily_cv = forms.FloatField(label='Разброс пробега по дням (%)', min_value=0, max_value=200, initial=30)
+    seed = forms.IntegerField(label='Зерно генератора', min_value=0, required=False,
+                              widget=forms.NumberInput(attrs={'placeholder': 'случайное'}))
+    save_run = forms.BooleanField(label='Сохранить прогон', required=False)
+    run_name = forms.CharField(label='Название прогона', max_length=200, required=False)
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        for field in self.fields.values():
+            if isinstance(field, forms.BooleanField):
+                css = 'form-check-input d-block'
+            else:
+                css = 'form-select' if isinstance(field, forms.ChoiceField) else 'form-control'
+            field.widget.attrs.update({'class': css})
+
+    def clean_fleet(self):
+        from .engines.fleet import parse_fleet
+
+        try:
+            segments = parse_fleet(self.cleaned_data['fleet'])
+        except ValueError as e:
+            raise forms.ValidationError(str(e))
+        if sum(segment['count'] for segment in segments) > self.MAX_UNITS:
+            raise forms.ValidationError(f"Не более {self.MAX_UNITS} ТС в парке")
+        return segments
+
+    def clean(self):
+        cleaned_data = super().clean()
+        start_date, end_date = cleaned_data.get('start_date'), cleaned_data.get('end_date')
+        if start_date and end_date:
+            if start_date > end_date:
+                self.add_error('end_date', "Дата окончания должна быть после даты начала")
+            elif (end_date - start_date).days >= self.MAX_DAYS:
+                self.add_error('end_date', "Горизонт симуляции - не более 10 лет")
+        return cleaned_data
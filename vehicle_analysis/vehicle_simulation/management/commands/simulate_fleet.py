@@ -0,0 +1,90 @@
+import os
+import time
+import tracemalloc
+from datetime import date
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from vehicle_simulation.engines.fleet import (
+    DAY_CHUNK, DEFAULT_DAILY_CV, DEFAULT_UNIT_CV, METRICS, UNIT_CHUNK,
+    fleet_segment, open_fleet_results, parse_fleet, simulate_fleet_to_disk,
+)
+from vehicle_simulation.runs import save_fleet_run
+
+
+class Command(BaseCommand):
+    help = ("Симуляция парка с записью значений каждого ТС по дням в .npy (ТС x дни) блоками; "
+            "память зависит только от размера блока. Состав парка - файл в формате формы «Парк ТС». "
+            "С --open выводит итоги ранее сохраненного результата без пересчета")
+
+    def add_arguments(self, parser):
+        parser.add_argument('name', help="Имя результата (каталог в SIMULATION_RESULTS_DIR) или путь")
+        parser.add_argument('--fleet', help="Файл состава парка: «<тип> <id> <кол-во> <км> [<коэф.>]» в строке")
+        parser.add_argument('--start', type=date.fromisoformat, help="Дата начала (ГГГГ-ММ-ДД)")
+        parser.add_argument('--end', type=date.fromisoformat, help="Дата окончания (ГГГГ-ММ-ДД)")
+        parser.add_argument('--driving-conditions', default='mixed', choices=['city', 'highway', 'mixed'])
+        parser.add_argument('--energy-source', default='eu_avg')
+        parser.add_argument('--daily-hours', type=float, default=8)
+        parser.add_argument('--fuel-grade', default='petrol', choices=['petrol', 'diesel'])
+        parser.add_argument('--unit-cv', type=float, default=DEFAULT_UNIT_CV * 100,
+                            help="Разброс пробега между ТС (%%)")
+        parser.add_argument('--daily-cv', type=float, default=DEFAULT_DAILY_CV * 100,
+                            help="Разброс пробега по дням (%%)")
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--unit-chunk', type=int, default=UNIT_CHUNK, help="ТС в блоке")
+        parser.add_argument('--day-chunk', type=int, default=DAY_CHUNK, help="Дней в блоке")
+        parser.add_argument('--open', action='store_true', help="Открыть сохраненный результат")
+        parser.add_argument('--run-name', default='', help="Название прогона в списке сохраненных")
+
+    def handle(self, *args, **options):
+        path = os.path.join(settings.SIMULATION_RESULTS_DIR, options['name'])
+        if options['open']:
+            if not os.path.exists(path):
+                raise CommandError(f"Результат не найден: {path}")
+            self._report(open_fleet_results(path))
+            return
+
+        if not (options['fleet'] and options['start'] and options['end']):
+            raise CommandError("Укажите --fleet, --start и --end")
+        if options['start'] > options['end']:
+            raise CommandError("Дата окончания должна быть после даты начала")
+        if options['unit_chunk'] < 1 or options['day_chunk'] < 1:
+            raise CommandError("Размер блока должен быть положительным")
+        try:
+            with open(options['fleet'], encoding='utf-8') as f:
+                rows = parse_fleet(f.read())
+        except (OSError, ValueError) as e:
+            raise CommandError(str(e))
+        segments = [fleet_segment(unit_cv=options['unit_cv'] / 100, daily_cv=options['daily_cv'] / 100, **row)
+                    for row in rows]
+
+        started = time.perf_counter()
+        tracemalloc.start()
+        try:
+            results = simulate_fleet_to_disk(
+                segments, options['start'], options['end'], path,
+                driving_conditions=options['driving_conditions'],
+                energy_source=options['energy_source'],
+                daily_hours=options['daily_hours'],
+                fuel_grade=options['fuel_grade'],
+                seed=options['seed'],
+                unit_chunk=options['unit_chunk'],
+                day_chunk=options['day_chunk'],
+            )
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+        run = save_fleet_run(results, options['run_name'])
+        self.stdout.write(f"Прогон #{run.pk}: записано в {results.path} за {time.perf_counter() - started:.2f} с, "
+                          f"пик памяти {peak / 2 ** 20:.1f} МБ")
+        self._report(results)
+
+    def _report(self, results):
+        units = results.manifest['units']
+        self.stdout.write(f"{results.start_date} - {results.end_date}: {units} ТС x {len(results.dates)} дней")
+        for segment in results.segments:
+            self.stdout.write(f"  {segment['vehicle_type']:<5} {segment['label']:<40} {segment['count']:>7} ТС  "
+                              f"{segment['totals']['cost_rub']:>16,.0f} ₽")
+        for metric in METRICS:
+            self.stdout.write(f"{metric:<12} {results.totals[metric]:>20,.1f}")
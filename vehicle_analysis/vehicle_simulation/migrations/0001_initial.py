@@ -0,0 +1,36 @@
+# Generated by Django 5.2 on 2026-10-19 10:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SimulationRun',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(blank=True, max_length=200, verbose_name='Название')),
+                ('kind', models.CharField(choices=[('daily', 'Посуточная симуляция'), ('fleet', 'Парк ТС')], max_length=8, verbose_name='Вид')),
+                ('created_at', models.DateTimeField(auto_now_add=True, db_index=True, verbose_name='Создан')),
+                ('start_date', models.DateField(verbose_name='Дата начала')),
+                ('end_date', models.DateField(verbose_name='Дата окончания')),
+                ('parameters', models.JSONField(default=dict, verbose_name='Параметры')),
+                ('seed', models.IntegerField(blank=True, null=True, verbose_name='Зерно генератора')),
+                ('catalogue_version', models.PositiveBigIntegerField(default=0, verbose_name='Версия каталога')),
+                ('series', models.JSONField(default=list, verbose_name='Ряды')),
+                ('totals', models.JSONField(default=dict, verbose_name='Итоги')),
+                ('results_dir', models.CharField(max_length=255, unique=True, verbose_name='Каталог результатов')),
+            ],
+            options={
+                'verbose_name': 'Прогон симуляции',
+                'verbose_name_plural': 'Прогоны симуляции',
+                'ordering': ['-created_at'],
+            },
+        ),
+    ]
@@ -0,0 +1,62 @@
+from pathlib import Path
+
+from django.conf import settings
+from django.db import models
+
+RUN_COLUMNS_FILE = 'daily.npz'
+
+
+class SimulationRun(models.Model):
+    """
+    Сохраненный прогон симуляции: входные параметры и итоги - в БД,
+    значения по дням - столбцами в SIMULATION_RESULTS_DIR/<results_dir>/daily.npz
+    (сжатый архив, по члену на показатель, массив ряды x дни; читаются только нужные члены).
+    Для прогонов парка в том же каталоге лежат матрицы ТС x дни (см. engines.fleet.FleetResults).
+    """
+    KINDS = (
+        ('daily', 'Посуточная симуляция'),
+        ('fleet', 'Парк ТС'),
+    )
+
+    name = models.CharField(max_length=200, blank=True, verbose_name="Название")
+    kind = models.CharField(max_length=8, choices=KINDS, verbose_name="Вид")
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True, verbose_name="Создан")
+    start_date = models.DateField(verbose_name="Дата начала")
+    end_date = models.DateField(verbose_name="Дата окончания")
+    parameters = models.JSONField(default=dict, verbose_name="Параметры")
+    seed = models.IntegerField(null=True, blank=True, verbose_name="Зерно генератора")
+    catalogue_version = models.PositiveBigIntegerField(default=0, verbose_name="Версия каталога")
+    series = models.JSONField(default=list, verbose_name="Ряды")  # [{'label', 'vehicle_type', 'count', 'totals'}]
+    totals = models.JSONField(default=dict, verbose_name="Итоги")
+    results_dir = models.CharField(max_length=255, unique=True, verbose_name="Каталог результатов")
+
+    class Meta:
+        ordering = ['-created_at']
+        verbose_name = "Прогон симуляции"
+        verbose_name_plural = "Прогоны симуляции"
+
+    def __str__(self):
+        return self.name or f"{self.get_kind_display()} #{self.pk}"
+
+    @property
+    def path(self):
+        return Path(settings.SIMULATION_RESULTS_DIR) / self.results_dir
+
+    @property
+    def days(self):
+        return (self.end_date - self.start_date).days + 1
+
+    def dates(self):
+        from .engines.fleet import fleet_calendar
+        return fleet_calendar(self.start_date, self.end_date)[0]
+
+    def columns(self, *metrics):
+        """{показатель: ряды x дни}; из архива распаковываются только запрошенные показатели"""
+        import numpy as np
+        with np.load(self.path / RUN_COLUMNS_FILE) as data:
+            return {metric: data[metric] for metric in metrics}
+
+    def fleet_results(self):
+        """Матрицы ТС x дни прогона парка (mmap, без загрузки в память)"""
+        from .engines.fleet import open_fleet_results
+        return open_fleet_results(self.path)
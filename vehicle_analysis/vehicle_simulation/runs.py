@@ -0,0 +1,114 @@
+import os
+import uuid
+from pathlib import Path
+
+import numpy as np
+from django.conf import settings
+from django.utils import timezone
+
+from vehicles.catalogue import get_catalogue_version
+from .engines.fleet import METRICS
+from .models import RUN_COLUMNS_FILE, SimulationRun
+
+METRIC_LABELS = {
+    'distance_km': 'Пробег (км/день)',
+    'fuel_liters': 'Расход топлива (л/день)',
+    'energy_kwh': 'Расход электроэнергии (кВт·ч/день)',
+    'energy_mj': 'Энергия (МДж/день)',
+    'co2_g': 'Выбросы CO₂ (г/день)',
+    'cost_rub': 'Стоимость в день (руб)',
+}
+
+
+def new_results_dir(kind):
+    """Имя каталога прогона: вид, время и случайный суффикс"""
+    return f"{kind}-{timezone.now():%Y%m%d-%H%M%S}-{uuid.uuid4().hex[:8]}"
+
+
+def write_columns(path, columns):
+    """Сжатый архив столбцов {показатель: ряды x дни}; пишется во временный файл и заменяет path целиком"""
+    path = Path(path)
+    tmp_path = path.with_name(f'{path.name}.{os.getpid()}.tmp')
+    with open(tmp_path, 'wb') as f:
+        np.savez_compressed(f, **columns)
+    os.replace(tmp_path, path)
+
+
+def daily_columns(results, daily_km):
+    """Столбцы посуточной симуляции: {показатель: ТС x дни} из списков run_simulation"""
+    rows = {metric: [] for metric in METRICS}
+    for item in results:
+        days = item['daily']
+        rows['distance_km'].append([daily_km] * len(days))
+        rows['fuel_liters'].append([day['energy'].get('fuel_liters', 0) for day in days])
+        rows['energy_kwh'].append([day['energy'].get('energy_kwh', 0) for day in days])
+        rows['energy_mj'].append([day['energy'].get('energy_mj', day['energy'].get('energy_kwh', 0) * 3.6)
+                                  for day in days])
+        rows['co2_g'].append([day['co2_g'] for day in days])
+        rows['cost_rub'].append([day['cost_rub'] for day in days])
+    return {metric: np.array(values, dtype=np.float64) for metric, values in rows.items()}
+
+
+def save_daily_run(results, data, name=''):
+    """
+    Сохраняет прогон SimulationView: столбцы по дням в daily.npz, параметры формы и итоги - в БД
+
+    :param results: список {'vehicle', 'name', 'vehicle_type', 'daily'} представления
+    :param data: cleaned_data формы VehicleSelectForm
+    """
+    columns = daily_columns(results, data['daily_distance'])
+    results_dir = new_results_dir('daily')
+    path = Path(settings.SIMULATION_RESULTS_DIR) / results_dir
+    path.mkdir(parents=True, exist_ok=True)
+    write_columns(path / RUN_COLUMNS_FILE, columns)
+
+    series = []
+    for index, item in enumerate(results):
+        series.append({
+            'label': item['name'],
+            'vehicle_type': item['vehicle_type'],
+            'vehicle_id': item['vehicle'].pk,
+            'count': 1,
+            'totals': {metric: float(values[index].sum()) for metric, values in columns.items()},
+        })
+    return SimulationRun.objects.create(
+        name=name,
+        kind='daily',
+        start_date=data['start_date'],
+        end_date=data['end_date'],
+        parameters={
+            'analysis_type': data['analysis_type'],
+            'daily_distance': data['daily_distance'],
+            'daily_hours': data['daily_hours'],
+            'energy_source': data['energy_source'],
+            'driving_conditions': data['driving_conditions'],
+            'fuel_grade': data.get('fuel_grade') or 'petrol',
+            'price_inflation': data.get('price_inflation') or 0,
+        },
+        seed=data.get('seed'),
+        catalogue_version=get_catalogue_version(),
+        series=series,
+        totals={metric: float(values.sum()) for metric, values in columns.items()},
+        results_dir=results_dir,
+    )
+
+
+def save_fleet_run(fleet_results, name=''):
+    """Регистрирует результат simulate_fleet_to_disk (каталог внутри SIMULATION_RESULTS_DIR) как прогон"""
+    manifest = fleet_results.manifest
+    # повторная запись в тот же каталог заменяет прогон
+    run, _ = SimulationRun.objects.update_or_create(
+        results_dir=os.path.relpath(fleet_results.path, settings.SIMULATION_RESULTS_DIR),
+        defaults=dict(
+            name=name,
+            kind='fleet',
+            start_date=fleet_results.start_date,
+            end_date=fleet_results.end_date,
+            parameters={**manifest['parameters'], 'units': manifest['units']},
+            seed=manifest['parameters']['seed'],
+            catalogue_version=get_catalogue_version(),
+            series=fleet_results.segments,
+            totals=fleet_results.totals,
+        ),
+    )
+    return run
@@ -0,0 +1,11 @@
+import shutil
+
+from django.db.models.signals import post_delete
+from django.dispatch import receiver
+
+from .models import SimulationRun
+
+
+@receiver(post_delete, sender=SimulationRun)
+def on_run_deleted(sender, instance, **kwargs):
+    shutil.rmtree(instance.path, ignore_errors=True)
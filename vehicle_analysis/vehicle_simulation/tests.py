@@ -0,0 +1,423 @@
+import tempfile
+from datetime import date, timedelta
+from io import StringIO
+from pathlib import Path
+from unittest import mock
+
+import numpy as np
+from django.conf import settings
+from django.core.management import call_command
+from django.test import SimpleTestCase, TestCase
+from django.urls import reverse
+
+from calculator import admission
+from vehicles.models import EVVehicle
+from vehicles.synthetic import synthetic_vehicles
+from . import views
+from .engines import grid_profiles, smart_charging
+from .engines.fleet import (DAY_CHUNK, METRICS, fleet_calendar, fleet_segment, parse_fleet, simulate_fleet,
+                            simulate_fleet_to_disk)
+from .engines.incremental import IncrementalSimulator, daily_noise, incremental_simulator
+from .engines.simulator import run_simulation
+from .forms import FleetSimulationForm, VehicleSelectForm
+from .models import SimulationRun
+from .runs import save_fleet_run
+from .views import SimulationView
+
+INPUTS = dict(daily_km=50, driving_conditions='mixed', energy_source='eu_avg', use_recuperation=True,
+              urban_share=0.5, daily_hours=8, fuel_grade='petrol', inflation=0.0)
+
+
+class RecordingCompute:
+    """Функция симуляции-заглушка: день - {'date': ...}, вызовы записываются"""
+
+    def __init__(self):
+        self.calls = []
+
+    def __call__(self, vehicle, start_date, end_date, seed=None, **inputs):
+        self.calls.append((start_date, end_date))
+        return [{'date': start_date + timedelta(days=i)} for i in range((end_date - start_date).days + 1)]
+
+
+class IncrementalSimulatorTests(SimpleTestCase):
+
+    def setUp(self):
+        self.simulator = IncrementalSimulator()
+        self.compute = RecordingCompute()
+        self.vehicle = synthetic_vehicles('EV', 1)[0]
+
+    def evaluate(self, start_date, end_date, component='energy', **inputs):
+        days = self.simulator.evaluate(component, self.compute, self.vehicle, start_date, end_date, 7,
+                                       **dict(INPUTS, **inputs))
+        self.assertEqual([day['date'] for day in days],
+                         [start_date + timedelta(days=i) for i in range((end_date - start_date).days + 1)])
+        return days
+
+    def test_hit_slice_and_extension_compute_only_missing_days(self):
+        self.evaluate(date(2024, 3, 1), date(2024, 3, 31))
+        self.evaluate(date(2024, 3, 10), date(2024, 3, 20))
+        self.evaluate(date(2024, 2, 20), date(2024, 4, 5))
+        self.evaluate(date(2024, 4, 6), date(2024, 4, 10))  # смежный диапазон
+        self.assertEqual(self.compute.calls, [
+            (date(2024, 3, 1), date(2024, 3, 31)),
+            (date(2024, 2, 20), date(2024, 2, 29)),
+            (date(2024, 4, 1), date(2024, 4, 5)),
+            (date(2024, 4, 6), date(2024, 4, 10)),
+        ])
+
+    def test_disjoint_range_and_changed_dependency_recompute(self):
+        self.evaluate(date(2024, 1, 1), date(2024, 1, 10))
+        self.evaluate(date(2024, 6, 1), date(2024, 6, 10))
+        self.evaluate(date(2024, 6, 1), date(2024, 6, 10), daily_km=60)
+        # источник энергии не влияет на энергию - срез кэша
+        self.evaluate(date(2024, 6, 1), date(2024, 6, 10), energy_source='coal')
+        self.assertEqual(len(self.compute.calls), 3)
+
+    def test_least_recently_used_entry_is_evicted(self):
+        self.simulator.MAX_ENTRIES = 2
+        first, second, third = (dict(daily_km=km) for km in (10, 20, 30))
+        span = (date(2024, 1, 1), date(2024, 1, 5))
+        self.evaluate(*span, **first)
+        self.evaluate(*span, **second)
+        self.evaluate(*span, **first)  # first становится последним использованным
+        self.evaluate(*span, **third)  # вытесняет second
+        calls = len(self.compute.calls)
+        self.evaluate(*span, **first)
+        self.assertEqual(len(self.compute.calls), calls)
+        self.evaluate(*span, **second)
+        self.assertEqual(len(self.compute.calls), calls + 1)
+
+    def test_daily_noise_does_not_depend_on_range(self):
+        whole = daily_noise(3, 'cost', date(2023, 12, 1), date(2024, 2, 29), 0.1)
+        parts = [daily_noise(3, 'cost', date(2023, 12, 1), date(2024, 1, 14), 0.1),
+                 daily_noise(3, 'cost', date(2024, 1, 15), date(2024, 2, 29), 0.1)]
+        self.assertEqual(list(whole), [*parts[0], *parts[1]])
+
+
+class IncrementalRunSimulationTests(SimpleTestCase):
+    """run_simulation с зерном: склеенный из кэша результат совпадает с расчетом с нуля"""
+
+    def test_incremental_equals_full(self):
+        for vehicle_type in ('ICE', 'PHEV'):
+            vehicle = synthetic_vehicles(vehicle_type, 1, seed=5)[0]
+            incremental_simulator.clear()
+            run_simulation(vehicle, date(2024, 2, 1), date(2024, 2, 29), 50, daily_hours=8, seed=11)
+            run_simulation(vehicle, date(2024, 2, 1), date(2024, 2, 29), 50, daily_hours=8, seed=11,
+                           energy_source='coal')
+            extended = run_simulation(vehicle, date(2024, 1, 15), date(2024, 3, 20), 50, daily_hours=8, seed=11,
+                                      energy_source='coal')
+            incremental_simulator.clear()
+            full = run_simulation(vehicle, date(2024, 1, 15), date(2024, 3, 20), 50, daily_hours=8, seed=11,
+                                  energy_source='coal')
+            with self.subTest(vehicle_type=vehicle_type):
+                self.assertEqual(extended, full)
+
+
+class FleetSimulationTests(SimpleTestCase):
+    """Парк в памяти и на диске: одно зерно - одни и те же значения при любом разбиении по дням"""
+
+    def test_disk_totals_match_memory_over_years(self):
+        segments = [fleet_segment(synthetic_vehicles('ICE', 1, seed=1)[0], 10, 40),
+                    fleet_segment(synthetic_vehicles('EV', 1, seed=2)[0], 300, 60)]
+        start_date, end_date = date(2024, 1, 1), date(2026, 6, 30)
+        in_memory = simulate_fleet(segments, start_date, end_date, seed=3)
+        with tempfile.TemporaryDirectory() as directory:
+            for day_chunk in (DAY_CHUNK, 100):
+                on_disk = simulate_fleet_to_disk(segments, start_date, end_date, Path(directory) / str(day_chunk),
+                                                 seed=3, day_chunk=day_chunk)
+                for metric in METRICS:
+                    with self.subTest(day_chunk=day_chunk, metric=metric):
+                        self.assertAlmostEqual(on_disk.totals[metric], in_memory['totals'][metric],
+                                               delta=abs(in_memory['totals'][metric]) * 1e-12)
+                        np.testing.assert_allclose(on_disk.daily(metric), in_memory['daily'][metric], rtol=1e-12)
+
+    def test_deterministic_mileage_and_unit_chunks(self):
+        vehicle = synthetic_vehicles('EV', 1, seed=2)[0]
+        start_date, end_date = date(2024, 1, 1), date(2024, 3, 31)
+        weekend = fleet_calendar(start_date, end_date)[1]
+        flat = simulate_fleet([fleet_segment(vehicle, 4, 50, weekend_factor=0.5, unit_cv=0, daily_cv=0)],
+                              start_date, end_date)
+        np.testing.assert_allclose(flat['daily']['distance_km'], np.where(weekend, 4 * 25, 4 * 50))
+        self.assertEqual(flat['by_type']['EV']['count'], 4)
+
+        segments = [fleet_segment(vehicle, 300, 50), fleet_segment(synthetic_vehicles('HEV', 1)[0], 20, 80)]
+        whole = simulate_fleet(segments, start_date, end_date, seed=9)
+        chunked = simulate_fleet(segments, start_date, end_date, seed=9, unit_chunk=7)
+        other_seed = simulate_fleet(segments, start_date, end_date, seed=10)
+        for metric in METRICS:
+            with self.subTest(metric=metric):
+                np.testing.assert_allclose(chunked['daily'][metric], whole['daily'][metric], rtol=1e-12)
+                self.assertAlmostEqual(sum(row['totals'][metric] for row in whole['segments']),
+                                       whole['totals'][metric], delta=abs(whole['totals'][metric]) * 1e-12)
+        self.assertNotEqual(other_seed['totals']['distance_km'], whole['totals']['distance_km'])
+
+
+class FleetParseTests(TestCase):
+    """Разбор состава парка: ТС загружаются из каталога, ошибки указывают номер строки"""
+
+    @classmethod
+    def setUpTestData(cls):
+        call_command('seed_catalogue', synthetic=2, stdout=StringIO())
+
+    def test_parse_fleet(self):
+        vehicle = EVVehicle.objects.first()
+        segments = parse_fleet(f'ev {vehicle.pk} 12 40\n\nEV {vehicle.pk} 3 10 0.2')
+        self.assertEqual([(s['vehicle'], s['count'], s['mean_km'], s['weekend_factor']) for s in segments],
+                         [(vehicle, 12, 40.0, 0.6), (vehicle, 3, 10.0, 0.2)])
+        for text, message in (('', 'хотя бы один'), ('EV 1 2', 'Строка 1'), ('BUS 1 2 3', 'Строка 1'),
+                              (f'EV {vehicle.pk} 1 5\nEV {vehicle.pk} 0 5', 'Строка 2'),
+                              (f'EV {vehicle.pk} x 5', 'целые'), ('EV 999999 1 5', 'не найдено')):
+            with self.subTest(text=text), self.assertRaisesMessage(ValueError, message):
+                parse_fleet(text)
+
+
+class GridProfileTests(SimpleTestCase):
+    """Почасовые профили: день года, окно зарядки и значения из CSV"""
+
+    def test_day_of_year_index(self):
+        np.testing.assert_array_equal(grid_profiles.day_of_year_index(date(2023, 12, 30), date(2024, 1, 2)),
+                                      [363, 364, 0, 1])
+        np.testing.assert_array_equal(grid_profiles.day_of_year_index(date(2024, 2, 28), date(2024, 3, 1)),
+                                      [58, 59, 60])
+        # 31 декабря високосного года берет профиль последнего дня
+        self.assertEqual(grid_profiles.day_of_year_index(date(2024, 12, 31), date(2024, 12, 31))[0], 364)
+
+    def test_charging_window_follows_operation(self):
+        self.assertEqual(list(grid_profiles.charging_window_hours(8)), [*range(16, 24), *range(8)])
+        self.assertEqual(list(grid_profiles.charging_window_hours(7.5)), [*range(16, 24), *range(8)])
+        self.assertEqual(list(grid_profiles.charging_window_hours(None)), [*range(8, 24), *range(8)])
+        self.assertEqual(list(grid_profiles.charging_window_hours(24)), [7])
+        weights = grid_profiles.charging_weights(8)
+        self.assertAlmostEqual(weights.sum(), 1.0)
+        self.assertEqual(list(np.flatnonzero(weights)), [*range(8), *range(16, 24)])
+
+    def test_lookups_match_csv(self):
+        rows = np.genfromtxt(grid_profiles.PROFILES_CSV, delimiter=',', names=True, dtype=float)
+        self.assertTrue(grid_profiles.has_profile('coal'))
+        self.assertFalse(grid_profiles.has_profile('unknown'))
+        start_date, end_date = date(2024, 7, 1), date(2024, 7, 3)
+        first = 182 * grid_profiles.HOURS_PER_DAY  # 1 июля високосного года
+        for name in ('eu_avg', grid_profiles.TARIFF_COLUMN):
+            with self.subTest(name=name):
+                expected = rows[name][first:first + 3 * grid_profiles.HOURS_PER_DAY].reshape(3, -1)
+                np.testing.assert_array_equal(grid_profiles.daily_profile_matrix(name, start_date, end_date),
+                                              expected)
+                np.testing.assert_allclose(
+                    grid_profiles.daily_weighted_average(name, start_date, end_date, 8),
+                    expected[:, grid_profiles.charging_window_hours(8)].mean(axis=1))
+
+    def test_npy_cache_is_built_once_and_validated(self):
+        with tempfile.TemporaryDirectory() as directory, self.settings(PROFILE_CACHE_DIR=directory):
+            csv_path = Path(directory) / 'profiles.csv'
+            hours = grid_profiles.HOURS_PER_DAY * grid_profiles.DAYS_PER_YEAR
+            csv_path.write_text('hour,coal\n' + ''.join(f'{hour},{hour % 7}\n' for hour in range(hours)))
+            profiles = grid_profiles._open_profiles(csv_path)
+            self.assertIsInstance(profiles, np.memmap)
+            self.assertEqual(profiles['coal'][10], 3)
+            with mock.patch.object(np, 'genfromtxt') as genfromtxt:
+                grid_profiles._open_profiles(csv_path)
+            genfromtxt.assert_not_called()
+            self.assertEqual(len(list(Path(directory).glob('*.npy'))), 1)
+
+            csv_path.write_text('hour,coal\n0,1\n1,2\n')
+            with self.assertRaises(ValueError):
+                grid_profiles._open_profiles(csv_path)
+
+
+class SmartChargingTests(SimpleTestCase):
+    """Умная зарядка: жадное заполнение самых дешевых (чистых) часов окна против зарядки сразу"""
+    START, END = date(2024, 1, 1), date(2024, 1, 10)
+
+    def reference(self, need, power, tariff, intensity, order):
+        """Пошаговое заполнение часов окна в заданном порядке для одного ТС и дня"""
+        cost = co2 = 0.0
+        for hour in order:
+            energy = min(power, need)
+            cost, co2, need = cost + energy * tariff[hour], co2 + energy * intensity[hour], need - energy
+        return cost, co2, need
+
+    def test_allocation_matches_step_by_step_fill(self):
+        daily_kwh = np.array([[0, 5, 12, 40, 500, 7, 7, 9, 3, 1]] * 2, dtype=float)
+        daily_kwh[1] *= 1.5
+        power = np.array([7.4, 3.0])
+        window = grid_profiles.charging_window_hours(8)
+        tariff = grid_profiles.daily_profile_matrix(grid_profiles.TARIFF_COLUMN, self.START, self.END)[:, window]
+        intensity = grid_profiles.daily_profile_matrix('eu_avg', self.START, self.END)[:, window]
+        for objective, signal in (('cost', tariff), ('co2', intensity)):
+            result = smart_charging.optimize_charging(daily_kwh, self.START, self.END, 8, 'eu_avg', objective, power)
+            for v, d in np.ndindex(daily_kwh.shape):
+                smart = self.reference(daily_kwh[v, d], power[v], tariff[d], intensity[d],
+                                       np.argsort(signal[d], kind='stable'))
+                uncontrolled = self.reference(daily_kwh[v, d], power[v], tariff[d], intensity[d],
+                                              range(len(window)))
+                with self.subTest(objective=objective, vehicle=v, day=d):
+                    np.testing.assert_allclose([result['smart_cost'][v, d], result['smart_co2'][v, d],
+                                                result['unmet_kwh'][v, d]], smart, atol=1e-9)
+                    np.testing.assert_allclose([result['uncontrolled_cost'][v, d],
+                                                result['uncontrolled_co2'][v, d]], uncontrolled[:2], atol=1e-9)
+            optimized = 'smart_cost' if objective == 'cost' else 'smart_co2'
+            self.assertTrue(np.all(result[optimized] <= result['uncontrolled' + optimized[5:]] + 1e-9))
+        # 500 кВт·ч не помещаются в окно: недозаряд - остаток сверх мощности x часы
+        self.assertAlmostEqual(result['unmet_kwh'][0, 4], 500 - 7.4 * len(window))
+
+    def test_constant_need_chunks_and_summary(self):
+        daily_kwh = np.array([4.0, 10.0, np.nan, 20.0, 0.0])
+        result = smart_charging.optimize_charging(daily_kwh, self.START, self.END, 10)
+        with mock.patch.object(smart_charging, 'VEHICLE_CHUNK', 2):
+            chunked = smart_charging.optimize_charging(daily_kwh, self.START, self.END, 10)
+        expanded = smart_charging.optimize_charging(np.repeat(np.nan_to_num(daily_kwh)[:, None], 10, axis=1),
+                                                    self.START, self.END, 10)
+        for name, values in result.items():
+            with self.subTest(name=name):
+                self.assertEqual(values.shape, (5, 10))
+                np.testing.assert_array_equal(values, chunked[name])
+                np.testing.assert_array_equal(values, expanded[name])
+        np.testing.assert_array_equal(result['smart_cost'][[2, 4]], 0)
+
+        totals = smart_charging.summarize_savings(result)
+        np.testing.assert_allclose(totals['smart_cost'], result['smart_cost'].sum(axis=1))
+        np.testing.assert_allclose(totals['cost_saving'], totals['uncontrolled_cost'] - totals['smart_cost'])
+        np.testing.assert_allclose(totals['co2_saving'], totals['uncontrolled_co2'] - totals['smart_co2'])
+        self.assertTrue(np.all(totals['cost_saving'] >= 0))
+
+    def test_unknown_objective(self):
+        with self.assertRaises(ValueError):
+            smart_charging.optimize_charging([10], self.START, self.END, 8, objective='speed')
+
+
+class SimulationAdmissionTests(TestCase):
+    """Длинные периоды не отклоняются формой, а по оценке времени уходят в фоновую очередь"""
+
+    def post(self, years):
+        return self.client.post(reverse('vehicle_simulation:simulate'), {
+            'analysis_type': 'type_avg', 'compare_types': ['ICE', 'HEV', 'PHEV', 'EV'],
+            'start_date': '2024-01-01', 'end_date': f'{2024 + years}-01-01', 'daily_distance': 50,
+            'daily_hours': 8, 'energy_source': 'eu_avg', 'driving_conditions': 'mixed',
+            'charging_objective': 'cost', 'charger_power_kw': 7.4, 'fuel_grade': 'petrol',
+        })
+
+    def test_estimate_routes_long_ranges_to_background(self):
+        data = {'analysis_type': 'type_avg', 'compare_types': ['ICE', 'HEV', 'PHEV', 'EV'],
+                'start_date': date(2024, 1, 1)}
+        for years, expected in ((1, admission.LIGHT), (10, admission.HEAVY), (30, admission.BACKGROUND)):
+            with self.subTest(years=years):
+                estimate = SimulationView.estimate_seconds(dict(data, end_date=date(2024 + years, 1, 1)))
+                self.assertEqual(admission.classify(estimate), expected)
+
+    def test_long_range_is_submitted_to_background(self):
+        with mock.patch.object(admission, 'submit_background') as submit:
+            response = self.post(30)
+        self.assertEqual(response.status_code, 200)
+        self.assertGreaterEqual(response.context['background_estimate'], settings.SIMULATION_BACKGROUND_SECONDS)
+        submit.assert_called_once()
+
+    def test_full_background_queue_answers_503(self):
+        with mock.patch.object(admission, 'submit_background', side_effect=admission.Rejected("занято", 60)):
+            response = self.post(30)
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response['Retry-After'], '60')
+
+
+class SimulationSeedTests(TestCase):
+    """Пустое зерно - случайный прогон, заданное зерно передается в расчет без изменений"""
+
+    @classmethod
+    def setUpTestData(cls):
+        call_command('seed_catalogue', synthetic=1, stdout=StringIO())
+
+    def test_forms_leave_seed_empty(self):
+        for form_class in (VehicleSelectForm, FleetSimulationForm):
+            with self.subTest(form=form_class.__name__):
+                self.assertIsNone(form_class().fields['seed'].initial)
+        response = self.client.get(reverse('vehicle_simulation:simulate'))
+        self.assertIsNone(response.context['form'].initial.get('seed'))
+
+    def fleet_seed(self, seed):
+        vehicle = EVVehicle.objects.first()
+        with mock.patch.object(views, 'simulate_fleet', wraps=simulate_fleet) as simulate:
+            response = self.client.post(reverse('vehicle_simulation:fleet'), {
+                'fleet': f'EV {vehicle.pk} 3 40', 'start_date': '2024-01-01', 'end_date': '2024-01-31',
+                'driving_conditions': 'mixed', 'energy_source': 'eu_avg', 'daily_hours': 8,
+                'fuel_grade': 'petrol', 'unit_cv': 25, 'daily_cv': 30, 'seed': seed,
+            })
+        self.assertEqual(response.status_code, 200)
+        return simulate.call_args.kwargs['seed']
+
+    def test_blank_fleet_seed_is_random(self):
+        self.assertEqual(self.fleet_seed(7), 7)
+        self.assertEqual(self.fleet_seed(0), 0)
+        self.assertNotEqual(len({self.fleet_seed('') for _ in range(3)}), 1)
+
+
+class SimulationRunTests(TestCase):
+    """Сохраненные прогоны: столбцы по дням на диске, итоги в БД, список и сравнение"""
+
+    @classmethod
+    def setUpTestData(cls):
+        call_command('seed_catalogue', synthetic=1, stdout=StringIO())
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        override = self.settings(SIMULATION_RESULTS_DIR=directory.name)
+        override.enable()
+        self.addCleanup(override.disable)
+
+    def save_daily(self):
+        response = self.client.post(reverse('vehicle_simulation:simulate'), {
+            'analysis_type': 'type_avg', 'compare_types': ['ICE', 'EV'],
+            'start_date': '2024-01-01', 'end_date': '2024-01-31', 'daily_distance': 50, 'daily_hours': 8,
+            'energy_source': 'eu_avg', 'driving_conditions': 'mixed', 'charging_objective': 'cost',
+            'charger_power_kw': 7.4, 'fuel_grade': 'petrol', 'seed': 5, 'save_run': 'on', 'run_name': 'Январь',
+        })
+        self.assertEqual(response.status_code, 200)
+        return response.context['saved_run']
+
+    def save_fleet(self):
+        vehicle = EVVehicle.objects.first()
+        response = self.client.post(reverse('vehicle_simulation:fleet'), {
+            'fleet': f'EV {vehicle.pk} 5 40\nEV {vehicle.pk} 2 80', 'start_date': '2024-01-01',
+            'end_date': '2024-02-29', 'driving_conditions': 'mixed', 'energy_source': 'eu_avg', 'daily_hours': 8,
+            'fuel_grade': 'petrol', 'unit_cv': 25, 'daily_cv': 30, 'seed': 3, 'save_run': 'on',
+        })
+        self.assertEqual(response.status_code, 200)
+        return response.context['saved_run']
+
+    def test_daily_run_columns_and_totals(self):
+        run = self.save_daily()
+        self.assertEqual((run.name, run.kind, run.seed, run.days), ('Январь', 'daily', 5, 31))
+        self.assertEqual([series['vehicle_type'] for series in run.series], ['ICE', 'EV'])
+        self.assertEqual(run.parameters['daily_distance'], 50)
+        columns = SimulationRun.objects.get(pk=run.pk).columns('cost_rub', 'distance_km')
+        self.assertEqual(columns['cost_rub'].shape, (2, 31))
+        np.testing.assert_array_equal(columns['distance_km'], 50)
+        self.assertAlmostEqual(run.totals['cost_rub'], columns['cost_rub'].sum())
+        self.assertAlmostEqual(run.series[1]['totals']['co2_g'], run.columns('co2_g')['co2_g'][1].sum())
+
+    def test_fleet_run_is_registered_once(self):
+        run = self.save_fleet()
+        self.assertEqual((run.kind, run.seed, run.parameters['units']), ('fleet', 3, 7))
+        results = run.fleet_results()
+        self.assertEqual(results.values('cost_rub').shape, (7, 60))
+        self.assertEqual([series['offset'] for series in run.series], [0, 5])
+        self.assertAlmostEqual(run.totals['distance_km'], float(results.values('distance_km').sum()), delta=1)
+        self.assertEqual(save_fleet_run(results, 'Повтор').pk, run.pk)
+        self.assertEqual(SimulationRun.objects.get().name, 'Повтор')
+
+    def test_list_and_compare(self):
+        daily, fleet = self.save_daily(), self.save_fleet()
+        url = reverse('vehicle_simulation:runs')
+        response = self.client.get(url)
+        self.assertEqual(list(response.context['runs']), [fleet, daily])
+        self.assertNotIn('compared', response.context)
+
+        response = self.client.get(url, {'runs': [daily.pk, fleet.pk, 'x'], 'metric': 'co2_g'})
+        self.assertEqual(response.context['metric'], 'co2_g')
+        self.assertEqual(set(response.context['compared']), {daily, fleet})
+        self.assertEqual(response.context['missing'], [])
+        self.assertIn('Январь: ', response.context['plot'])
+
+        (daily.path / 'daily.npz').unlink()
+        response = self.client.get(url, {'runs': [daily.pk, fleet.pk], 'metric': 'unknown'})
+        self.assertEqual(response.context['metric'], 'cost_rub')
+        self.assertEqual(response.context['missing'], [daily])
@@ -14,5 +14,7 @@ app_name = 'vehicle_simulation'
 
 urlpatterns = [
     path('', views.SimulationView.as_view(), name='simulate'),
+    path('fleet/', views.FleetSimulationView.as_view(), name='fleet'),
+    path('runs/', views.SimulationRunListView.as_view(), name='runs'),
     path('test-post/', TestPostView.as_view(), name='test_post')
 ]
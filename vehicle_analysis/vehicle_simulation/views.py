@@ -1,10 +1,34 @@
+import os
+import secrets
+
 from django.apps import apps
-from django.views.generic import FormView
+from django.conf import settings
+from django.db.models import Avg, Count
+from django.views.generic import FormView, ListView
 from django.urls import reverse_lazy
 from django.shortcuts import render
 from datetime import datetime
-from .forms import VehicleSelectForm
+import numpy as np
+from .forms import VehicleSelectForm, FleetSimulationForm
+from calculator.instrumentation import stage
+from calculator import admission
+from calculator.singleflight import input_hash, single_flight
 from .engines.simulator import run_simulation
+from .engines.fleet import fleet_segment, simulate_fleet, simulate_fleet_to_disk
+from .engines import grid_profiles
+from .engines.smart_charging import optimize_charging, summarize_savings, DEFAULT_CHARGER_POWER_KW
+from .models import SimulationRun
+from vehicles.display import number, vehicle_label
+from .runs import METRIC_LABELS, new_results_dir, save_daily_run, save_fleet_run
+
+
+def reject(view, form, error):
+    """Ответ 503 с формой и причиной отказа в допуске"""
+    form.add_error(None, str(error))
+    response = view.form_invalid(form)
+    response.status_code = 503
+    response['Retry-After'] = str(error.retry_after)
+    return response
 
 
 class SimulationView(FormView):
@@ -12,6 +36,11 @@ class SimulationView(FormView):
     form_class = VehicleSelectForm
     success_url = reverse_lazy('vehicle_simulation:simulate')
 
+    # оценка времени расчета для допуска (замер полного запроса с графиками и шаблоном на периодах
+    # 5-30 лет: ~28 мкс на проход ТС-дня, ~0.4 с шаблон и plotly.js)
+    SECONDS_PER_PASS_DAY = 28e-6
+    BASE_SECONDS = 0.4
+
     def get_context_data(self, **kwargs):
         ctx = super().get_context_data(**kwargs)
         if not self.request.POST:
@@ -22,6 +51,8 @@ class SimulationView(FormView):
                 'daily_hours': 8,
                 'energy_source': 'eu_avg',
                 'driving_conditions': 'mixed',
+                'charging_objective': 'cost',
+                'fuel_grade': 'petrol',
                 'compare_types': ['ICE', 'HEV', 'PHEV', 'EV']
             })
         return ctx
@@ -31,11 +62,68 @@ class SimulationView(FormView):
         # поправляем compare_types из POST
         data['compare_types'] = self.request.POST.getlist('compare_types')
 
-        vehicles = self._get_vehicles_for_analysis(data)
-        if not vehicles:
+        # тяжелые запросы - по слотам или в фон, легкие проходят сразу (calculator.admission)
+        estimate = self.estimate_seconds(data)
+        request_class = admission.classify(estimate)
+        if request_class == admission.BACKGROUND:
+            try:
+                admission.submit_background('simulation', self._simulate_and_save, data)
+            except admission.Rejected as e:
+                return reject(self, form, e)
+            return render(self.request, self.template_name, {'form': form, 'background_estimate': estimate})
+
+        def compute():
+            with admission.admit('simulation', request_class):
+                return self._compute(data)
+
+        # одинаковые одновременные запросы считаются один раз, остальные ждут результат
+        key = input_hash('simulation', data, exclude=('save_run', 'run_name'))
+        try:
+            computed = single_flight(key, compute)
+        except admission.Rejected as e:
+            return reject(self, form, e)
+        if computed is None:
             form.add_error(None, "Нужно выбрать хотя бы одно ТС или тип")
             return self.form_invalid(form)
 
+        context = {'form': form, 'show_results': True, **computed}
+        if data.get('save_run'):
+            context['saved_run'] = save_daily_run(computed['results'], data, data.get('run_name') or '')
+        return render(self.request, self.template_name, context)
+
+    @classmethod
+    def estimate_seconds(cls, data):
+        """Оценка времени расчета: ТС x дни x проходы (энергия, выбросы, затраты, графики, умная зарядка)"""
+        if data['analysis_type'] == 'single':
+            fields = ['ice_vehicle', 'hevv_vehicle', 'phevv_vehicle', 'ev_vehicle']
+            vehicles = sum(1 for field in fields if data.get(field))
+            charged = bool(data.get('phevv_vehicle') or data.get('ev_vehicle'))
+        else:
+            vehicles = len(data.get('compare_types', []))
+            charged = bool({'EV', 'PHEV'} & set(data.get('compare_types', [])))
+        days = max((data['end_date'] - data['start_date']).days + 1, 0)
+        passes = 5 if charged else 4
+        return cls.BASE_SECONDS + vehicles * days * passes * cls.SECONDS_PER_PASS_DAY
+
+    def _simulate_and_save(self, data):
+        """Фоновый расчет: симуляция без графиков, результат - сохраненный прогон"""
+        vehicles = self._get_vehicles_for_analysis(data)
+        if vehicles:
+            return save_daily_run(self._simulate(vehicles, data), data, data.get('run_name') or "Фоновый расчет")
+
+    def _compute(self, data):
+        """Симуляция, умная зарядка и графики; None, если ТС не выбраны"""
+        vehicles = self._get_vehicles_for_analysis(data)
+        if not vehicles:
+            return None
+        results = self._simulate(vehicles, data)
+        return {
+            'results': results,
+            'charging_report': self._add_charging_report(results, data),
+            'plots': self._generate_plots(results),
+        }
+
+    def _simulate(self, vehicles, data):
         # параметры симуляции
         start_date = data['start_date']
         end_date = data['end_date']
@@ -56,7 +144,11 @@ class SimulationView(FormView):
                 driving_conditions=cond,
                 energy_source=source,
                 use_recuperation=use_recup,
-                urban_share=urban_share
+                urban_share=urban_share,
+                daily_hours=data['daily_hours'],
+                fuel_grade=data.get('fuel_grade') or 'petrol',
+                inflation=(data.get('price_inflation') or 0) / 100,
+                seed=data.get('seed'),
             )
 
             # считаем суммарные показатели
@@ -74,6 +166,8 @@ class SimulationView(FormView):
 
             results.append({
                 'vehicle': v,
+                'name': vehicle_label(v),
+                'vehicle_type': v.vehicle_type,
                 'daily': sim,
                 'summary': {
                     'energy_mj': total_energy,
@@ -82,16 +176,40 @@ class SimulationView(FormView):
                     # ДОБАВЛЯЕМ НОВЫЕ ПОЛЯ:
                     'fuel_liters': total_fuel,
                     'energy_kwh': total_electric
-                }
+                },
             })
+            results[-1]['display'] = self.summary_display(results[-1]['summary'])
+        return results
 
-        context = {
-            'form': form,
-            'show_results': True,
-            'results': results,
-            'plots': self._generate_plots(results),
+    @staticmethod
+    def summary_display(summary):
+        """Итоги для таблицы результатов, отформатированные один раз"""
+        return {
+            'fuel_liters': number(summary['fuel_liters'], 2),
+            'energy_kwh': number(summary['energy_kwh'], 2),
+            'co2_g': number(summary['co2_g'], 1),
+            'cost_rub': number(summary['cost_rub'], 1),
         }
-        return render(self.request, self.template_name, context)
+
+    def _add_charging_report(self, results, data):
+        """Умная зарядка EV/PHEV: затраты и выбросы зарядки против неуправляемой зарядки"""
+        charged = [item for item in results if grid_profiles.is_grid_charged(item['vehicle'])]
+        if not charged or not grid_profiles.has_profile(data['energy_source']):
+            return False
+        daily_kwh = np.array([[day['energy'].get('energy_kwh', 0) for day in item['daily']] for item in charged])
+        totals = summarize_savings(optimize_charging(
+            daily_kwh,
+            data['start_date'],
+            data['end_date'],
+            data['daily_hours'],
+            energy_source=data['energy_source'],
+            objective=data.get('charging_objective') or 'cost',
+            charger_power_kw=data.get('charger_power_kw') or DEFAULT_CHARGER_POWER_KW,
+        ))
+        for idx, item in enumerate(charged):
+            item['charging'] = {name: float(values[idx]) for name, values in totals.items()}
+            item['display'].update({f'charging_{name}': number(value, 1) for name, value in item['charging'].items()})
+        return True
 
     def _get_vehicles_for_analysis(self, data):
         vehicles = []
@@ -113,9 +231,6 @@ class SimulationView(FormView):
         return vehicles
 
     def _create_average_vehicle(self, model, vehicle_type):
-        qs = model.objects.all()
-        if not qs.exists():
-            return None
         numeric_fields = [
             f.name for f in model._meta.get_fields()
             if (
@@ -127,11 +242,16 @@ class SimulationView(FormView):
                     f.name != 'id'
             )
         ]
+        # средние считает БД одним запросом (NULL не учитываются); пустая таблица - None
+        averages = model.objects.aggregate(
+            vehicles_count=Count('id'), **{field: Avg(field) for field in numeric_fields}
+        )
+        if not averages.pop('vehicles_count'):
+            return None
         avg = model()
-        for field in numeric_fields:
-            vals = [getattr(v, field) for v in qs if getattr(v, field) is not None]
-            if vals:
-                setattr(avg, field, sum(vals) / len(vals))
+        for field, value in averages.items():
+            if value is not None:
+                setattr(avg, field, value)
         avg.mark_name = "Средний"
         avg.model_name = {
             'ICE': 'ДВС', 'HEV': 'Гибриды',
@@ -140,6 +260,7 @@ class SimulationView(FormView):
         avg.id = -1
         return avg
 
+    @stage('plots')
     def _generate_plots(self, results):
         import plotly.graph_objects as go
         from plotly.offline import plot
@@ -154,8 +275,7 @@ class SimulationView(FormView):
         colors = ['#3498db', '#2ecc71', '#e74c3c', '#9b59b6']
 
         for idx, item in enumerate(results):
-            v = item['vehicle']
-            name = f"{v.mark_name} {v.model_name}"
+            name = item['name']
             dates = [d['date'] for d in item['daily']]
 
             # расход топлива (л/день)
@@ -220,9 +340,151 @@ class SimulationView(FormView):
             legend=dict(orientation='h', y=1.1, x=0),
         )
 
+        # plotly.js встраивается только в первый график страницы
         return {
             'fuel': plot(figs['fuel'], output_type='div', config={'displayModeBar': False}),
-            'electric': plot(figs['electric'], output_type='div', config={'displayModeBar': False}),
-            'emissions': plot(figs['emissions'], output_type='div', config={'displayModeBar': False}),
-            'cost': plot(figs['cost'], output_type='div', config={'displayModeBar': False}),
+            'electric': plot(figs['electric'], output_type='div', config={'displayModeBar': False},
+                             include_plotlyjs=False),
+            'emissions': plot(figs['emissions'], output_type='div', config={'displayModeBar': False},
+                              include_plotlyjs=False),
+            'cost': plot(figs['cost'], output_type='div', config={'displayModeBar': False}, include_plotlyjs=False),
         }
+
+
+class FleetSimulationView(FormView):
+    """Симуляция парка: тысячи ТС с разным пробегом, итоги по парку, сегментам и типам"""
+    template_name = 'vehicle_simulation/fleet.html'
+    form_class = FleetSimulationForm
+
+    # оценка времени расчета для допуска (замер: ~60 нс на ТС-день)
+    SECONDS_PER_UNIT_DAY = 60e-9
+    BASE_SECONDS = 0.1
+
+    def form_valid(self, form):
+        data = form.cleaned_data
+        segments = [
+            fleet_segment(unit_cv=data['unit_cv'] / 100, daily_cv=data['daily_cv'] / 100, **segment)
+            for segment in data['fleet']
+        ]
+        options = dict(
+            driving_conditions=data['driving_conditions'],
+            energy_source=data['energy_source'],
+            daily_hours=data['daily_hours'],
+            fuel_grade=data['fuel_grade'],
+            # пустое зерно - случайный прогон; выбранное зерно сохраняется в параметрах прогона
+            seed=data['seed'] if data.get('seed') is not None else secrets.randbits(32),
+        )
+        estimate = self.estimate_seconds(segments, data)
+        request_class = admission.classify(estimate)
+        if request_class == admission.BACKGROUND:
+            try:
+                admission.submit_background('fleet', self._simulate_and_save, segments, data, options,
+                                            data.get('run_name') or "Фоновый расчет")
+            except admission.Rejected as e:
+                return reject(self, form, e)
+            return self.render_to_response(self.get_context_data(form=form, background_estimate=estimate))
+        try:
+            with admission.admit('fleet', request_class):
+                return self._respond(form, segments, data, options)
+        except admission.Rejected as e:
+            return reject(self, form, e)
+
+    @classmethod
+    def estimate_seconds(cls, segments, data):
+        """Оценка времени расчета: ТС x дни (движки применяются к матрице целиком)"""
+        days = max((data['end_date'] - data['start_date']).days + 1, 0)
+        return cls.BASE_SECONDS + sum(segment['count'] for segment in segments) * days * cls.SECONDS_PER_UNIT_DAY
+
+    def _simulate_and_save(self, segments, data, options, name):
+        """Значения каждого ТС по дням пишутся на диск блоками и регистрируются как прогон"""
+        path = os.path.join(settings.SIMULATION_RESULTS_DIR, new_results_dir('fleet'))
+        fleet_results = simulate_fleet_to_disk(segments, data['start_date'], data['end_date'], path, **options)
+        return fleet_results, save_fleet_run(fleet_results, name)
+
+    def _respond(self, form, segments, data, options):
+        saved_run = None
+        if data.get('save_run'):
+            # итоги читаются из сохраненного прогона
+            fleet_results, saved_run = self._simulate_and_save(segments, data, options, data.get('run_name') or '')
+            result = fleet_results.summary()
+        else:
+            result = simulate_fleet(segments, data['start_date'], data['end_date'], **options)
+        return self.render_to_response(self.get_context_data(
+            form=form,
+            result=result,
+            units=sum(segment['count'] for segment in segments),
+            plot=self._generate_plot(result),
+            saved_run=saved_run,
+        ))
+
+    @stage('plots')
+    def _generate_plot(self, result):
+        import plotly.graph_objects as go
+        from plotly.offline import plot
+
+        dates = result['dates'].astype(str)
+        fig = go.Figure(layout={'height': 350})
+        fig.add_trace(go.Scattergl(x=dates, y=result['daily']['cost_rub'], mode='lines', name='Затраты (руб)'))
+        fig.add_trace(go.Scattergl(x=dates, y=result['daily']['co2_g'] / 1000, mode='lines', name='CO₂ (кг)',
+                                   yaxis='y2'))
+        fig.update_layout(
+            plot_bgcolor='rgba(0,0,0,0)',
+            paper_bgcolor='rgba(0,0,0,0)',
+            xaxis_title='Дата',
+            yaxis=dict(title='Затраты парка в день (руб)'),
+            yaxis2=dict(title='CO₂ в день (кг)', overlaying='y', side='right'),
+            margin=dict(l=40, r=40, t=30, b=40),
+            legend=dict(orientation='h', y=1.1, x=0),
+        )
+        return plot(fig, output_type='div', config={'displayModeBar': False})
+
+
+class SimulationRunListView(ListView):
+    """
+    Сохраненные прогоны и сравнение выбранных (?runs=<id>&runs=<id>&metric=<показатель>):
+    итоги берутся из БД, для графика из архива каждого прогона читается только столбец metric
+    """
+    model = SimulationRun
+    template_name = 'vehicle_simulation/runs.html'
+    context_object_name = 'runs'
+    paginate_by = 50
+    MAX_COMPARED = 8
+
+    def get_context_data(self, **kwargs):
+        ctx = super().get_context_data(**kwargs)
+        metric = self.request.GET.get('metric')
+        if metric not in METRIC_LABELS:
+            metric = 'cost_rub'
+        selected = [int(pk) for pk in self.request.GET.getlist('runs') if pk.isdigit()][:self.MAX_COMPARED]
+        ctx.update(metric=metric, metric_labels=METRIC_LABELS, selected=selected)
+        if selected:
+            compared = list(SimulationRun.objects.filter(pk__in=selected))
+            ctx['compared'] = compared
+            ctx['plot'], ctx['missing'] = self._generate_plot(compared, metric)
+        return ctx
+
+    @stage('plots')
+    def _generate_plot(self, runs, metric):
+        import plotly.graph_objects as go
+        from plotly.offline import plot
+
+        fig = go.Figure(layout={'height': 400})
+        missing = []
+        for run in runs:
+            try:
+                values = run.columns(metric)[metric]
+            except OSError:
+                missing.append(run)
+                continue
+            dates = run.dates().astype(str)
+            for series, row in zip(run.series, values):
+                fig.add_trace(go.Scattergl(x=dates, y=row, mode='lines', name=f"{run}: {series['label']}"))
+        fig.update_layout(
+            plot_bgcolor='rgba(0,0,0,0)',
+            paper_bgcolor='rgba(0,0,0,0)',
+            xaxis_title='Дата',
+            yaxis_title=METRIC_LABELS[metric],
+            margin=dict(l=40, r=20, t=30, b=40),
+            legend=dict(orientation='h', y=1.1, x=0),
+        )
+        return plot(fig, output_type='div', config={'displayModeBar': False}), missing
@@ -2,10 +2,27 @@ from django.contrib import admin
 from .models import ICEVehicle, EVVehicle, HEVVehicle, PHEVVehicle
 
 from import_export.admin import ImportExportModelAdmin
+from import_export.resources import ModelResource, modelresource_factory
+
+from calculator.metrics import deferred_vehicle_metrics
+
+
+class CatalogueResource(ModelResource):
+    """Импорт ТС: показатели каталога пересобираются один раз на файл, а не на каждую строку"""
+
+    def import_data(self, dataset, dry_run=False, *args, **kwargs):
+        with deferred_vehicle_metrics(rebuild=not dry_run):
+            return super().import_data(dataset, dry_run, *args, **kwargs)
+
+
+class CatalogueAdmin(ImportExportModelAdmin):
+
+    def get_resource_classes(self, request):
+        return [modelresource_factory(self.model, resource_class=CatalogueResource)]
 
 
 @admin.register(ICEVehicle)
-class ICEVehicleAdmin(ImportExportModelAdmin):
+class ICEVehicleAdmin(CatalogueAdmin):
     list_display = ('mark_name', 'model_name', 'mass_kg', 'fuel_consumption_lp100km')
     fieldsets = (
         ('Общие параметры', {
@@ -18,17 +35,17 @@ class ICEVehicleAdmin(ImportExportModelAdmin):
 
 
 @admin.register(EVVehicle)
-class EVVehicleAdmin(ImportExportModelAdmin):
+class EVVehicleAdmin(CatalogueAdmin):
     list_display = ('mark_name', 'model_name', 'battery_capacity_kwh', 'energy_consumption_kwhp100km')
 
 
 @admin.register(HEVVehicle)
-class HEVVehicleAdmin(ImportExportModelAdmin):
+class HEVVehicleAdmin(CatalogueAdmin):
     list_display = ('mark_name', 'model_name', 'ice_share', 'generator_efficiency')
 
 
 @admin.register(PHEVVehicle)
-class PHEVVehicleAdmin(ImportExportModelAdmin):
+class PHEVVehicleAdmin(CatalogueAdmin):
     list_display = (
         'mark_name',
         'model_name',
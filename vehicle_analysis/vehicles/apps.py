@@ -4,3 +4,17 @@ from django.apps import AppConfig
 class VehiclesConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'vehicles'
+
+    def ready(self):
+        from . import signals  # noqa: F401
+
+    def warm_up(self):
+        """Таблица показателей для списка каталога и шаблоны каталога (см. calculator.warmup)"""
+        from django.template.loader import get_template
+        from calculator.metrics import rebuild_vehicle_metrics
+        from .views import VehicleListView, VehicleDetailView
+
+        if VehicleListView._metrics_missing():
+            rebuild_vehicle_metrics()
+        for template_name in (VehicleListView.template_name, VehicleDetailView.template_name):
+            get_template(template_name)
@@ -0,0 +1,105 @@
+import numpy as np
+from django.db import models
+from django.db.models import F
+from django.utils import timezone
+
+from .models import ICEVehicle, EVVehicle, HEVVehicle, PHEVVehicle, CatalogueVersion
+from .shared import shared_columns, version_label
+
+VEHICLE_MODELS = {
+    'ICE': ICEVehicle,
+    'EV': EVVehicle,
+    'HEV': HEVVehicle,
+    'PHEV': PHEVVehicle,
+}
+
+
+def get_catalogue_version():
+    """Текущая версия каталога (0, если каталог еще не менялся)"""
+    version = CatalogueVersion.objects.filter(pk=1).values_list('version', flat=True).first()
+    return version or 0
+
+
+def get_catalogue_state():
+    """(версия, время изменения) каталога одним запросом; (0, None), если каталог еще не менялся"""
+    state = CatalogueVersion.objects.filter(pk=1).values_list('version', 'updated_at').first()
+    return state or (0, None)
+
+
+def bump_catalogue_version():
+    """Увеличивает версию каталога после изменения любого ТС"""
+    # update() не заполняет auto_now - время изменения задается явно
+    updated = CatalogueVersion.objects.filter(pk=1).update(version=F('version') + 1, updated_at=timezone.now())
+    if not updated:
+        CatalogueVersion.objects.get_or_create(pk=1, defaults={'version': 1})
+
+
+class VehicleArrays:
+    """
+    Каталог одного типа ТС в виде столбцов numpy.
+
+    Атрибуты совпадают с полями модели (mass_kg, production_price, ...),
+    поэтому формулы движков применяются ко всему каталогу сразу.
+    Пустые значения (NULL) становятся NaN.
+    """
+
+    LABEL_FIELDS = ('mark_name', 'model_name')
+
+    def __init__(self, vehicle_type, columns):
+        self.vehicle_type = vehicle_type
+        self.columns = columns
+        for name, values in columns.items():
+            setattr(self, name, values)
+
+    def __len__(self):
+        return len(self.columns['id'])
+
+    @classmethod
+    def numeric_fields(cls, model):
+        return [
+            f.name for f in model._meta.concrete_fields
+            if isinstance(f, (models.FloatField, models.IntegerField)) and f.name != 'id'
+        ]
+
+    @classmethod
+    def load(cls, vehicle_type, queryset=None):
+        """Загружает каталог типа одним запросом values_list"""
+        model = VEHICLE_MODELS[vehicle_type]
+        if queryset is None:
+            queryset = model.objects.all()
+        numeric = cls.numeric_fields(model)
+        fields = ['id', *cls.LABEL_FIELDS, *numeric]
+        rows = list(queryset.order_by('id').values_list(*fields))
+
+        columns = {'id': np.array([r[0] for r in rows], dtype=np.int64)}
+        for offset, name in enumerate(cls.LABEL_FIELDS, start=1):
+            columns[name] = np.array([r[offset] for r in rows], dtype=object)
+        start = 1 + len(cls.LABEL_FIELDS)
+        values = np.array([r[start:] for r in rows], dtype=float).reshape(len(rows), len(numeric))
+        for offset, name in enumerate(numeric):
+            columns[name] = values[:, offset]
+        return cls(vehicle_type, columns)
+
+    @classmethod
+    def shared(cls, vehicle_type, state=None):
+        """
+        Каталог типа из общих для воркеров файлов .npy (см. vehicles.shared): загружается из БД
+        один раз на версию каталога, столбцы - только для чтения
+
+        :param state: результат get_catalogue_state(), если уже известен
+        """
+        label = version_label(*(state or get_catalogue_state()))
+        columns = shared_columns(f'catalogue-{vehicle_type}', label, lambda: cls.load(vehicle_type).columns)
+        return cls(vehicle_type, columns)
+
+    def take(self, index):
+        """Подмножество каталога по индексам/маске"""
+        return VehicleArrays(self.vehicle_type, {k: v[index] for k, v in self.columns.items()})
+
+    def expand(self, axis):
+        """Столбцы в форме (n, 1) или (1, n) для попарных расчетов через broadcasting"""
+        shape = (-1, 1) if axis == 0 else (1, -1)
+        return VehicleArrays(self.vehicle_type, {k: v.reshape(shape) for k, v in self.columns.items()})
+
+    def labels(self):
+        return [f"{mark} {model}" for mark, model in zip(self.mark_name, self.model_name)]
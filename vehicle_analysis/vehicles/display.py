@@ -0,0 +1,14 @@
+"""
+Готовые к выводу поля строк таблиц: подписи и числа форматируются один раз в представлении,
+шаблоны выводят строки без фильтров и проверок типа ТС на каждой строке
+"""
+
+
+def vehicle_label(vehicle):
+    """Подпись ТС в таблицах и графиках: марка и модель (как VehicleArrays.labels)"""
+    return f"{vehicle.mark_name} {vehicle.model_name}"
+
+
+def number(value, digits, empty=''):
+    """Число с digits знаками после запятой (как floatformat без локализации); None - empty"""
+    return empty if value is None else f"{value:.{digits}f}"
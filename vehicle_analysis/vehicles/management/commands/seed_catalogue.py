@@ -0,0 +1,38 @@
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from vehicles.catalogue import VEHICLE_MODELS
+from vehicles.synthetic import dataset_vehicles, synthetic_vehicles
+
+
+class Command(BaseCommand):
+    help = "Заполняет каталог ТС из CSV (vehicles/datasets) или синтетическими ТС заданного размера"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--type', dest='vehicle_types', action='append', choices=list(VEHICLE_MODELS),
+                            help="Тип ТС (можно несколько раз), по умолчанию все")
+        parser.add_argument('--synthetic', type=int, metavar='N',
+                            help="Сгенерировать N синтетических ТС каждого типа вместо строк CSV")
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--keep', action='store_true', help="Не удалять существующие ТС")
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        vehicle_types = options['vehicle_types'] or list(VEHICLE_MODELS)
+        for vehicle_type in vehicle_types:
+            model = VEHICLE_MODELS[vehicle_type]
+            if options['synthetic']:
+                vehicles = synthetic_vehicles(vehicle_type, options['synthetic'], options['seed'])
+            else:
+                vehicles = dataset_vehicles(vehicle_type)
+            with transaction.atomic():
+                if not options['keep']:
+                    model.objects.all().delete()
+                model.objects.bulk_create(vehicles, batch_size=options['batch_size'])
+            self.stdout.write(f"{vehicle_type}: {model.objects.count()}")
+
+        # bulk_create не отправляет сигналы - показатели пересобираются явно,
+        # rebuild_vehicle_metrics увеличивает и версию каталога
+        call_command('rebuild_vehicle_metrics', *[f'--type={t}' for t in vehicle_types], stdout=self.stdout)
+        self.stdout.write(self.style.SUCCESS("Каталог заполнен"))
@@ -67,6 +67,7 @@ class ElectricSpecs(models.Model):
 
 class ICEVehicle(BaseVehicle, EngineSpecs):
     """Модель для автомобилей с ДВС"""
+    vehicle_type = 'ICE'
 
     class Meta:
         app_label = 'vehicles'
@@ -77,6 +78,7 @@ class ICEVehicle(BaseVehicle, EngineSpecs):
 
 class EVVehicle(BaseVehicle, ElectricSpecs):
     """Модель для электромобилей"""
+    vehicle_type = 'EV'
 
     class Meta:
         app_label = 'vehicles'
@@ -87,6 +89,7 @@ class EVVehicle(BaseVehicle, ElectricSpecs):
 
 class HEVVehicle(BaseVehicle, EngineSpecs, ElectricSpecs):
     """Модель для гибридов"""
+    vehicle_type = 'HEV'
     ice_share = models.FloatField(
         verbose_name="Доля работы ДВС",
         help_text="От 0 до 1 (например, 0.7 для 70%)",
@@ -106,6 +109,7 @@ class HEVVehicle(BaseVehicle, EngineSpecs, ElectricSpecs):
 
 class PHEVVehicle(BaseVehicle, EngineSpecs, ElectricSpecs):
     """Модель для подключаемых гибридов (PHEV)"""
+    vehicle_type = 'PHEV'
     battery_only_range_km = models.FloatField(
         default=0.0,
         verbose_name="Запас хода только на батарее (км)",
@@ -132,3 +136,16 @@ class PHEVVehicle(BaseVehicle, EngineSpecs, ElectricSpecs):
 
     def __str__(self):
         return f"{self.mark_name} {self.model_name} (PHEV)"
+
+
+class CatalogueVersion(models.Model):
+    """Версия каталога ТС: увеличивается при любом изменении автомобилей"""
+    version = models.PositiveBigIntegerField(default=0, verbose_name="Версия")
+    updated_at = models.DateTimeField(auto_now=True, verbose_name="Обновлено")
+
+    class Meta:
+        app_label = 'vehicles'
+        verbose_name = "Версия каталога"
+
+    def __str__(self):
+        return f"Каталог v{self.version}"
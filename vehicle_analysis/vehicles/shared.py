@@ -0,0 +1,100 @@
+import json
+import os
+import shutil
+import threading
+from pathlib import Path
+
+import numpy as np
+from django.conf import settings
+
+SHARED_DIR = 'shared'
+MANIFEST = 'columns.json'
+
+_attached = {}  # имя набора -> (метка версии, столбцы)
+_lock = threading.Lock()
+
+
+def shared_root():
+    return Path(settings.PROFILE_CACHE_DIR) / SHARED_DIR
+
+
+def version_label(version, updated_at):
+    """
+    Метка версии каталога для пути: номер версии и время ее изменения
+    (номер начинается заново в новой БД, время - нет)
+    """
+    stamp = int(updated_at.timestamp() * 1_000_000) if updated_at else 0
+    return f'v{version}-{stamp}'
+
+
+def shared_columns(name, label, build):
+    """
+    Столбцы numpy, общие для всех воркеров (по образцу профилей сети в grid_profiles).
+
+    Первый процесс, которому нужен набор name версии label, строит его через build()
+    и публикует в PROFILE_CACHE_DIR/shared/<label>/<name>/ атомарным переименованием каталога;
+    все процессы открывают файлы через np.load(mmap_mode='r') и делят одни страницы памяти.
+    С новой меткой процесс переключается на новый каталог, версии старше предыдущей удаляются
+    (уже отображенные в память файлы остаются доступны до закрытия).
+
+    :param build: функция без аргументов -> {ключ: массив}, ключ - строка или кортеж строк;
+                  массивы object (подписи) сохраняются как строки фиксированной длины
+    :return: {ключ: массив только для чтения}
+    """
+    with _lock:
+        attached = _attached.get(name)
+        if attached and attached[0] == label:
+            return attached[1]
+
+    path = shared_root() / label / name
+    if not path.exists():
+        _publish(path, build())
+        _remove_stale(label)
+    columns = _attach(path)
+    with _lock:
+        _attached[name] = (label, columns)
+    return columns
+
+
+def _publish(path, columns):
+    tmp_path = path.with_name(f'{path.name}.{os.getpid()}.{threading.get_ident()}.tmp')
+    tmp_path.mkdir(parents=True, exist_ok=True)
+    keys = []
+    for i, (key, values) in enumerate(columns.items()):
+        values = np.asarray(values)
+        if values.dtype == object:
+            values = values.astype(str)
+        np.save(tmp_path / f'{i}.npy', values)
+        keys.append(list(key) if isinstance(key, tuple) else key)
+    with open(tmp_path / MANIFEST, 'w', encoding='utf-8') as f:
+        json.dump(keys, f, ensure_ascii=False)
+    try:
+        os.rename(tmp_path, path)
+    except OSError:
+        # набор уже опубликован другим процессом
+        shutil.rmtree(tmp_path, ignore_errors=True)
+
+
+def _attach(path):
+    with open(path / MANIFEST, encoding='utf-8') as f:
+        keys = json.load(f)
+    return {
+        tuple(key) if isinstance(key, list) else key: np.load(path / f'{i}.npy', mmap_mode='r')
+        for i, key in enumerate(keys)
+    }
+
+
+def _label_version(label):
+    try:
+        return int(label.split('-')[0][1:])
+    except ValueError:
+        return None
+
+
+def _remove_stale(label):
+    """Удаляет каталоги версий старше предыдущей (на них могут еще ссылаться воркеры в момент переключения)"""
+    current = _label_version(label)
+    for entry in shared_root().iterdir():
+        version = _label_version(entry.name)
+        if version is not None and version < current - 1:
+            shutil.rmtree(entry, ignore_errors=True)
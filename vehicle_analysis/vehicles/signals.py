@@ -0,0 +1,11 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from .catalogue import VEHICLE_MODELS, bump_catalogue_version
+
+
+@receiver([post_save, post_delete])
+def on_vehicle_changed(sender, **kwargs):
+    """Любое изменение ТС делает каталог новой версией"""
+    if sender in VEHICLE_MODELS.values():
+        bump_catalogue_version()
@@ -0,0 +1,97 @@
+import csv
+import math
+from pathlib import Path
+
+import numpy as np
+
+from .catalogue import VEHICLE_MODELS, VehicleArrays
+
+DATASETS_DIR = Path(__file__).resolve().parent / 'datasets'
+
+# CSV каталога (нормализованные выгрузки data_for_project) и переименование столбцов в поля модели
+DATASETS = {
+    'ICE': ('data_for_dvs.csv', {}),
+    'HEV': ('data_for_hibrids.csv', {}),
+    'EV': ('data_for_bev.csv', {'price': 'production_price'}),
+    'PHEV': ('phev_converted.csv', {'firm_name': 'mark_name'}),
+}
+JITTER = 0.05  # относительный разброс (логнормальный) синтетических значений
+FRACTION_FIELDS = ('engine_efficiency', 'motor_efficiency', 'charging_efficiency', 'generator_efficiency', 'ice_share')
+
+_datasets = {}
+
+
+def load_dataset(vehicle_type):
+    """
+    Столбцы исходного CSV типа ТС: метки - object, числовые поля модели - float
+    (поля, которых нет в CSV, заполняются значением по умолчанию модели)
+    """
+    if vehicle_type not in _datasets:
+        filename, renames = DATASETS[vehicle_type]
+        with open(DATASETS_DIR / filename, encoding='utf-8') as f:
+            rows = [{renames.get(k, k): v for k, v in row.items()} for row in csv.DictReader(f)]
+
+        model = VEHICLE_MODELS[vehicle_type]
+        columns = {name: np.array([row.get(name) or '' for row in rows], dtype=object)
+                   for name in VehicleArrays.LABEL_FIELDS}
+        for name in VehicleArrays.numeric_fields(model):
+            field = model._meta.get_field(name)
+            default = field.get_default() if field.has_default() else None
+            columns[name] = np.array([_to_float(row.get(name, default)) for row in rows], dtype=float)
+        # строки с пропусками в столбцах CSV не используются для выборки
+        complete = np.all([~np.isnan(columns[name]) for name in columns
+                           if name in rows[0] and name not in VehicleArrays.LABEL_FIELDS], axis=0)
+        _datasets[vehicle_type] = {name: values[complete] for name, values in columns.items()}
+    return _datasets[vehicle_type]
+
+
+def _to_float(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return math.nan
+
+
+def synthetic_arrays(vehicle_type, size, seed=0):
+    """
+    Синтетический каталог размера size: строки исходного CSV выбираются с возвращением
+    (сохраняются связи между параметрами), числовые значения умножаются на логнормальный шум.
+    """
+    source = load_dataset(vehicle_type)
+    rng = np.random.default_rng(seed)
+    rows = rng.integers(0, len(source['model_name']), size)
+
+    columns = {'id': np.arange(1, size + 1, dtype=np.int64)}
+    for name, values in source.items():
+        values = values[rows]
+        if values.dtype != object:
+            values = values * rng.lognormal(0, JITTER, size)
+            if name in FRACTION_FIELDS:
+                values = np.minimum(values, 1.0)
+        columns[name] = values
+    return VehicleArrays(vehicle_type, columns)
+
+
+def synthetic_vehicles(vehicle_type, size, seed=0):
+    """Несохраненные экземпляры модели с синтетическими параметрами (для bulk_create и поштучных расчетов)"""
+    return _instances(vehicle_type, synthetic_arrays(vehicle_type, size, seed).columns)
+
+
+def dataset_vehicles(vehicle_type):
+    """Несохраненные экземпляры модели по строкам исходного CSV"""
+    return _instances(vehicle_type, load_dataset(vehicle_type))
+
+
+def _instances(vehicle_type, columns):
+    model = VEHICLE_MODELS[vehicle_type]
+    names = [name for name in columns if name != 'id']
+    return [
+        model(**{name: _model_value(columns[name][i]) for name in names})
+        for i in range(len(columns['model_name']))
+    ]
+
+
+def _model_value(value):
+    if isinstance(value, float) and math.isnan(value):
+        return None
+    return value.item() if isinstance(value, np.generic) else value
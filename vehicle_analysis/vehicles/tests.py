@@ -0,0 +1,158 @@
+from io import StringIO
+from unittest import mock
+from urllib.parse import parse_qs
+
+import tablib
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+from import_export.resources import modelresource_factory
+
+from calculator import metrics
+from calculator.models import VehicleMetrics
+from .admin import CatalogueResource
+from .catalogue import bump_catalogue_version
+from .models import ICEVehicle
+from .views import VehicleListView, page_version
+
+
+class VehicleListTests(TestCase):
+    """Список каталога: фильтры max_*, ссылки сортировки и расчет в памяти при пустой таблице показателей"""
+
+    @classmethod
+    def setUpTestData(cls):
+        call_command('seed_catalogue', synthetic=10, stdout=StringIO())
+
+    def setUp(self):
+        cache.clear()
+
+    def rows(self, **params):
+        response = self.client.get(reverse('vehicles:vehicle_list'), params)
+        self.assertEqual(response.status_code, 200)
+        return response, [(row.vehicle_type, row.vehicle_id) for row in response.context['vehicles']]
+
+    def test_max_filters_and_sort(self):
+        limit = sorted(VehicleMetrics.objects.values_list('tco_per_km', flat=True))[15]
+        _, rows = self.rows(type='EV', max_tco_per_km=limit, sort='-co2_g_per_km')
+        expected = VehicleMetrics.objects.filter(vehicle_type='EV', tco_per_km__lte=limit)
+        expected = expected.order_by('-co2_g_per_km', 'vehicle_id')
+        self.assertTrue(rows)
+        self.assertEqual(rows, [(row.vehicle_type, row.vehicle_id) for row in expected])
+
+    def test_sort_links_keep_filters_and_cover_columns(self):
+        response, _ = self.rows(type='HEV', max_co2_g_per_km='500', sort='mass_kg')
+        links = response.context['sort_links']
+        self.assertEqual(set(links), set(VehicleListView.SORT_FIELDS))
+        for field, query in links.items():
+            with self.subTest(field=field):
+                params = parse_qs(query)
+                self.assertEqual(params['type'], ['HEV'])
+                self.assertEqual(params['max_co2_g_per_km'], ['500'])
+                self.assertEqual(params['sort'], ['-mass_kg' if field == 'mass_kg' else field])
+                self.assertContains(response, f'href="?{query}"'.replace('&', '&amp;'))
+
+    def test_display_values(self):
+        response, _ = self.rows(type='ICE')
+        vehicle = ICEVehicle.objects.order_by('pk').first()
+        row = next(row for row in response.context['vehicles'] if row.vehicle_id == vehicle.pk)
+        self.assertEqual(row.display['mass_kg'], str(vehicle.mass_kg))
+        self.assertEqual(row.display['consumption'], f'{vehicle.fuel_consumption_lp100km} л/100км')
+        response, _ = self.rows(type='PHEV')
+        self.assertEqual({row.display['consumption'] for row in response.context['vehicles']}, {''})
+
+    def test_empty_table_falls_back_without_writes(self):
+        for params in ({}, {'type': 'PHEV', 'sort': '-tco_per_km'}, {'max_energy_mj_per_km': '2'}):
+            cache.clear()
+            _, expected = self.rows(**params)
+            VehicleMetrics.objects.all().delete()
+            cache.clear()
+            with self.subTest(params=params):
+                self.assertEqual(self.rows(**params)[1], expected)
+                self.assertFalse(VehicleMetrics.objects.exists())
+            metrics.rebuild_vehicle_metrics()
+
+
+class CatalogueImportTests(TestCase):
+    """Импорт ТС в админке: показатели пересобираются один раз на файл"""
+
+    @classmethod
+    def setUpTestData(cls):
+        call_command('seed_catalogue', synthetic=3, stdout=StringIO())
+
+    def test_import_rebuilds_metrics_once(self):
+        resource = modelresource_factory(ICEVehicle, resource_class=CatalogueResource)()
+        exported = resource.export(ICEVehicle.objects.all())
+        new_id = exported.headers.index('id')
+        dataset = tablib.Dataset(*[['' if i == new_id else value for i, value in enumerate(row)] for row in exported],
+                                 headers=exported.headers)
+        before = set(ICEVehicle.objects.values_list('pk', flat=True))
+        with mock.patch('calculator.signals.refresh_vehicle_metrics') as refresh, \
+                mock.patch.object(metrics, 'rebuild_vehicle_metrics', wraps=metrics.rebuild_vehicle_metrics) as rebuild:
+            resource.import_data(dataset, dry_run=True)
+            self.assertEqual(rebuild.call_count, 0)
+            result = resource.import_data(dataset)
+        self.assertFalse(result.has_errors())
+        refresh.assert_not_called()
+        rebuild.assert_called_once_with(['ICE'])
+        added = set(ICEVehicle.objects.values_list('pk', flat=True)) - before
+        self.assertEqual(len(added), len(dataset))
+        self.assertEqual(set(VehicleMetrics.objects.filter(vehicle_type='ICE').values_list('vehicle_id', flat=True)),
+                         before | added)
+
+
+class CatalogueCachingTests(TestCase):
+    """Условные GET страниц каталога (ETag, 304) и кэш строк списка по версии каталога"""
+
+    @classmethod
+    def setUpTestData(cls):
+        call_command('seed_catalogue', synthetic=3, stdout=StringIO())
+
+    def setUp(self):
+        cache.clear()
+        self.vehicle = ICEVehicle.objects.order_by('pk').first()
+
+    def urls(self):
+        return ['/', '/?type=ICE', reverse('vehicles:vehicle_typed_detail', args=['ICE', self.vehicle.pk])]
+
+    def test_revalidation_answers_304_after_one_query(self):
+        for url in self.urls():
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(set(response['Cache-Control'].split(', ')), {'public', 'no-cache'})
+                self.assertNotIn('Last-Modified', response)
+                with self.assertNumQueries(1):
+                    revalidated = self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+                self.assertEqual(revalidated.status_code, 304)
+                self.assertEqual(revalidated['ETag'], response['ETag'])
+
+    def test_vehicle_change_invalidates_etag_and_rows(self):
+        etags = [self.client.get(url)['ETag'] for url in self.urls()]
+        self.vehicle.mark_name = 'Переименованная марка'
+        self.vehicle.save()
+        for url, etag in zip(self.urls(), etags):
+            with self.subTest(url=url):
+                response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code, 200)
+                self.assertNotEqual(response['ETag'], etag)
+                self.assertContains(response, 'Переименованная марка')
+
+    def test_version_bump_invalidates_fragment_cache(self):
+        self.client.get('/')
+        with self.assertNumQueries(1):  # строки - из кэша фрагментов
+            self.client.get('/')
+        bump_catalogue_version()
+        with self.assertNumQueries(2):  # новая версия - строки читаются заново
+            self.client.get('/')
+        with self.assertNumQueries(1):
+            self.client.get('/')
+
+    def test_page_version_is_part_of_etag(self):
+        self.addCleanup(page_version.cache_clear)
+        etag = self.client.get('/')['ETag']
+        with self.settings(CATALOGUE_PAGE_VERSION='release-2'):
+            page_version.cache_clear()
+            response = self.client.get('/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('release-2', response['ETag'])
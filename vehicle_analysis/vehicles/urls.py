@@ -5,4 +5,5 @@ app_name = 'vehicles'
 urlpatterns = [
     path('', views.VehicleListView.as_view(), name='vehicle_list'),
     path('<int:pk>/', views.VehicleDetailView.as_view(), name='vehicle_detail'),
+    path('<str:vehicle_type>/<int:pk>/', views.VehicleDetailView.as_view(), name='vehicle_typed_detail'),
 ]
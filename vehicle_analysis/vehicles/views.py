@@ -1,36 +1,190 @@
+import hashlib
+from functools import lru_cache
+from pathlib import Path
+
+from django.conf import settings
+from django.db.models import Case, F, Value, When
 from django.views.generic import View
+from django.http import Http404
 from django.shortcuts import render, get_object_or_404
+from django.utils.decorators import method_decorator
+from django.utils.formats import localize
+from django.utils.functional import SimpleLazyObject
+from django.views.decorators.cache import cache_control
+from django.views.decorators.http import condition
+from calculator.models import VehicleMetrics
+from calculator.metrics import compute_vehicle_metrics
+from .catalogue import VEHICLE_MODELS, VehicleArrays, get_catalogue_state
+from .display import number, vehicle_label
 from .models import ICEVehicle, EVVehicle, HEVVehicle, PHEVVehicle
+from .shared import version_label
+
+
+def catalogue_state(request, *args, **kwargs):
+    """Версия каталога - один запрос на HTTP-запрос (ее используют ETag и кэш фрагментов)"""
+    if not hasattr(request, 'catalogue_state'):
+        request.catalogue_state = get_catalogue_state()
+    return request.catalogue_state
+
+
+@lru_cache(maxsize=None)
+def page_version():
+    """
+    Версия разметки страниц каталога: CATALOGUE_PAGE_VERSION (например, номер релиза)
+    или хэш шаблонов и модулей, которые ее формируют; меняется при деплое
+    """
+    if settings.CATALOGUE_PAGE_VERSION:
+        return settings.CATALOGUE_PAGE_VERSION
+    app_dir = Path(__file__).resolve().parent
+    paths = [app_dir / 'views.py', app_dir / 'display.py']
+    for directory in settings.TEMPLATES[0]['DIRS']:
+        paths.extend(sorted(Path(directory).rglob('*.html')))
+    digest = hashlib.sha1()
+    for path in paths:
+        digest.update(path.read_bytes())
+    return digest.hexdigest()[:12]
+
 
+def catalogue_etag(request, *args, **kwargs):
+    return f'{version_label(*catalogue_state(request))}-{page_version()}'
 
+
+# Страницы каталога меняются только вместе с версией каталога или разметки: повторный запрос
+# с If-None-Match получает 304 после одного запроса к БД; кэши (в том числе промежуточные)
+# могут хранить страницу, но перепроверяют ее перед каждой выдачей. Last-Modified не отдается:
+# по одной дате изменения каталога If-Modified-Since подтверждал бы разметку до деплоя
+catalogue_conditional = [
+    cache_control(public=True, no_cache=True),
+    condition(etag_func=catalogue_etag),
+]
+
+
+@method_decorator(catalogue_conditional, name='get')
 class VehicleListView(View):
     template_name = 'vehicles/list.html'
     context_object_name = 'vehicle_list'
+    SORT_FIELDS = ('mark_name', 'mass_kg', 'consumption', 'tco_per_km', 'co2_g_per_km', 'energy_mj_per_km',
+                   'cruise_power_kw')
+    FILTER_FIELDS = ('tco_per_km', 'co2_g_per_km', 'energy_mj_per_km')
 
     def get(self, request, *args, **kwargs):
+        vehicles = VehicleMetrics.objects.all()
+
         vehicle_type = request.GET.get('type')
-        if vehicle_type == 'ICE':
-            vehicles = ICEVehicle.objects.all()
-        elif vehicle_type == 'EV':
-            vehicles = EVVehicle.objects.all()
-        elif vehicle_type == 'HEV':
-            vehicles = HEVVehicle.objects.all()
-        elif vehicle_type == 'PHEV':
-            vehicles = PHEVVehicle.objects.all()
-        else:
-            vehicles = (list(ICEVehicle.objects.all()) +
-                        list(EVVehicle.objects.all()) +
-                        list(HEVVehicle.objects.all()) +
-                        list(PHEVVehicle.objects.all()))
-
-        return render(request, self.template_name, {'vehicles': vehicles})
+        if vehicle_type in VEHICLE_MODELS:
+            vehicles = vehicles.filter(vehicle_type=vehicle_type)
 
+        # фильтры по рассчитанным показателям: ?max_tco_per_km=15
+        limits = {}
+        for field in self.FILTER_FIELDS:
+            try:
+                limits[field] = float(request.GET.get(f'max_{field}', ''))
+            except ValueError:
+                continue
+            vehicles = vehicles.filter(**{f'{field}__lte': limits[field]})
+
+        # порядок как у списка по моделям (ДВС, EV, HEV, PHEV, внутри типа - по id); пустые значения - в конце
+        sort = request.GET.get('sort', '')
+        if sort.lstrip('-') not in self.SORT_FIELDS:
+            sort = ''
+        type_order = Case(*(When(vehicle_type=vtype, then=Value(i)) for i, vtype in enumerate(VEHICLE_MODELS)))
+        order = [type_order, 'vehicle_id']
+        if sort:
+            field = F(sort.lstrip('-'))
+            order.insert(0, field.desc(nulls_first=True) if sort.startswith('-') else field.asc(nulls_last=True))
+        vehicles = vehicles.order_by(*order)
+
+        # строки таблицы кэшируются фрагментом шаблона по версии каталога и параметрам запроса;
+        # показатели загружаются из БД, только если фрагмента нет в кэше
+        rows_key = [vehicle_type or '', sort, *(request.GET.get(f'max_{field}', '') for field in self.FILTER_FIELDS)]
+        return render(request, self.template_name, {
+            'vehicles': SimpleLazyObject(lambda: self._load(vehicles, vehicle_type, limits, sort)),
+            'vehicle_type': vehicle_type,
+            'sort': sort,
+            'sort_links': self._sort_links(request, sort),
+            'catalogue_label': catalogue_etag(request),
+            'rows_key': '|'.join(rows_key),
+            'fragment_timeout': settings.CATALOGUE_FRAGMENT_TIMEOUT,
+        })
+
+    def _load(self, vehicles, vehicle_type=None, limits=None, sort=''):
+        rows = list(vehicles)
+        if not rows and self._metrics_missing():
+            rows = self._compute_rows(vehicle_type, limits or {}, sort)
+        for row in rows:
+            row.name = vehicle_label(row)
+            # масса и расход - исходные значения ТС без округления, рассчитанные показатели - округленные
+            row.display = {
+                'mass_kg': localize(row.mass_kg),
+                'consumption': '' if row.consumption is None else f'{localize(row.consumption)} {row.consumption_unit}',
+                'tco_per_km': number(row.tco_per_km, 2),
+                'co2_g_per_km': number(row.co2_g_per_km, 1),
+                'energy_mj_per_km': number(row.energy_mj_per_km, 2),
+                'cruise_power_kw': number(row.cruise_power_kw, 1),
+            }
+        return rows
+
+    @staticmethod
+    def _sort_links(request, sort):
+        """Строки запроса заголовков таблицы: текущие параметры (тип, фильтры) с новой сортировкой"""
+        links = {}
+        for field in VehicleListView.SORT_FIELDS:
+            params = request.GET.copy()
+            params['sort'] = f'-{field}' if sort == field else field
+            links[field] = params.urlencode()
+        return links
 
+    @staticmethod
+    def _compute_rows(vehicle_type, limits, sort):
+        """
+        Показатели, посчитанные в памяти, с теми же фильтрами и сортировкой. GET таблицу не пишет:
+        ее заполняют миграция, сигналы и команды rebuild_vehicle_metrics / seed_catalogue
+        """
+        types = [vehicle_type] if vehicle_type in VEHICLE_MODELS else list(VEHICLE_MODELS)
+        rows = [row for vtype in types for row in compute_vehicle_metrics(VehicleArrays.load(vtype))]
+        rows = [row for row in rows
+                if all(getattr(row, field) is not None and getattr(row, field) <= limit
+                       for field, limit in limits.items())]
+        if sort:
+            field = sort.lstrip('-')
+            rows.sort(key=lambda row: (getattr(row, field) is None, getattr(row, field) or 0),
+                      reverse=sort.startswith('-'))
+        return rows
+
+    @staticmethod
+    def _metrics_missing():
+        """Таблица показателей пуста, а каталог - нет (например, сразу после миграции)"""
+        return (not VehicleMetrics.objects.exists()
+                and any(model.objects.exists() for model in VEHICLE_MODELS.values()))
+
+
+@method_decorator(catalogue_conditional, name='get')
 class VehicleDetailView(View):
     template_name = 'vehicles/detail.html'
     context_object_name = 'vehicle_detail'
+    # (поле, подпись, единица, знаков после запятой или None - как есть) по коду типа ТС;
+    # шаблон выводит готовые строки без проверок полей, которых у типа нет
+    _FUEL = ('fuel_consumption_lp100km', 'Расход топлива', 'л/100км', None)
+    _ENERGY = ('energy_consumption_kwhp100km', 'Расход электроэнергии', 'кВт·ч/100км', None)
+    _CO2 = ('co2_emissions_gl', 'Выбросы CO₂', 'г/л', 1)
+    _BATTERY = ('battery_capacity_kwh', 'Ёмкость батареи', 'кВт·ч', None)
+    _MOTOR = ('motor_efficiency', 'КПД двигателя', '', 2)
+    SPEC_FIELDS = {
+        'ICE': (_FUEL, _CO2),
+        'EV': (_ENERGY, _BATTERY, _MOTOR),
+        'HEV': (_FUEL, _ENERGY, _CO2, _BATTERY, _MOTOR),
+        'PHEV': (('kwh_100_km_battery_only', 'Расход электроэнергии', 'кВт·ч/100км', None), _CO2,
+                 ('battery_only_range_km', 'Запас хода на батарее', 'км', None), _MOTOR),
+    }
+
+    def get(self, request, pk, vehicle_type=None, *args, **kwargs):
+        # с типом в URL - один запрос к нужной таблице (id в разных таблицах пересекаются)
+        if vehicle_type is not None:
+            if vehicle_type not in VEHICLE_MODELS:
+                raise Http404
+            vehicle = get_object_or_404(VEHICLE_MODELS[vehicle_type], pk=pk)
+            return render(request, self.template_name, self.get_context(vehicle))
 
-    def get(self, request, pk, *args, **kwargs):
         vehicle = None
         for model in [ICEVehicle, EVVehicle, HEVVehicle, PHEVVehicle]:
             try:
@@ -42,4 +196,13 @@ class VehicleDetailView(View):
         if not vehicle:
             raise get_object_or_404(ICEVehicle, pk=pk)
 
-        return render(request, self.template_name, {'vehicle': vehicle})
+        return render(request, self.template_name, self.get_context(vehicle))
+
+    def get_context(self, vehicle):
+        specs = []
+        for field, label, unit, digits in self.SPEC_FIELDS[vehicle.vehicle_type]:
+            value = getattr(vehicle, field)
+            if value:
+                specs.append({'label': label, 'value': value if digits is None else number(value, digits),
+                              'unit': unit})
+        return {'vehicle': vehicle, 'name': vehicle_label(vehicle), 'specs': specs}